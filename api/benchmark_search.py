@@ -0,0 +1,169 @@
+"""
+Latency of /search: the old three round-trips (ward ids, environment ids, then the
+main query with both id arrays as parameters) against the single `build_search_query`.
+
+Run from the `api/` directory with the same POSTGRES_* variables as the service:
+
+    python benchmark_search.py --repeat 50
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+from typing import Dict, List, Tuple
+
+import psycopg2
+
+from function import build_search_query, has_search_index
+from model import ItemSearch
+
+
+def legacy_search(item_search: ItemSearch, conn) -> List[int]:
+    """The previous /search: ward ids and environment ids fetched first, then shipped back as ANY(%s)"""
+    with conn.cursor() as cur:
+        if item_search.ward_id is not None:
+            ward_ids = [item_search.ward_id]
+        else:
+            sql = """
+                SELECT w.id
+                FROM public.wards w
+                JOIN public.districts d ON w.district_id = d.id
+                JOIN public.provinces p ON d.province_id = p.id
+            """
+            conditions, params = [], []
+            if item_search.province_id is not None:
+                conditions.append("p.id = %s")
+                params.append(item_search.province_id)
+            if item_search.district_id is not None:
+                conditions.append("d.id = %s")
+                params.append(item_search.district_id)
+            if conditions:
+                sql += " WHERE " + " AND ".join(conditions)
+            cur.execute(sql, tuple(params))
+            ward_ids = [row[0] for row in cur.fetchall()]
+
+        sql, params = "SELECT e.id FROM public.environment e", []
+        if item_search.search_content is not None and str(item_search.search_content).strip() != "":
+            sql += " WHERE e.value ILIKE %s"
+            params.append(f"%{item_search.search_content}%")
+        cur.execute(sql, tuple(params))
+        environment_ids = [row[0] for row in cur.fetchall()]
+
+        sql = """
+            SELECT DISTINCT hr.id
+            FROM public.house_rent_environment hre
+            LEFT JOIN public.house_rent hr ON hre.house_rent_id = hr.id
+            WHERE hr.available = TRUE AND hr.ward_id = ANY(%s) AND hre.environment_id = ANY(%s)
+        """
+        params = [ward_ids, environment_ids]
+        if item_search.price_min is not None:
+            sql += " AND hr.price >= %s"
+            params.append(item_search.price_min)
+        if item_search.price_max is not None:
+            sql += " AND hr.price <= %s"
+            params.append(item_search.price_max)
+        if item_search.acreage_min is not None:
+            sql += " AND hr.acreage >= %s"
+            params.append(item_search.acreage_min)
+        if item_search.acreage_max is not None:
+            sql += " AND hr.acreage <= %s"
+            params.append(item_search.acreage_max)
+        if item_search.bedrooms is not None:
+            sql += " AND hr.bedrooms = %s"
+            params.append(item_search.bedrooms)
+        cur.execute(sql, tuple(params))
+        return [row[0] for row in cur.fetchall()]
+
+
+def single_search(item_search: ItemSearch, conn) -> List[int]:
+    sql, params = build_search_query(item_search, has_search_index(conn))
+    with conn.cursor() as cur:
+        cur.execute(sql, tuple(params))
+        return [row[0] for row in cur.fetchall()]
+
+
+def sample_searches(conn) -> Dict[str, ItemSearch]:
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT hr.ward_id, w.district_id, d.province_id
+            FROM public.house_rent hr
+            JOIN public.wards w ON hr.ward_id = w.id
+            JOIN public.districts d ON w.district_id = d.id
+            WHERE hr.available
+            GROUP BY 1, 2, 3
+            ORDER BY count(*) DESC
+            LIMIT 1
+        """)
+        ward_id, district_id, province_id = cur.fetchone()
+        cur.execute("SELECT percentile_cont(0.5) WITHIN GROUP (ORDER BY price) FROM public.house_rent WHERE available")
+        price = float(cur.fetchone()[0] or 0)
+        cur.execute("""
+            SELECT e.value
+            FROM public.house_rent_environment hre
+            JOIN public.environment e ON hre.environment_id = e.id
+            GROUP BY 1
+            ORDER BY count(*) DESC
+            LIMIT 1
+        """)
+        amenity = cur.fetchone()[0]
+    return {
+        "everything": ItemSearch(),
+        "province": ItemSearch(province_id=province_id),
+        "district_price": ItemSearch(district_id=district_id, price_min=price * 0.5, price_max=price * 1.5),
+        "ward": ItemSearch(ward_id=ward_id),
+        "text": ItemSearch(search_content=amenity[:6]),
+        "province_text_acreage": ItemSearch(province_id=province_id, search_content=amenity[:6],
+                                            acreage_min=15, acreage_max=40),
+        "no_match": ItemSearch(search_content="zzzz-no-such-amenity"),
+    }
+
+
+def measure(function, item_search: ItemSearch, conn, repeat: int) -> Tuple[float, float, List[int]]:
+    timings, ids = [], []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        ids = function(item_search, conn)
+        timings.append((time.perf_counter() - start) * 1000)
+        conn.rollback()
+    return statistics.median(timings), statistics.quantiles(timings, n=20)[-1] if repeat > 1 else timings[0], ids
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=30, help="runs per search (median and p95 are reported)")
+    parser.add_argument("--output", default=None, help="write the results as JSON to this file")
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(
+        host=os.environ.get("POSTGRES_HOST"),
+        database=os.environ.get("POSTGRES_DB"),
+        user=os.environ.get("POSTGRES_USER"),
+        password=os.environ.get("POSTGRES_PASSWORD"),
+        port=os.environ.get("POSTGRES_PORT")
+    )
+    results = {}
+    try:
+        print(f"{'search':24s} {'rows':>7s} {'3 trips ms':>11s} {'p95':>8s} {'1 trip ms':>10s} {'p95':>8s} {'speedup':>8s}")
+        for name, item_search in sample_searches(conn).items():
+            legacy_ms, legacy_p95, legacy_ids = measure(legacy_search, item_search, conn, args.repeat)
+            single_ms, single_p95, single_ids = measure(single_search, item_search, conn, args.repeat)
+            # Khi không có search_content, truy vấn mới giữ cả các tin chưa có tiện ích nào
+            missing = set(legacy_ids) - set(single_ids)
+            results[name] = {
+                "rows": len(single_ids), "legacy_rows": len(legacy_ids), "missing_from_single": len(missing),
+                "legacy_ms_median": legacy_ms, "legacy_ms_p95": legacy_p95,
+                "single_ms_median": single_ms, "single_ms_p95": single_p95,
+            }
+            print(f"{name:24s} {len(single_ids):7d} {legacy_ms:11.2f} {legacy_p95:8.2f} {single_ms:10.2f} "
+                  f"{single_p95:8.2f} {legacy_ms / single_ms:7.2f}x" + (f"  ({len(missing)} rows missing!)" if missing else ""))
+    finally:
+        conn.close()
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,152 +1,658 @@
-from http.client import HTTPException
+import datetime
+import io
+import logging
+import logging.handlers
 import os
-from typing import List, Optional
+import queue
+import random
+import sys
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+import orjson
 import psycopg2
+import psycopg2.extensions
+import psycopg2.extras
+from fastapi import HTTPException
+from psycopg2.pool import PoolError
 
 from model import ItemSearch
 
+logger = logging.getLogger("api")
+
+TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+# Thuộc tính sẵn có của LogRecord; các thuộc tính khác (truyền qua extra=) được ghi thành field JSON
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {
+    "message", "asctime", "taskName", "color_message"}
+
+# JsonFormatter, LogQueueHandler và LogQueueListener giống hệt JsonFormatter, _QueueHandler và _QueueListener
+# của app/server/utils/log.py (cùng orjson, cùng các field) để log của hai service được phân tích như nhau;
+# app/tests/test_api_copies.py kiểm tra hai bên vẫn khớp
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, message, extra fields, exception"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc)
+            .isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        if record.stack_info:
+            entry["stack"] = self.formatStack(record.stack_info)
+        return orjson.dumps(entry, default=str, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+
+class LogQueueHandler(logging.handlers.QueueHandler):
+    """Non-blocking hand-off to the writer thread; records that do not fit are dropped"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Cùng process nên không cần format/pickle trước: để thread ghi log làm
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+
+class LogQueueListener(logging.handlers.QueueListener):
+    def enqueue_sentinel(self):
+        # Hàng đợi đầy khi tắt service: chờ thread ghi log giải phóng chỗ thay vì lỗi
+        self.queue.put(self._sentinel, timeout=5)
+
+class AccessLogSampler(logging.Filter):
+    """Keep a `rate` share of uvicorn access records, and every 5xx"""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        # args của uvicorn.access: (client, method, path, http_version, status_code)
+        status = record.args[4] if isinstance(record.args, tuple) and len(record.args) == 5 else 0
+        return status >= 500 or random.random() < self.rate
+
+log_handler: Optional[LogQueueHandler] = None
+log_listener: Optional[LogQueueListener] = None
+log_stream: Optional[logging.Handler] = None
+
+def setup_logging():
+    """Send the root and uvicorn loggers through a queue written to stdout by a background thread"""
+    global log_handler, log_listener, log_stream
+    if log_listener is not None:
+        return
+    log_stream = logging.StreamHandler(sys.stdout)
+    if os.environ.get("LOG_FORMAT", "json") == "json":
+        log_stream.setFormatter(JsonFormatter())
+    else:
+        log_stream.setFormatter(logging.Formatter(TEXT_FORMAT))
+    log_queue = queue.Queue(maxsize=int(os.environ.get("LOG_QUEUE_SIZE", 10000)))
+    log_handler = LogQueueHandler(log_queue)
+
+    root = logging.getLogger()
+    root.handlers = [log_handler]
+    root.setLevel(os.environ.get("LOG_LEVEL", "INFO").upper())
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        logging.getLogger(name).handlers = []
+        logging.getLogger(name).propagate = True
+    logging.getLogger("uvicorn.access").addFilter(
+        AccessLogSampler(float(os.environ.get("LOG_REQUEST_SAMPLE_RATE", 1.0))))
+
+    log_listener = LogQueueListener(log_queue, log_stream)
+    log_listener.start()
+
+def stop_logging():
+    """Write out the queued records; later records are written directly"""
+    global log_listener
+    if log_listener is None:
+        return
+    log_listener.stop()
+    log_listener = None
+    root = logging.getLogger()
+    root.removeHandler(log_handler)
+    root.addHandler(log_stream)
+
+# Bản sao của DatabasePool trong app/server/dependency/db_connect.py (bỏ metrics Prometheus):
+# service này chạy độc lập từ thư mục api/ (import `model`, `function`), cấu hình bằng POSTGRES_HOST
+# thay vì server.config và không cài các phụ thuộc của app (psycopg 3, metrics), nên không import được
+# module đó. app/tests/test_api_copies.py kiểm tra hai bên vẫn khớp.
+class DatabasePool:
+    """
+    Thread-safe, blocking psycopg2 connection pool.
+
+    Up to `max_size` connections are opened lazily (`min_size` eagerly) and kept
+    open between requests. Callers wait up to `timeout` seconds when every
+    connection is checked out, connections idle for longer than `check_idle`
+    seconds are health-checked on checkout, and wait times are recorded.
+    """
+
+    def __init__(self, min_size: int, max_size: int, timeout: float, check_idle: float, **connect_kwargs):
+        if not 0 <= min_size <= max_size or max_size < 1:
+            raise ValueError("Pool sizes must satisfy 0 <= min_size <= max_size and max_size >= 1")
+
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.check_idle = check_idle
+        self._connect_kwargs = connect_kwargs
+
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._lock = threading.Lock()
+        # (connection, thời điểm trả về pool)
+        self._idle = deque()
+        self._closed = False
+
+        self._opened = 0
+        self._checkouts = 0
+        self._in_use = 0
+        self._timeouts = 0
+        self._discarded = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+        for _ in range(min_size):
+            self._idle.append((self._connect(), time.monotonic()))
+
+    def _connect(self):
+        conn = psycopg2.connect(**self._connect_kwargs)
+        with self._lock:
+            self._opened += 1
+        return conn
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+        with self._lock:
+            self._opened -= 1
+            self._discarded += 1
+
+    def getconn(self):
+        if self._closed:
+            raise PoolError("connection pool is closed")
+
+        start = time.perf_counter()
+        if not self._slots.acquire(timeout=self.timeout):
+            with self._lock:
+                self._timeouts += 1
+            raise PoolError(f"Timed out after {self.timeout}s waiting for a database connection")
+
+        try:
+            conn = self._checkout_healthy()
+        except Exception:
+            self._slots.release()
+            raise
+
+        waited = time.perf_counter() - start
+        with self._lock:
+            self._checkouts += 1
+            self._in_use += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+        return conn
+
+    def putconn(self, conn):
+        try:
+            if self._closed or conn.closed:
+                self._discard(conn)
+                return
+            status = conn.info.transaction_status
+            if status == psycopg2.extensions.TRANSACTION_STATUS_UNKNOWN:
+                # Mất kết nối tới server
+                self._discard(conn)
+                return
+            if status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    self._discard(conn)
+                    return
+            with self._lock:
+                self._idle.append((conn, time.monotonic()))
+        finally:
+            with self._lock:
+                self._in_use -= 1
+            self._slots.release()
+
+    def _checkout_healthy(self):
+        while True:
+            with self._lock:
+                item = self._idle.pop() if self._idle else None
+            if item is None:
+                return self._connect()
+
+            conn, returned_at = item
+            if self._is_healthy(conn, returned_at):
+                return conn
+            self._discard(conn)
+
+    def _is_healthy(self, conn, returned_at: float) -> bool:
+        if conn.closed:
+            return False
+        if time.monotonic() - returned_at < self.check_idle:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "opened": self._opened,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "checkouts": self._checkouts,
+                "timeouts": self._timeouts,
+                "discarded": self._discarded,
+                "wait_total_seconds": self._wait_total,
+                "wait_max_seconds": self._wait_max,
+                "wait_avg_seconds": self._wait_total / self._checkouts if self._checkouts else 0.0,
+            }
+
+    def close(self):
+        self._closed = True
+        with self._lock:
+            idle, self._idle = list(self._idle), deque()
+        for conn, _ in idle:
+            self._discard(conn)
+
+db_pool: Optional[DatabasePool] = None
+
+def init_db_pool() -> DatabasePool:
+    """Create the process-wide pool; called once at application startup."""
+    global db_pool
+    if db_pool is None:
+        db_pool = DatabasePool(
+            min_size=int(os.environ.get("DB_POOL_MIN_SIZE", 2)),
+            max_size=int(os.environ.get("DB_POOL_MAX_SIZE", 10)),
+            timeout=float(os.environ.get("DB_POOL_TIMEOUT", 10)),
+            check_idle=float(os.environ.get("DB_POOL_CHECK_IDLE", 30)),
+            host=os.environ.get("POSTGRES_HOST"),
+            database=os.environ.get("POSTGRES_DB"),
+            user=os.environ.get("POSTGRES_USER"),
+            password=os.environ.get("POSTGRES_PASSWORD"),
+            port=os.environ.get("POSTGRES_PORT")
+        )
+    return db_pool
+
+def close_db_pool():
+    global db_pool
+    if db_pool is not None:
+        db_pool.close()
+        db_pool = None
+
 def get_db_connection():
-    conn = psycopg2.connect(
-        host=os.environ.get("POSTGRES_HOST"),
-        database=os.environ.get("POSTGRES_DB"),
-        user=os.environ.get("POSTGRES_USER"),
-        password=os.environ.get("POSTGRES_PASSWORD"),
-        port=os.environ.get("POSTGRES_PORT")
-    )
-    return conn
-
-def get_list_ward_ids(
-    province_id: Optional[int],
-    district_id: Optional[int],
-    ward_id: Optional[int],
-    conn
-) -> List[int]:
+    """
+    Yield a pooled connection for the duration of a request.
+
+    The connection always goes back to the pool, whether the handler returns or raises.
+    """
+    if db_pool is None:
+        raise RuntimeError("Database pool is not initialised; call init_db_pool() at startup")
+
     try:
-        if ward_id is not None:
-            return [ward_id]
-
-        sql = """
-            SELECT w.id
-            FROM public.wards w
-            JOIN public.districts d ON w.district_id = d.id
-            JOIN public.provinces p ON d.province_id = p.id
-        """
-        conditions = []
-        params = []
-        if province_id is not None:
-            conditions.append("p.id = %s")
-            params.append(province_id)
-        if district_id is not None:
-            conditions.append("d.id = %s")
-            params.append(district_id)
-        if conditions:
-            sql += " WHERE " + " AND ".join(conditions)
+        conn = db_pool.getconn()
+    except PoolError as e:
+        raise HTTPException(status_code=503, detail=f"Database unavailable: {e}")
 
-        with conn.cursor() as cur:
-            cur.execute(sql, tuple(params))
-            ward_ids = [row[0] for row in cur.fetchall()]
-
-        return ward_ids
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to retrieve ward IDs: {e}")
-    
-def get_lists_environment_ids(
-    search: Optional[str],
-    conn
-) -> List[int]:
     try:
-        sql = "SELECT e.id FROM public.environment e"
-        params = []
+        yield conn
+    finally:
+        db_pool.putconn(conn)
 
-        if search is not None and str(search).strip() != "":
-            sql += " WHERE e.value ILIKE %s"
-            params.append(f"%{search}%")
+search_index_ready = False
 
+def has_search_index(conn) -> bool:
+    """Whether the full-text index of app/server migration 0003 exists in this database"""
+    global search_index_ready
+    # Chỉ nhớ kết quả khi đã có bảng: chạy migration sau khi service khởi động vẫn được dùng ngay
+    if not search_index_ready:
         with conn.cursor() as cur:
-            cur.execute(sql, tuple(params))
-            environment_ids = [row[0] for row in cur.fetchall()]
-
-        return environment_ids
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to retrieve environment IDs: {e}")
-    
-def save_log_actions(
-    action: str,
-    item_search: ItemSearch,
-    conn
-) -> int:
-    try:
-        sql = """
-            INSERT INTO public.log_actions (
-                action,
-                province_id,
-                district_id,
-                ward_id,
-                search_content,
-                persons,
-                price_min,
-                price_max,
-                acreage_min,
-                acreage_max,
-                house_type,
-                contract_period,
-                bedrooms,
-                living_rooms,
-                kitchens
-            )
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            RETURNING id
+            cur.execute("SELECT to_regclass('public.house_rent_search') IS NOT NULL")
+            search_index_ready = cur.fetchone()[0]
+    return search_index_ready
+
+def build_search_query(item_search: ItemSearch, text_index: bool = True) -> Tuple[str, List]:
+    """
+    One query for /search: the location hierarchy is a subquery and the text match uses
+    the full-text index (app/server migration 0003); both are left out when not requested.
+
+    With `search_content` the best matches (title, address, amenities) come first. Without
+    the index (`text_index=False`, migration not applied) the text is matched with ILIKE on
+    the title, address and amenity names instead, and results stay in id order.
+    """
+    search = item_search.search_content
+    has_text = search is not None and str(search).strip() != ""
+    ranked = has_text and text_index
+
+    sql = """
+        SELECT hr.id
+        FROM public.house_rent hr
+    """
+    if ranked:
+        sql += " JOIN public.house_rent_search hs ON hs.house_rent_id = hr.id"
+    sql += " WHERE hr.available = TRUE"
+    params: List = []
+
+    # ward_id được ưu tiên hơn district/province
+    if item_search.ward_id is not None:
+        sql += " AND hr.ward_id = %s"
+        params.append(item_search.ward_id)
+    elif item_search.district_id is not None or item_search.province_id is not None:
+        # ARRAY(...) chạy một lần (InitPlan) nên vẫn dùng được index theo ward_id như khi truyền mảng id
+        sql += """
+            AND hr.ward_id = ANY(ARRAY(
+                SELECT w.id
+                FROM public.wards w
+                JOIN public.districts d ON w.district_id = d.id
+                WHERE TRUE
         """
-        params = (
-            action,
-            item_search.province_id,
-            item_search.district_id,
-            item_search.ward_id,
-            item_search.search_content,
-            item_search.persons,
-            item_search.price_min,
-            item_search.price_max,
-            item_search.acreage_min,
-            item_search.acreage_max,
-            item_search.house_type,
-            item_search.contract_period,
-            item_search.bedrooms,
-            item_search.living_rooms,
-            item_search.kitchens,
-        )
+        if item_search.province_id is not None:
+            sql += " AND d.province_id = %s"
+            params.append(item_search.province_id)
+        if item_search.district_id is not None:
+            sql += " AND d.id = %s"
+            params.append(item_search.district_id)
+        sql += "))"
 
-        with conn.cursor() as cur:
-            cur.execute(sql, params)
-            row = cur.fetchone()
-            if not row:
-                conn.rollback()
-                raise HTTPException(status_code=500, detail="Failed to retrieve inserted id")
-            inserted_id = row[0]
-            conn.commit()
-        return inserted_id
+    if ranked:
+        # Không phân biệt dấu: "dieu hoa" khớp "điều hòa"
+        sql += " AND hs.document @@ public.search_tsquery(%s)"
+        params.append(search)
+    elif has_text:
+        sql += """
+            AND (hr.title ILIKE %s OR hr.address ILIKE %s OR EXISTS (
+                SELECT 1
+                FROM public.house_rent_environment hre
+                WHERE hre.house_rent_id = hr.id
+                  AND hre.environment_id = ANY(ARRAY(SELECT e.id FROM public.environment e WHERE e.value ILIKE %s))
+            ))
+        """
+        params.extend([f"%{search}%"] * 3)
+
+    if item_search.price_min is not None:
+        sql += " AND hr.price >= %s"
+        params.append(item_search.price_min)
+    if item_search.price_max is not None:
+        sql += " AND hr.price <= %s"
+        params.append(item_search.price_max)
+
+    if item_search.acreage_min is not None:
+        sql += " AND hr.acreage >= %s"
+        params.append(item_search.acreage_min)
+    if item_search.acreage_max is not None:
+        sql += " AND hr.acreage <= %s"
+        params.append(item_search.acreage_max)
+
+    if item_search.house_type is not None and str(item_search.house_type).strip() != "":
+        sql += " AND hr.house_type = %s"
+        params.append(item_search.house_type)
+
+    if item_search.contract_period is not None and str(item_search.contract_period).strip() != "":
+        sql += " AND hr.contract_period = %s"
+        params.append(item_search.contract_period)
+
+    if item_search.bedrooms is not None:
+        sql += " AND hr.bedrooms = %s"
+        params.append(item_search.bedrooms)
+
+    if item_search.living_rooms is not None:
+        sql += " AND hr.living_rooms = %s"
+        params.append(item_search.living_rooms)
+
+    if item_search.kitchens is not None:
+        sql += " AND hr.kitchens = %s"
+        params.append(item_search.kitchens)
+
+    if ranked:
+        sql += " ORDER BY ts_rank_cd(hs.document, public.search_tsquery(%s)) DESC, hr.id"
+        params.append(search)
+    else:
+        sql += " ORDER BY hr.id"
+    return sql, params
+
+LOG_ACTIONS_INSERT = """
+    INSERT INTO public.log_actions (
+        id,
+        action,
+        province_id,
+        district_id,
+        ward_id,
+        search_content,
+        persons,
+        price_min,
+        price_max,
+        acreage_min,
+        acreage_max,
+        house_type,
+        contract_period,
+        bedrooms,
+        living_rooms,
+        kitchens,
+        create_time,
+        update_time
+    )
+    VALUES %s
+"""
+
+LOG_ACTIONS_TEMPLATE = (
+    "(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s,"
+    " now() - %s * interval '1 second', now() - %s * interval '1 second')"
+)
+
+ACTIONS_RESULTS_COPY = "COPY public.actions_results (log_action_id, house_rent_id, house_rent_order) FROM STDIN"
+
+_STOP = object()
+
+class SearchLogWriter:
+    """
+    Write-behind queue for search logs (`log_actions` + `actions_results`).
+
+    Requests only enqueue; a background thread writes batches of searches with one
+    multi-row INSERT and one COPY, flushing when `batch_size` searches are queued or
+    `flush_interval` seconds after the first one. When the queue is full, `submit`
+    waits up to `put_timeout` seconds and then drops the entry (counted in `dropped`).
+    """
 
-    except HTTPException:
-        raise
-    except Exception as e:
+    def __init__(self, pool: DatabasePool, queue_size: int, batch_size: int, flush_interval: float, put_timeout: float):
+        self.pool = pool
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="search-log-writer", daemon=True)
+        self._submitted = 0
+        self._dropped = 0
+        self._written = 0
+        self._written_results = 0
+        self._batches = 0
+        self._failed = 0
+        self._flush_total = 0.0
+        self._flush_max = 0.0
+
+    def start(self):
+        self._thread.start()
+
+    def submit(self, action: str, item_search: ItemSearch, house_rent_ids: List[int]) -> bool:
+        entry = (action, item_search, house_rent_ids, time.monotonic())
         try:
-            conn.rollback()
-        except Exception:
-            pass
-        raise HTTPException(status_code=500, detail=f"Failed to save log actions: {e}")
-    
-def save_actions_results(
-    action_id: int,
-    house_rent_ids: List[int],
-    conn
-):
-    try:
-        sql = """
-            INSERT INTO public.actions_results (log_action_id, house_rent_id, house_rent_order)
-            VALUES (%s, %s, %s)
-        """
-        with conn.cursor() as cur:
-            for house_rent_id in house_rent_ids:
-                cur.execute(sql, (action_id, house_rent_id, house_rent_ids.index(house_rent_id)))
+            if self.put_timeout > 0:
+                self._queue.put(entry, timeout=self.put_timeout)
+            else:
+                self._queue.put_nowait(entry)
+        except queue.Full:
+            with self._lock:
+                self._dropped += 1
+            return False
+        with self._lock:
+            self._submitted += 1
+        return True
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch = []
+            deadline = None
+            while len(batch) < self.batch_size:
+                timeout = None if deadline is None else deadline - time.monotonic()
+                if timeout is not None and timeout <= 0:
+                    break
+                try:
+                    entry = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if entry is _STOP:
+                    stopping = True
+                    break
+                batch.append(entry)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+            if batch:
+                self._flush(batch)
+
+    def _flush(self, batch: list):
+        start = time.perf_counter()
+        try:
+            n_results = self._write(batch)
+        except Exception as e:
+            # Một bản ghi lỗi (vd. sai khóa ngoại) không được làm mất cả lô: ghi lại từng bản ghi
+            logger.warning("Failed to save %d search logs, retrying one by one: %s", len(batch), e)
+            n_results = 0
+            saved = []
+            for entry in batch:
+                try:
+                    n_results += self._write([entry])
+                    saved.append(entry)
+                except Exception:
+                    logger.exception("Failed to save search log")
+            with self._lock:
+                self._failed += len(batch) - len(saved)
+            batch = saved
+            if not batch:
+                return
+
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self._batches += 1
+            self._written += len(batch)
+            self._written_results += n_results
+            self._flush_total += elapsed
+            self._flush_max = max(self._flush_max, elapsed)
+
+    def _write(self, batch: list) -> int:
+        conn = self.pool.getconn()
+        try:
+            with conn.cursor() as cur:
+                # Cấp trước id cho cả lô để ghi actions_results mà không cần RETURNING từng dòng
+                cur.execute(
+                    "SELECT nextval(pg_get_serial_sequence('public.log_actions', 'id')) FROM generate_series(1, %s)",
+                    (len(batch),)
+                )
+                action_ids = [row[0] for row in cur.fetchall()]
+
+                now = time.monotonic()
+                rows = []
+                results = io.StringIO()
+                n_results = 0
+                for action_id, (action, item, house_rent_ids, queued_at) in zip(action_ids, batch):
+                    # create_time giữ thời điểm tìm kiếm, không phải thời điểm ghi
+                    age = now - queued_at
+                    rows.append((
+                        action_id, action, item.province_id, item.district_id, item.ward_id,
+                        item.search_content, item.persons, item.price_min, item.price_max,
+                        item.acreage_min, item.acreage_max, item.house_type, item.contract_period,
+                        item.bedrooms, item.living_rooms, item.kitchens, age, age
+                    ))
+                    for order, house_rent_id in enumerate(house_rent_ids):
+                        results.write(f"{action_id}\t{house_rent_id}\t{order}\n")
+                    n_results += len(house_rent_ids)
+
+                psycopg2.extras.execute_values(cur, LOG_ACTIONS_INSERT, rows, template=LOG_ACTIONS_TEMPLATE, page_size=len(rows))
+                results.seek(0)
+                cur.copy_expert(ACTIONS_RESULTS_COPY, results)
             conn.commit()
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to save actions results: {e}")
\ No newline at end of file
+            return n_results
+        except Exception:
+            try:
+                conn.rollback()
+            except Exception:
+                pass
+            raise
+        finally:
+            self.pool.putconn(conn)
+
+    def close(self, timeout: float = 10.0):
+        """Stop the writer after flushing everything already queued"""
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "queued": self._queue.qsize(),
+                "queue_size": self._queue.maxsize,
+                "batch_size": self.batch_size,
+                "flush_interval_seconds": self.flush_interval,
+                "submitted": self._submitted,
+                "dropped": self._dropped,
+                "written": self._written,
+                "written_results": self._written_results,
+                "failed": self._failed,
+                "batches": self._batches,
+                "flush_avg_seconds": self._flush_total / self._batches if self._batches else 0.0,
+                "flush_max_seconds": self._flush_max,
+            }
+
+search_log_writer: Optional[SearchLogWriter] = None
+
+def start_search_log_writer(pool: DatabasePool) -> SearchLogWriter:
+    global search_log_writer
+    if search_log_writer is None:
+        search_log_writer = SearchLogWriter(
+            pool,
+            queue_size=int(os.environ.get("SEARCH_LOG_QUEUE_SIZE", 10000)),
+            batch_size=int(os.environ.get("SEARCH_LOG_BATCH_SIZE", 200)),
+            flush_interval=float(os.environ.get("SEARCH_LOG_FLUSH_INTERVAL", 1.0)),
+            put_timeout=float(os.environ.get("SEARCH_LOG_PUT_TIMEOUT", 0)),
+        )
+        search_log_writer.start()
+    return search_log_writer
+
+def stop_search_log_writer():
+    global search_log_writer
+    if search_log_writer is not None:
+        search_log_writer.close()
+        search_log_writer = None
+
+def search_log_stats() -> dict:
+    return search_log_writer.stats() if search_log_writer is not None else {"status": "stopped"}
+
+def log_search(action: str, item_search: ItemSearch, house_rent_ids: List[int]) -> bool:
+    """Queue a search and its ordered results for logging; False if the entry was dropped"""
+    # Writer được khởi động cùng pool lúc startup; ngoài lifespan (đang tắt) thì bỏ qua
+    if search_log_writer is None:
+        return False
+    return search_log_writer.submit(action, item_search, house_rent_ids)
@@ -0,0 +1,140 @@
+"""
+/dss/compare scoring: the previous pandas pipeline (two DataFrames, `pd.merge` on `id`,
+`sort_values`, `to_dict('records')`) against the NumPy one in `routers.dss`, at
+10 / 100 / 1,000 / 10,000 houses. Reports the median latency per request, the peak
+memory traced by `tracemalloc` during one request, and whether the serialized
+responses are byte-identical.
+
+Run from the `app/` directory (10,000 houses needs a database that large, e.g. a copy
+pointed to with POSTGRES_DB):
+
+    python -m benchmarks.compare_pipeline
+"""
+import argparse
+import json
+import time
+import timeit
+import tracemalloc
+from typing import Any, Callable, Dict
+
+import numpy as np
+import pandas as pd
+
+from server.logic.amenity import AmenityBitset
+from server.logic.geo import haversine_km, fill_missing_distances
+from server.logic.house import HouseService
+from server.logic.topsis import TOPSIS
+from server.model.models import CompareRequest
+from server.routers.dss import COMPARE_RESPONSE, CRITERIA_COLUMNS, CRITERIA_TYPES, _amenity_weight_map, \
+    _rank_houses, _topsis_weights
+from server.utils.fast_json import dumps
+
+from .explain_search import RESULTS_DIR, connect
+
+SIZES = (10, 100, 1000, 10000)
+
+
+def pandas_rank_houses(houses: list, request: CompareRequest) -> Dict[str, Any]:
+    """`_rank_houses` as it was before the NumPy rewrite"""
+    houses_df = pd.DataFrame(houses)
+    amenity_bits = AmenityBitset.from_houses(houses)
+
+    df = pd.DataFrame(houses)
+    dss_matrix = df[['id']].copy()
+    dss_matrix['price'] = df['price']
+    dss_matrix['acreage'] = df['acreage']
+    dss_matrix['acreage_ratio'] = df['acreage'] / df['price']
+    dss_matrix['amenities_w'] = amenity_bits.weights(_amenity_weight_map(request))
+    dss_matrix['amenities_ratio'] = dss_matrix['amenities_w'] / df['price']
+    prefer_location = request.prefer_location
+    dss_matrix['distance_to_prefer_location'] = fill_missing_distances(haversine_km(
+        df['latitude'].to_numpy(dtype=float, na_value=np.nan), df['longitude'].to_numpy(dtype=float, na_value=np.nan),
+        prefer_location[0], prefer_location[1]
+    ))
+
+    houses_df = pd.merge(houses_df, dss_matrix[['id', 'acreage_ratio', 'amenities_w', 'amenities_ratio',
+                                                'distance_to_prefer_location']], on='id')
+    catalog = {env['id']: env for house in houses for env in house['environments']}
+    houses_df['matched_amenities'] = [
+        [catalog[env_id] for env_id in env_ids] for env_ids in amenity_bits.matched(request.amenities)
+    ]
+
+    topsis = TOPSIS(houses_df[CRITERIA_COLUMNS].to_numpy(), _topsis_weights(request.topsis_weight), CRITERIA_TYPES)
+    houses_df['topsis_score'] = topsis.solve()
+    houses_df = houses_df.sort_values(by='topsis_score', ascending=False).reset_index(drop=True)
+    houses_df['rank'] = houses_df.index + 1
+
+    ideal_best_raw, ideal_worst_raw = topsis.find_ideal_solutions_raw()
+    return {
+        "ranked_houses": houses_df.to_dict('records'),
+        "ideal_best": dict(zip(CRITERIA_COLUMNS, ideal_best_raw)),
+        "ideal_worst": dict(zip(CRITERIA_COLUMNS, ideal_worst_raw))
+    }
+
+
+def load_houses(conn, n: int) -> list:
+    with conn.cursor() as cur:
+        cur.execute("SELECT id FROM house_rent WHERE available ORDER BY id LIMIT %s", (n,))
+        ids = [row[0] for row in cur.fetchall()]
+    return HouseService.get_multiple_houses_by_ids(conn, ids)
+
+
+def measure(function: Callable, houses: list, request: CompareRequest, min_time: float) -> float:
+    """Median seconds per call"""
+    timer = timeit.Timer(lambda: function(houses, request))
+    number, _ = timer.autorange()
+    number = max(1, int(number * min_time / 0.2))
+    runs = sorted(timer.repeat(repeat=5, number=number))
+    return runs[2] / number
+
+
+def peak_allocated(function: Callable, houses: list, request: CompareRequest) -> int:
+    """Peak bytes allocated (Python objects and NumPy buffers) during one call"""
+    tracemalloc.start()
+    try:
+        function(houses, request)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.compare_pipeline", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES), help="numbers of houses to compare")
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds per timing run")
+    args = parser.parse_args()
+
+    conn = connect()
+    try:
+        cases = {n: load_houses(conn, n) for n in args.sizes}
+    finally:
+        conn.close()
+
+    results = {}
+    print(f"{'houses':>7s} {'pandas ms':>10s} {'numpy ms':>9s} {'speedup':>8s} {'pandas peak':>12s} "
+          f"{'numpy peak':>11s}  same bytes")
+    for n, houses in cases.items():
+        request = CompareRequest(house_rent_ids=[house['id'] for house in houses], amenities=[1, 2, 3, 4, 5],
+                                 weights=[5, 4, 3, 2, 1], topsis_weight=[1, 1, 1, 1, 1, 1],
+                                 prefer_location=[21.0285, 105.8542])
+        same = dumps(COMPARE_RESPONSE, pandas_rank_houses(houses, request)) == \
+            dumps(COMPARE_RESPONSE, _rank_houses(houses, request))
+        pandas_s = measure(pandas_rank_houses, houses, request, args.min_time)
+        numpy_s = measure(_rank_houses, houses, request, args.min_time)
+        pandas_peak = peak_allocated(pandas_rank_houses, houses, request)
+        numpy_peak = peak_allocated(_rank_houses, houses, request)
+        results[len(houses)] = {"pandas_ms": pandas_s * 1e3, "numpy_ms": numpy_s * 1e3, "speedup": pandas_s / numpy_s,
+                                "pandas_peak_bytes": pandas_peak, "numpy_peak_bytes": numpy_peak, "same_bytes": same}
+        print(f"{len(houses):7d} {pandas_s * 1e3:10.2f} {numpy_s * 1e3:9.2f} {pandas_s / numpy_s:7.2f}x "
+              f"{pandas_peak / 1024:10.0f}KB {numpy_peak / 1024:9.0f}KB  {same}")
+
+    RESULTS_DIR.mkdir(exist_ok=True)
+    path = RESULTS_DIR / "compare_pipeline.json"
+    path.write_text(json.dumps({"created_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "results": results}, indent=2),
+                    encoding="utf-8")
+    print(f"\nWrote {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,419 @@
+"""
+Synthetic listings for load tests: grow `house_rent` and `house_rent_environment` of a
+database restored from `data/dump/db-dump.sql` to 100k, 1M or 10M listings.
+
+Every generated listing is drawn from a scraped listing in `data/raw/*.csv` whose address
+resolves to a ward of the database (the location tables cover Hà Nội only), keeping its
+title, address, ward and the amenities its title mentions (the keyword rules of the
+pre-processing notebook). Price, acreage and publication date are jittered around the
+scraped values and coordinates scattered around the ward's centroid, so the price,
+acreage, ward and amenity distributions follow the scraped data. The same `--seed` gives
+the same rows.
+
+Generated ids start at `SYNTHETIC_ID_START`; running again tops the table up to
+`--rows`, and `--reset` removes them. Run from the `app/` directory:
+
+    python -m benchmarks.dataset --create system_1m --rows 1000000
+    POSTGRES_DB=system_1m python -m benchmarks.load_test --workload mixed
+
+`--create` copies the configured database (POSTGRES_DB, with the migrations applied)
+as a template, so nothing else may be connected to it meanwhile. Loading runs with
+`session_replication_role = replica` (triggers off; the full-text index and the listing
+read model are rebuilt afterwards), which needs a superuser such as the `admin` of the
+docker setup.
+"""
+import argparse
+import csv
+import datetime
+import io
+import re
+import time
+import unicodedata
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from psycopg2 import sql
+
+from server.config import settings
+
+from .explain_search import connect
+
+RAW_DIR = Path(__file__).resolve().parents[2] / "data" / "raw"
+
+SYNTHETIC_ID_START = 10_000_000
+SIZES = {"100k": 100_000, "1m": 1_000_000, "10m": 10_000_000}
+
+# Từ khóa trong tiêu đề -> tiện ích (giống notebook tiền xử lý dữ liệu)
+AMENITY_KEYWORDS = {
+    3: ("KHÉP KÍN",),
+    4: ("ĐIỀU HÒA", "ĐH"),
+    5: ("NÓNG LẠNH", "NL"),
+    6: ("GIƯỜNG TỦ",),
+    7: ("ĐỦ ĐỒ", "ĐẦY ĐỦ", "FULL ĐỒ"),
+    8: ("KHÔNG CHUNG CHỦ",),
+    9: ("GÁC XÉP", "GIƯỜNG TẦNG"),
+    10: ("MỚI",),
+    11: ("AN NINH",),
+    12: ("THANG MÁY",),
+    13: ("MÁY GIẶT",),
+    14: ("SẠCH SẼ",),
+    15: ("THOÁNG MÁT",),
+    16: ("ĐIỆN NƯỚC", "ĐIỆN GIÁ DÂN"),
+    17: ("BAN CÔNG",),
+    18: ("GIỜ GIẤC TỰ DO",),
+    19: ("VỆ SINH KHÉP KÍN", "WC KHÉP KÍN"),
+    20: ("BẾP RIÊNG",),
+    21: ("Ô TÔ",),
+    22: ("CAMERA",),
+    23: ("ĐẸP",),
+}
+
+HOUSE_COLUMNS = ["id", "available", "published", "price", "acreage", "address", "house_number", "street", "ward_id",
+                 "latitude", "longitude", "title", "phone_number", "house_type", "contract_period", "bedrooms",
+                 "living_rooms", "kitchens"]
+LINK_COLUMNS = ["id", "house_rent_id", "environment_id"]
+
+# Độ lệch khi sinh: giá/diện tích nhân với lognormal(0, sigma), tọa độ cộng thêm N(0, độ)
+PRICE_SIGMA = 0.1
+ACREAGE_SIGMA = 0.1
+COORDINATE_SIGMA = 0.004
+PUBLISHED_DAYS = 180
+
+
+def _upper(value: str) -> str:
+    return unicodedata.normalize("NFC", value).upper().strip()
+
+
+def house_type_of(title: str) -> str:
+    if "CĂN HỘ" in title or "STUDIO" in title:
+        return "CĂN HỘ DỊCH VỤ"
+    if "MINI" in title or "CCMN" in title:
+        return "CHUNG CƯ MINI"
+    if "PHÒNG" in title or "TRỌ" in title:
+        return "PHÒNG TRỌ"
+    if "NHÀ" in title:
+        return "NHÀ NGUYÊN CĂN"
+    return "PHÒNG TRỌ"
+
+
+def rooms_of(title: str) -> Tuple[Optional[int], Optional[int], Optional[int]]:
+    bedrooms = next((n for n in (1, 2, 3, 4) if f"{n} NGỦ" in title or f"{n}N" in title), None)
+    living_rooms = 1 if "1 KHÁCH" in title or "1K" in title else 2 if "2 KHÁCH" in title else None
+    kitchens = next((n for n in (1, 2) if f"{n} BẾP" in title), None)
+    return bedrooms, living_rooms, kitchens
+
+
+def split_street(address: str) -> Tuple[Optional[str], Optional[str]]:
+    """(house number, street) of "12 Đường X, Phường ..., Quận ..., Hà Nội" """
+    parts = [_upper(part) for part in address.split(",")]
+    if len(parts) < 4:
+        return None, None
+    number, _, name = parts[-4].rpartition("ĐƯỜNG")
+    if not name.strip():
+        return None, parts[-4] or None
+    return number.strip() or None, name.strip()
+
+
+def amenities_of(title: str) -> Tuple[int, ...]:
+    return tuple(env_id for env_id, keywords in AMENITY_KEYWORDS.items() if any(k in title for k in keywords))
+
+
+@dataclass
+class Wards:
+    """Ward ids by (district, ward) name and the centroid of each ward's existing listings"""
+    ids: Dict[Tuple[str, str], int]
+    centroids: Dict[int, Tuple[float, float]]
+
+    @classmethod
+    def load(cls, conn) -> "Wards":
+        with conn.cursor() as cur:
+            cur.execute("SELECT w.id, d.name, w.name FROM wards w JOIN districts d ON w.district_id = d.id")
+            ids = {(_upper(district), _upper(ward)): ward_id for ward_id, district, ward in cur.fetchall()}
+            # Tin chưa có tọa độ ở phường thì lấy tâm của quận
+            cur.execute("""
+                SELECT w.id,
+                       coalesce(avg(hr.latitude), avg(avg(hr.latitude)) OVER (PARTITION BY w.district_id)),
+                       coalesce(avg(hr.longitude), avg(avg(hr.longitude)) OVER (PARTITION BY w.district_id))
+                FROM wards w
+                LEFT JOIN house_rent hr ON hr.ward_id = w.id AND hr.id < %s
+                GROUP BY w.id, w.district_id
+            """, (SYNTHETIC_ID_START,))
+            centroids = {ward_id: (lat, lon) for ward_id, lat, lon in cur.fetchall() if lat is not None}
+        return cls(ids, centroids)
+
+    def resolve(self, address: str) -> Optional[int]:
+        """Ward id of a scraped address ("..., Phường X, Quận Y, Hà Nội"), if it is in the database"""
+        parts = [_upper(part) for part in address.split(",")]
+        if len(parts) < 3:
+            return None
+        district = re.sub(r"^(QUẬN|HUYỆN|THỊ XÃ)\s+", "", parts[-2])
+        ward = re.sub(r"^(PHƯỜNG|XÃ|THỊ TRẤN)\s+", "", parts[-3])
+        return self.ids.get((district, ward))
+
+
+@dataclass
+class Profiles:
+    """The scraped listings generated rows are drawn from, column by column"""
+    title: List[str]
+    address: List[str]
+    house_number: List[Optional[str]]
+    street: List[Optional[str]]
+    house_type: List[str]
+    rooms: List[Tuple[Optional[int], Optional[int], Optional[int]]]
+    amenities: List[Tuple[int, ...]]
+    ward_id: np.ndarray
+    latitude: np.ndarray
+    longitude: np.ndarray
+    price: np.ndarray
+    acreage: np.ndarray
+    published: np.ndarray  # ngày dạng ordinal
+
+    def __len__(self):
+        return len(self.title)
+
+
+def load_profiles(raw_dir: Path, wards: Wards) -> Profiles:
+    rows = []
+    for path in sorted(raw_dir.glob("*.csv")):
+        with open(path, encoding="utf-8", newline="") as f:
+            for row in csv.DictReader(f):
+                ward_id = wards.resolve(row["address"])
+                if ward_id is None:
+                    continue
+                try:
+                    price, acreage = float(row["price"]), float(row["acreage"])
+                    published = datetime.datetime.strptime(row["published"], "%d/%m/%Y").date()
+                except ValueError:
+                    continue
+                # Bỏ các giá trị nhập sai (giá tính theo triệu đồng)
+                if not (0 < price <= 100 and 5 <= acreage <= 500):
+                    continue
+                rows.append((row, ward_id, price, acreage, published))
+    if not rows:
+        raise SystemExit(f"No listing in {raw_dir}/*.csv has an address matching a ward of the database")
+
+    title, address, house_number, street, house_type, rooms, amenities = [], [], [], [], [], [], []
+    for row, *_ in rows:
+        upper = _upper(row["title"])
+        number, name = split_street(row["address"])
+        title.append(row["title"])
+        address.append(row["address"])
+        house_number.append(number)
+        street.append(name)
+        house_type.append(house_type_of(upper))
+        rooms.append(rooms_of(upper))
+        amenities.append(amenities_of(upper))
+
+    ward_id = np.array([r[1] for r in rows], dtype=np.int64)
+    centroid = np.array([wards.centroids.get(w, (np.nan, np.nan)) for w in ward_id.tolist()], dtype=float)
+    return Profiles(
+        title=title, address=address, house_number=house_number, street=street, house_type=house_type, rooms=rooms, amenities=amenities,
+        ward_id=ward_id, latitude=centroid[:, 0], longitude=centroid[:, 1],
+        price=np.array([r[2] for r in rows]), acreage=np.array([r[3] for r in rows]),
+        published=np.array([r[4].toordinal() for r in rows], dtype=np.int64),
+    )
+
+
+def _copy(cur, table: str, columns: List[str], rows) -> None:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+    cur.copy_expert(f"COPY public.{table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+
+def generate_chunk(profiles: Profiles, rng: np.random.Generator, first_id: int, first_link_id: int, n: int,
+                   available_ratio: float) -> Tuple[list, list]:
+    """`n` house_rent rows from `first_id` on, and their house_rent_environment rows"""
+    pick = rng.integers(0, len(profiles), size=n)
+    price = np.maximum(np.round(profiles.price[pick] * rng.lognormal(0, PRICE_SIGMA, n), 1), 0.1)
+    acreage = np.maximum(np.round(profiles.acreage[pick] * rng.lognormal(0, ACREAGE_SIGMA, n)), 5)
+    today = datetime.date.today().toordinal()
+    published = np.minimum(profiles.published[pick] + rng.integers(-PUBLISHED_DAYS, PUBLISHED_DAYS + 1, n), today)
+    latitude = profiles.latitude[pick] + rng.normal(0, COORDINATE_SIGMA, n)
+    longitude = profiles.longitude[pick] + rng.normal(0, COORDINATE_SIGMA, n)
+    available = rng.random(n) < available_ratio
+    contract_period = np.where(rng.random(n) < 0.5, "6 THÁNG", "12 THÁNG")
+    phone = rng.integers(0, 10 ** 9, n)
+
+    houses, links = [], []
+    link_id = first_link_id
+    for i, p in enumerate(pick.tolist()):
+        house_id = first_id + i
+        lat, lon = latitude[i], longitude[i]
+        houses.append((
+            house_id, available[i], datetime.date.fromordinal(int(published[i])), price[i], acreage[i],
+            profiles.address[p], profiles.house_number[p], profiles.street[p], profiles.ward_id[p],
+            None if np.isnan(lat) else round(lat, 6), None if np.isnan(lon) else round(lon, 6),
+            profiles.title[p], f"0{phone[i]:09d}", profiles.house_type[p], contract_period[i], *profiles.rooms[p],
+        ))
+        for env_id in profiles.amenities[p]:
+            links.append((link_id, house_id, env_id))
+            link_id += 1
+    return houses, links
+
+
+def _has_table(cur, name: str) -> bool:
+    cur.execute("SELECT to_regclass(%s) IS NOT NULL", (f"public.{name}",))
+    return cur.fetchone()[0]
+
+
+# Cùng nội dung với refresh_house_rent_read (migration 0004), gom tiện ích một lần cho cả khoảng id
+READ_MODEL_INSERT = """
+    INSERT INTO public.house_rent_read (house_rent_id, ward_name, district_id, district_name, province_id,
+                                        province_name, environments)
+    SELECT hr.id, w.name, d.id, d.name, p.id, p.name, coalesce(env.environments, '[]')
+    FROM public.house_rent hr
+             LEFT JOIN public.wards w ON hr.ward_id = w.id
+             LEFT JOIN public.districts d ON w.district_id = d.id
+             LEFT JOIN public.provinces p ON d.province_id = p.id
+             LEFT JOIN (SELECT hre.house_rent_id,
+                               json_agg(json_build_object('house_rent_id', hre.house_rent_id, 'id', e.id,
+                                                          'category', e.category, 'value', e.value)
+                                        ORDER BY e.id) AS environments
+                        FROM public.house_rent_environment hre
+                                 JOIN public.environment e ON hre.environment_id = e.id
+                        WHERE hre.house_rent_id >= %s
+                        GROUP BY hre.house_rent_id) env ON env.house_rent_id = hr.id
+    WHERE hr.id >= %s
+    ON CONFLICT (house_rent_id) DO UPDATE SET ward_name     = excluded.ward_name,
+                                              district_id   = excluded.district_id,
+                                              district_name = excluded.district_name,
+                                              province_id   = excluded.province_id,
+                                              province_name = excluded.province_name,
+                                              environments  = excluded.environments
+"""
+
+
+def populate(conn, rows: int, profiles: Profiles, seed: int, chunk_size: int, available_ratio: float) -> int:
+    """Add synthetic listings until `house_rent` holds `rows`; returns the number added"""
+    with conn.cursor() as cur:
+        cur.execute("SELECT count(*), coalesce(max(id), 0) FROM house_rent")
+        existing, max_id = cur.fetchone()
+        cur.execute("SELECT coalesce(max(id), 0) FROM house_rent_environment")
+        max_link_id = cur.fetchone()[0]
+    missing = rows - existing
+    if missing <= 0:
+        print(f"house_rent already has {existing} rows")
+        return 0
+
+    first_id = max(SYNTHETIC_ID_START, max_id + 1)
+    # Hạt giống theo id đầu tiên: chạy bổ sung nhiều lần vẫn tái lập được
+    rng = np.random.default_rng([seed, first_id])
+    link_id = max(SYNTHETIC_ID_START, max_link_id + 1)
+    started = time.perf_counter()
+    with conn.cursor() as cur:
+        # Tắt trigger (chỉ mục full-text và read model được dựng lại một lần ở cuối) và kiểm tra khóa ngoại khi nạp
+        cur.execute("SET session_replication_role = replica")
+        try:
+            for offset in range(0, missing, chunk_size):
+                n = min(chunk_size, missing - offset)
+                houses, links = generate_chunk(profiles, rng, first_id + offset, link_id, n, available_ratio)
+                _copy(cur, "house_rent", HOUSE_COLUMNS, houses)
+                _copy(cur, "house_rent_environment", LINK_COLUMNS, links)
+                link_id += len(links)
+                conn.commit()
+                done = offset + n
+                print(f"  {done:>10d} / {missing} rows  ({done / (time.perf_counter() - started):,.0f} rows/s)")
+        finally:
+            cur.execute("SET session_replication_role = DEFAULT")
+            conn.commit()
+
+        if _has_table(cur, "house_rent_search"):
+            print("  indexing for full-text search")
+            cur.execute("""
+                INSERT INTO public.house_rent_search (house_rent_id, document)
+                SELECT hr.id, public.house_rent_search_document(hr.id, hr.title, hr.address)
+                FROM public.house_rent hr
+                WHERE hr.id >= %s
+                ON CONFLICT (house_rent_id) DO UPDATE SET document = excluded.document
+            """, (first_id,))
+        if _has_table(cur, "house_rent_read"):
+            print("  building the listing read model")
+            cur.execute(READ_MODEL_INSERT, (first_id, first_id))
+        cur.execute("SELECT setval(pg_get_serial_sequence('public.house_rent_environment', 'id'), %s)", (link_id - 1,))
+        conn.commit()
+    _analyze(conn)
+    print(f"Added {missing} listings in {time.perf_counter() - started:.1f}s")
+    return missing
+
+
+def reset(conn) -> int:
+    """Remove the synthetic listings; returns the number removed"""
+    with conn.cursor() as cur:
+        cur.execute("DELETE FROM actions_results WHERE house_rent_id >= %s", (SYNTHETIC_ID_START,))
+        cur.execute("DELETE FROM house_rent_environment WHERE house_rent_id >= %s", (SYNTHETIC_ID_START,))
+        if _has_table(cur, "house_rent_search"):
+            cur.execute("DELETE FROM house_rent_search WHERE house_rent_id >= %s", (SYNTHETIC_ID_START,))
+        cur.execute("DELETE FROM house_rent WHERE id >= %s", (SYNTHETIC_ID_START,))
+        removed = cur.rowcount
+        cur.execute("SELECT setval(pg_get_serial_sequence('public.house_rent_environment', 'id'), coalesce(max(id), 1))"
+                    " FROM house_rent_environment")
+    conn.commit()
+    _analyze(conn)
+    return removed
+
+
+def _analyze(conn) -> None:
+    with conn.cursor() as cur:
+        cur.execute("ANALYZE house_rent")
+        cur.execute("ANALYZE house_rent_environment")
+        if _has_table(cur, "house_rent_search"):
+            cur.execute("ANALYZE house_rent_search")
+        if _has_table(cur, "house_rent_read"):
+            cur.execute("ANALYZE house_rent_read")
+    conn.commit()
+
+
+def create_database(name: str) -> None:
+    """Copy the configured database under `name`"""
+    conn = connect()
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            cur.execute(sql.SQL("CREATE DATABASE {} TEMPLATE {}").format(
+                sql.Identifier(name), sql.Identifier(settings.db_name)))
+    finally:
+        conn.close()
+
+
+def _rows(value: str) -> int:
+    return SIZES.get(value.lower()) or int(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.dataset", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=_rows, default=SIZES["100k"],
+                        help="listings house_rent should hold in the end (a number, or 100k / 1m / 10m)")
+    parser.add_argument("--create", default=None, metavar="NAME",
+                        help="copy the configured database to NAME first and load into the copy")
+    parser.add_argument("--reset", action="store_true", help="remove the synthetic listings and exit")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--chunk-size", type=int, default=100_000, help="rows per COPY (and transaction)")
+    parser.add_argument("--available-ratio", type=float, default=0.95, help="share of listings still available")
+    parser.add_argument("--raw-dir", type=Path, default=RAW_DIR, help="directory of the scraped *.csv files")
+    args = parser.parse_args()
+
+    if args.create:
+        create_database(args.create)
+        settings.db_name = args.create
+        print(f"Created database {args.create}")
+
+    conn = connect()
+    try:
+        if args.reset:
+            print(f"Removed {reset(conn)} synthetic listings")
+            return
+        wards = Wards.load(conn)
+        profiles = load_profiles(args.raw_dir, wards)
+        print(f"{len(profiles)} scraped listings over {len(set(profiles.ward_id.tolist()))} wards; "
+              f"loading into {settings.db_name}")
+        populate(conn, args.rows, profiles, args.seed, args.chunk_size, args.available_ratio)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
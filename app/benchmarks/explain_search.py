@@ -0,0 +1,203 @@
+"""
+EXPLAIN ANALYZE the queries built by `HouseService` and record plans and timings.
+
+Run from the `app/` directory:
+
+    python -m benchmarks.explain_search --label before
+    python -m server.migrations
+    python -m benchmarks.explain_search --label after --compare benchmarks/results/explain_before.json
+
+or in one go (measure, apply pending migrations, measure again):
+
+    python -m benchmarks.explain_search --migrate
+"""
+import argparse
+import json
+import statistics
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import psycopg2
+
+from server.config import settings
+from server.logic.house import HouseService
+from server.migrations import migrate
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+
+def connect():
+    return psycopg2.connect(
+        host=settings.db_host,
+        port=settings.db_port,
+        database=settings.db_name,
+        user=settings.db_user,
+        password=settings.db_password,
+    )
+
+
+def _scalar(conn, query: str, params=None):
+    with conn.cursor() as cur:
+        cur.execute(query, params)
+        row = cur.fetchone()
+    return row[0] if row else None
+
+
+def sample_values(conn) -> Dict[str, Any]:
+    """Pick realistic filter values from the data so the variants hit real rows"""
+    most_common = "SELECT {col} FROM house_rent WHERE available AND {col} IS NOT NULL GROUP BY 1 ORDER BY count(*) DESC LIMIT 1"
+    ward_id = _scalar(conn, most_common.format(col="ward_id"))
+    return {
+        "ward_id": ward_id,
+        "district_id": _scalar(conn, "SELECT district_id FROM wards WHERE id = %s", (ward_id,)),
+        "province_id": _scalar(conn, "SELECT d.province_id FROM wards w JOIN districts d ON w.district_id = d.id WHERE w.id = %s", (ward_id,)),
+        "house_type": _scalar(conn, most_common.format(col="house_type")),
+        "contract_period": _scalar(conn, most_common.format(col="contract_period")),
+        "bedrooms": _scalar(conn, most_common.format(col="bedrooms")),
+        "median_price": float(_scalar(conn, "SELECT percentile_cont(0.5) WITHIN GROUP (ORDER BY price) FROM house_rent WHERE available") or 0),
+        "deep_offset": int(_scalar(conn, "SELECT count(*) FROM house_rent WHERE available") or 0) * 9 // 10,
+        "last_id": int(_scalar(conn, "SELECT percentile_disc(0.9) WITHIN GROUP (ORDER BY id) FROM house_rent WHERE available") or 0),
+        "center": (21.0285, 105.8542),
+        "amenities": [row for row in _column(conn, "SELECT environment_id FROM house_rent_environment GROUP BY 1 ORDER BY count(*) DESC LIMIT 2")],
+        "ids": _column(conn, "SELECT id FROM house_rent WHERE available ORDER BY random() LIMIT 20"),
+    }
+
+
+def _column(conn, query: str) -> List:
+    with conn.cursor() as cur:
+        cur.execute(query)
+        return [row[0] for row in cur.fetchall()]
+
+
+def variants(values: Dict[str, Any]) -> List[Tuple[str, str, list]]:
+    """(name, query, params) for each search shape the API produces"""
+    price = values["median_price"]
+    lat, lon = values["center"]
+    searches = {
+        "first_page": {},
+        "province": {"province_id": values["province_id"]},
+        "district_price": {"district_id": values["district_id"], "min_price": price * 0.5, "max_price": price * 1.5},
+        "ward": {"ward_id": values["ward_id"]},
+        "ward_price": {"ward_id": values["ward_id"], "max_price": price},
+        "price_acreage": {"min_price": price * 0.8, "max_price": price * 1.2, "min_acreage": 20, "max_acreage": 60},
+        "type_period_bedrooms": {"house_type": values["house_type"], "contract_period": values["contract_period"],
+                                 "bedrooms": values["bedrooms"]},
+        "amenities_all": {"amenities": values["amenities"], "amenities_match": "all"},
+        "amenities_any": {"amenities": values["amenities"], "amenities_match": "any"},
+        "radius_2km": {"latitude": lat, "longitude": lon, "radius_km": 2.0},
+        "nearest": {"latitude": lat, "longitude": lon, "order_by": "distance"},
+        "text": {"q": "dieu hoa", "order_by": "relevance"},
+        "text_ward": {"q": "dieu hoa", "ward_id": values["ward_id"], "order_by": "relevance"},
+        "deep_offset": {"offset": values["deep_offset"]},
+        "deep_keyset": {"after": {"id": values["last_id"]}},
+    }
+
+    result = []
+    for name, filters in searches.items():
+        query, params = HouseService.build_search_query(**{"limit": 10, **filters})
+        result.append((f"search.{name}", query, params))
+
+    result.append(("houses_by_ids", HouseService.HOUSES_BY_IDS_QUERY, [values["ids"]]))
+    query, params = HouseService.build_feature_query({env_id: 100.0 for env_id in values["amenities"]},
+                                                     district_id=values["district_id"])
+    result.append(("features.district", query, params))
+    return result
+
+
+def _walk(node: Dict) -> List[Dict]:
+    nodes = [node]
+    for child in node.get("Plans", []):
+        nodes.extend(_walk(child))
+    return nodes
+
+
+def summarize(plan: Dict) -> Dict[str, Any]:
+    nodes = _walk(plan["Plan"])
+    return {
+        "nodes": [n["Node Type"] + (f" using {n['Index Name']}" if "Index Name" in n else "") for n in nodes],
+        "indexes": sorted({n["Index Name"] for n in nodes if "Index Name" in n}),
+        "seq_scans": sorted({n["Relation Name"] for n in nodes if n["Node Type"] == "Seq Scan"}),
+        "shared_hit_blocks": plan["Plan"].get("Shared Hit Blocks", 0),
+        "shared_read_blocks": plan["Plan"].get("Shared Read Blocks", 0),
+    }
+
+
+def explain(conn, variant_list, repeat: int) -> Dict[str, Any]:
+    results = {}
+    for name, query, params in variant_list:
+        timings, planning, plan = [], [], None
+        for _ in range(repeat):
+            with conn.cursor() as cur:
+                cur.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + query, tuple(params))
+                plan = cur.fetchone()[0][0]
+            conn.rollback()
+            timings.append(plan["Execution Time"])
+            planning.append(plan["Planning Time"])
+        results[name] = {
+            "execution_ms_median": statistics.median(timings),
+            "execution_ms_min": min(timings),
+            "planning_ms_median": statistics.median(planning),
+            **summarize(plan),
+            "plan": plan["Plan"],
+        }
+        print(f"{name:32s} {results[name]['execution_ms_median']:9.3f} ms  {', '.join(results[name]['indexes']) or 'no index'}")
+    return results
+
+
+def compare(before: Dict[str, Any], after: Dict[str, Any]) -> Dict[str, Any]:
+    report = {}
+    print(f"\n{'query':32s} {'before ms':>10s} {'after ms':>10s} {'speedup':>8s}")
+    for name in after:
+        if name not in before:
+            continue
+        b, a = before[name]["execution_ms_median"], after[name]["execution_ms_median"]
+        report[name] = {"before_ms": b, "after_ms": a, "speedup": b / a if a else None,
+                        "before_indexes": before[name]["indexes"], "after_indexes": after[name]["indexes"]}
+        print(f"{name:32s} {b:10.3f} {a:10.3f} {b / a if a else float('nan'):7.2f}x")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.explain_search", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--label", default=None, help="name of this run (results/explain_<label>.json)")
+    parser.add_argument("--compare", default=None, help="earlier result file to compare against")
+    parser.add_argument("--migrate", action="store_true", help="measure, apply pending migrations, measure again")
+    parser.add_argument("--repeat", type=int, default=5, help="EXPLAIN ANALYZE runs per query (median is reported)")
+    args = parser.parse_args()
+
+    RESULTS_DIR.mkdir(exist_ok=True)
+    conn = connect()
+    try:
+        values = sample_values(conn)
+        variant_list = variants(values)
+        meta = {"created_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "repeat": args.repeat,
+                "server_version": conn.server_version, "values": values}
+
+        if args.migrate:
+            print("== before ==")
+            before = explain(conn, variant_list, args.repeat)
+            applied = migrate(conn)
+            print("== after ==")
+            after = explain(conn, variant_list, args.repeat)
+            output = {**meta, "migrations": [f"{m.version:04d}_{m.name}" for m in applied],
+                      "before": before, "after": after, "comparison": compare(before, after)}
+            path = RESULTS_DIR / f"explain_{args.label or 'migration'}.json"
+        else:
+            results = explain(conn, variant_list, args.repeat)
+            output = {**meta, "results": results}
+            if args.compare:
+                with open(args.compare, encoding="utf-8") as f:
+                    previous = json.load(f)
+                output["comparison"] = compare(previous.get("results", previous.get("after", {})), results)
+            path = RESULTS_DIR / f"explain_{args.label or 'current'}.json"
+    finally:
+        conn.close()
+
+    path.write_text(json.dumps(output, indent=2, default=str), encoding="utf-8")
+    print(f"\nWrote {path}")
+
+
+if __name__ == "__main__":
+    main()
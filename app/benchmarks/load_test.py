@@ -0,0 +1,391 @@
+"""
+Scripted load test against a running server: concurrent clients replay a weighted mix of
+searches (various filters, full-text), deep paging (large offsets and cursor walks),
+/dss/compare with 5, 50 and 500 ids and the locations endpoints, then report p50/p95/p99
+latency and throughput per operation. Filter values are sampled from the database the
+server uses, and the same `--seed` replays the same sequence of requests per client.
+
+Run from the `app/` directory, with the POSTGRES_* variables of the server:
+
+    python -m benchmarks.load_test --workload mixed --label main
+    python -m benchmarks.load_test --workload mixed --compare benchmarks/results/load_main.json
+
+Workloads: search, paging, compare, locations and mixed. Results are written to
+`benchmarks/results/load_<label>.json`; `--compare` diffs them against an earlier file
+and flags operations whose p95 or throughput got worse by more than `--threshold`.
+"""
+import argparse
+import http.client
+import json
+import sys
+import threading
+import time
+import unicodedata
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlencode, urlsplit
+
+import numpy as np
+
+from server.config import settings
+
+from .explain_search import RESULTS_DIR, connect
+
+CENTER = (21.0285, 105.8542)
+
+
+class Client:
+    """One keep-alive HTTP connection that records the latency of every request by name"""
+
+    def __init__(self, base_url: str, timeout: float):
+        url = urlsplit(base_url)
+        self.host, self.port, self.prefix = url.hostname, url.port or 80, url.path.rstrip("/")
+        self.timeout = timeout
+        self.connection = None
+        self.recording = False
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+
+    def request(self, name: str, method: str, path: str, params: Optional[Dict[str, Any]] = None,
+                body: Any = None) -> Optional[Any]:
+        """Send one request; returns the decoded JSON body, or None on errors"""
+        if params:
+            path += "?" + urlencode({k: v for k, v in params.items() if v is not None}, doseq=True)
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        payload = json.dumps(body) if body is not None else None
+
+        start = time.perf_counter()
+        try:
+            if self.connection is None:
+                self.connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            self.connection.request(method, self.prefix + path, body=payload, headers=headers)
+            response = self.connection.getresponse()
+            content = response.read()
+            ok = 200 <= response.status < 300
+        except (OSError, http.client.HTTPException):
+            # Kết nối hỏng: mở lại ở request sau
+            if self.connection is not None:
+                self.connection.close()
+            self.connection = None
+            content, ok = None, False
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        if self.recording:
+            self.latencies.setdefault(name, []).append(elapsed_ms)
+            if not ok:
+                self.errors[name] = self.errors.get(name, 0) + 1
+        return json.loads(content) if ok else None
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+
+
+def _plain(value: str) -> str:
+    """Lower case, no diacritics (what a user would type into `q`)"""
+    value = unicodedata.normalize("NFD", value.lower()).replace("đ", "d")
+    return "".join(c for c in value if not unicodedata.combining(c))
+
+
+def _column(cur, query: str, params=None) -> List:
+    cur.execute(query, params)
+    return [row[0] for row in cur.fetchall()]
+
+
+def sample_values(conn, seed: int, pool_size: int = 5000) -> Dict[str, Any]:
+    """Ids and filter values the requests are drawn from (the same for the same `seed` and data)"""
+    with conn.cursor() as cur:
+        cur.execute("SELECT count(*), count(*) FILTER (WHERE available) FROM house_rent")
+        total, available = cur.fetchone()
+        # Lấy mẫu theo khối để không phải sắp xếp cả bảng lớn
+        percent = min(100.0, pool_size * 200.0 / max(total, 1))
+        ids = _column(cur, "SELECT id FROM house_rent TABLESAMPLE SYSTEM (%s) REPEATABLE (%s)"
+                           " WHERE available ORDER BY id LIMIT %s", (percent, seed, pool_size))
+        return {
+            "house_rent_rows": total,
+            "available_rows": available,
+            "ids": ids,
+            "province_ids": _column(cur, "SELECT id FROM provinces ORDER BY id"),
+            "district_ids": _column(cur, "SELECT id FROM districts ORDER BY id"),
+            "ward_ids": _column(cur, "SELECT DISTINCT ward_id FROM house_rent WHERE id = ANY(%s) ORDER BY 1", (ids,)),
+            "house_types": _column(cur, "SELECT DISTINCT house_type FROM house_rent WHERE id = ANY(%s) ORDER BY 1", (ids,)),
+            "contract_periods": _column(cur, "SELECT DISTINCT contract_period FROM house_rent WHERE id = ANY(%s) ORDER BY 1",
+                                        (ids,)),
+            "prices": _column(cur, "SELECT percentile_cont(ARRAY[0.1, 0.25, 0.5, 0.75, 0.9]) WITHIN GROUP (ORDER BY price)"
+                                   " FROM house_rent WHERE id = ANY(%s)", (ids,))[0],
+            "amenities": _column(cur, "SELECT id FROM environment ORDER BY id"),
+            "words": sorted({_plain(value) for value in _column(cur, "SELECT value FROM environment")}),
+        }
+
+
+Operation = Callable[[Client, np.random.Generator, Dict[str, Any], argparse.Namespace], None]
+
+
+def _pick(rng: np.random.Generator, values: List) -> Any:
+    return values[int(rng.integers(len(values)))]
+
+
+def _price_range(rng, values) -> Tuple[float, float]:
+    price = _pick(rng, values["prices"])
+    return round(price * 0.7, 1), round(price * 1.3, 1)
+
+
+def _search(name: str, make_params: Callable) -> Operation:
+    def operation(client, rng, values, args):
+        client.request(name, "GET", "/api/search/house-rent", {"limit": 20, **make_params(rng, values)})
+    return operation
+
+
+def _near(rng) -> Tuple[float, float]:
+    return round(CENTER[0] + rng.normal(0, 0.03), 5), round(CENTER[1] + rng.normal(0, 0.03), 5)
+
+
+def _amenity_params(rng, values) -> Dict[str, Any]:
+    count = int(rng.integers(1, 4))
+    return {"amenities": [int(a) for a in rng.choice(values["amenities"], size=count, replace=False)],
+            "amenities_match": _pick(rng, ["all", "any"])}
+
+
+SEARCHES: Dict[str, Callable] = {
+    "search.first_page": lambda rng, v: {},
+    "search.district_price": lambda rng, v: dict(zip(("min_price", "max_price"), _price_range(rng, v)),
+                                                 district_id=_pick(rng, v["district_ids"])),
+    "search.ward": lambda rng, v: {"ward_id": _pick(rng, v["ward_ids"])},
+    "search.price_acreage": lambda rng, v: dict(zip(("min_price", "max_price"), _price_range(rng, v)),
+                                                min_acreage=15, max_acreage=int(rng.integers(25, 80))),
+    "search.type_period": lambda rng, v: {"house_type": _pick(rng, v["house_types"]),
+                                          "contract_period": _pick(rng, v["contract_periods"])},
+    "search.amenities": _amenity_params,
+    "search.radius": lambda rng, v: dict(zip(("latitude", "longitude"), _near(rng)),
+                                         radius_km=float(rng.choice([1, 2, 3]))),
+    "search.nearest": lambda rng, v: dict(zip(("latitude", "longitude"), _near(rng)), order_by="distance"),
+    "search.text": lambda rng, v: {"q": _pick(rng, v["words"])},
+    "search.text_district": lambda rng, v: {"q": _pick(rng, v["words"]), "district_id": _pick(rng, v["district_ids"])},
+}
+
+
+def deep_offset(client, rng, values, args):
+    available = values["available_rows"]
+    offset = int(rng.integers(available // 2, max(available * 19 // 20, available // 2 + 1)))
+    client.request("page.deep_offset", "GET", "/api/search/house-rent", {"limit": 20, "offset": offset})
+
+
+def _cursor_walk(name: str, make_params: Callable) -> Operation:
+    def operation(client, rng, values, args):
+        params = {"limit": 20, **make_params(rng, values)}
+        for _ in range(args.pages):
+            page = client.request(name, "GET", "/api/search/house-rent/page", params)
+            if not page or not page.get("next_cursor"):
+                break
+            params["cursor"] = page["next_cursor"]
+    return operation
+
+
+def _compare(size: int) -> Operation:
+    def operation(client, rng, values, args):
+        ids = [int(i) for i in rng.choice(values["ids"], size=min(size, len(values["ids"])), replace=False)]
+        amenities = [int(a) for a in rng.choice(values["amenities"], size=3, replace=False)]
+        client.request(f"compare.{size}", "POST", "/api/dss/compare", body={
+            "house_rent_ids": ids,
+            "amenities": amenities,
+            "weights": [int(w) for w in rng.integers(1, 100, size=len(amenities))],
+            "topsis_weight": [float(w) for w in rng.integers(1, 6, size=6)],
+            "prefer_location": list(_near(rng)),
+        })
+    return operation
+
+
+def _get(name: str, path: str, make_params: Callable = lambda rng, v: {}) -> Operation:
+    def operation(client, rng, values, args):
+        client.request(name, "GET", path, make_params(rng, values))
+    return operation
+
+
+SEARCH_MIX = {name: (1.0, _search(name, make_params)) for name, make_params in SEARCHES.items()}
+PAGING_MIX = {
+    "page.deep_offset": (1.0, deep_offset),
+    "page.cursor": (1.0, _cursor_walk("page.cursor", lambda rng, v: {})),
+    "page.cursor_district": (1.0, _cursor_walk("page.cursor_district",
+                                               lambda rng, v: {"district_id": _pick(rng, v["district_ids"])})),
+}
+COMPARE_MIX = {f"compare.{size}": (weight, _compare(size)) for size, weight in ((5, 6.0), (50, 3.0), (500, 1.0))}
+LOCATIONS_MIX = {
+    "locations.provinces": (1.0, _get("locations.provinces", "/api/locations/provinces")),
+    "locations.districts": (1.0, _get("locations.districts", "/api/locations/districts",
+                                      lambda rng, v: {"province_id": _pick(rng, v["province_ids"])})),
+    "locations.wards": (1.0, _get("locations.wards", "/api/locations/wards",
+                                  lambda rng, v: {"district_id": _pick(rng, v["district_ids"])})),
+    "items.amenities": (1.0, _get("items.amenities", "/api/item/amenities")),
+}
+
+
+def _scaled(mix: Dict[str, Tuple[float, Operation]], share: float) -> Dict[str, Tuple[float, Operation]]:
+    total = sum(weight for weight, _ in mix.values())
+    return {name: (weight * share / total, operation) for name, (weight, operation) in mix.items()}
+
+
+WORKLOADS: Dict[str, Dict[str, Tuple[float, Operation]]] = {
+    "search": SEARCH_MIX,
+    "paging": PAGING_MIX,
+    "compare": COMPARE_MIX,
+    "locations": LOCATIONS_MIX,
+    # Tỉ lệ gần với người dùng thật: chủ yếu tìm kiếm, ít so sánh
+    "mixed": {**_scaled(SEARCH_MIX, 0.5), **_scaled(PAGING_MIX, 0.15), **_scaled(COMPARE_MIX, 0.15),
+              **_scaled(LOCATIONS_MIX, 0.2)},
+}
+
+
+def run_worker(index: int, client: Client, mix, values: Dict[str, Any], args, warmup_until: float,
+               deadline: float) -> None:
+    rng = np.random.default_rng([args.seed, index])
+    names = list(mix)
+    weights = np.array([mix[name][0] for name in names])
+    weights = weights / weights.sum()
+    while True:
+        now = time.perf_counter()
+        if now >= deadline:
+            break
+        client.recording = now >= warmup_until
+        mix[names[int(rng.choice(len(names), p=weights))]][1](client, rng, values, args)
+
+
+def summarize(latencies: List[float], errors: int, seconds: float) -> Dict[str, Any]:
+    array = np.array(latencies)
+    p50, p95, p99 = np.percentile(array, [50, 95, 99]) if len(array) else (float("nan"),) * 3
+    return {
+        "requests": len(array),
+        "errors": errors,
+        "throughput_rps": len(array) / seconds,
+        "p50_ms": float(p50),
+        "p95_ms": float(p95),
+        "p99_ms": float(p99),
+        "mean_ms": float(array.mean()) if len(array) else float("nan"),
+        "max_ms": float(array.max()) if len(array) else float("nan"),
+    }
+
+
+def run(values: Dict[str, Any], args) -> Dict[str, Any]:
+    mix = WORKLOADS[args.workload]
+    clients = [Client(args.base_url, args.timeout) for _ in range(args.concurrency)]
+    start = time.perf_counter()
+    warmup_until, deadline = start + args.warmup, start + args.warmup + args.duration
+    threads = [threading.Thread(target=run_worker, args=(i, client, mix, values, args, warmup_until, deadline))
+               for i, client in enumerate(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # Thời gian đo thực tế: request cuối có thể kết thúc sau deadline
+    seconds = time.perf_counter() - warmup_until
+    for client in clients:
+        client.close()
+
+    latencies: Dict[str, List[float]] = {}
+    errors: Dict[str, int] = {}
+    for client in clients:
+        for name, values_ms in client.latencies.items():
+            latencies.setdefault(name, []).extend(values_ms)
+        for name, count in client.errors.items():
+            errors[name] = errors.get(name, 0) + count
+
+    results = {name: summarize(latencies[name], errors.get(name, 0), seconds) for name in sorted(latencies)}
+    results["total"] = summarize([ms for values_ms in latencies.values() for ms in values_ms],
+                                 sum(errors.values()), seconds)
+    return results
+
+
+def print_results(results: Dict[str, Any]) -> None:
+    print(f"\n{'operation':24s} {'requests':>9s} {'errors':>7s} {'req/s':>8s} {'p50 ms':>8s} {'p95 ms':>8s} "
+          f"{'p99 ms':>8s} {'max ms':>8s}")
+    for name, r in results.items():
+        print(f"{name:24s} {r['requests']:9d} {r['errors']:7d} {r['throughput_rps']:8.1f} {r['p50_ms']:8.2f} "
+              f"{r['p95_ms']:8.2f} {r['p99_ms']:8.2f} {r['max_ms']:8.2f}")
+
+
+# Dưới số mẫu này p95 chỉ là nhiễu, không đánh dấu hồi quy
+MIN_REQUESTS = 30
+
+
+def compare(before: Dict[str, Any], after: Dict[str, Any], threshold: float) -> Dict[str, Any]:
+    """
+    Ratios after/before per operation.
+
+    A regression is a p95 or throughput worse by more than `threshold`, for operations
+    with at least `MIN_REQUESTS` requests in both runs.
+    """
+    report = {}
+    print(f"\n{'operation':24s} {'p50':>7s} {'p95':>7s} {'p99':>7s} {'req/s':>7s}  (after / before)")
+    for name in after:
+        if name not in before:
+            continue
+        b, a = before[name], after[name]
+        ratios = {key: a[key] / b[key] if b[key] else None
+                  for key in ("p50_ms", "p95_ms", "p99_ms", "throughput_rps")}
+        enough = min(a["requests"], b["requests"]) >= MIN_REQUESTS
+        regression = enough and ((ratios["p95_ms"] or 0) > 1 + threshold
+                                 or (ratios["throughput_rps"] or 1) < 1 - threshold)
+        report[name] = {**ratios, "regression": regression}
+        print(f"{name:24s} " + " ".join(f"{r:7.2f}" if r is not None else f"{'-':>7s}" for r in ratios.values())
+              + ("  REGRESSION" if regression else "" if enough else "  (too few requests)"))
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.load_test", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000", help="server to load")
+    parser.add_argument("--workload", choices=sorted(WORKLOADS), default="mixed")
+    parser.add_argument("--concurrency", type=int, default=8, help="parallel clients")
+    parser.add_argument("--duration", type=float, default=30, help="seconds measured")
+    parser.add_argument("--warmup", type=float, default=5, help="seconds run before measuring")
+    parser.add_argument("--pages", type=int, default=5, help="pages followed by each cursor walk")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--timeout", type=float, default=30, help="seconds per request")
+    parser.add_argument("--label", default=None, help="name of this run (results/load_<label>.json)")
+    parser.add_argument("--compare", default=None, help="earlier result file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1, help="relative change flagged as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true", help="exit with status 1 on a regression")
+    args = parser.parse_args()
+
+    conn = connect()
+    try:
+        values = sample_values(conn, args.seed)
+        server_version = conn.server_version
+    finally:
+        conn.close()
+    print(f"{args.workload}: {args.concurrency} clients, {args.warmup:g}s warm-up + {args.duration:g}s against "
+          f"{args.base_url} ({values['house_rent_rows']} listings in {settings.db_name})")
+
+    results = run(values, args)
+    print_results(results)
+
+    output = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "workload": args.workload,
+        "base_url": args.base_url,
+        "concurrency": args.concurrency,
+        "duration_s": args.duration,
+        "warmup_s": args.warmup,
+        "pages": args.pages,
+        "seed": args.seed,
+        "database": settings.db_name,
+        "server_version": server_version,
+        "dataset": {"house_rent_rows": values["house_rent_rows"], "available_rows": values["available_rows"]},
+        "results": results,
+    }
+    regressions = []
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            output["comparison"] = compare(json.load(f)["results"], results, args.threshold)
+        regressions = [name for name, r in output["comparison"].items() if r["regression"]]
+
+    RESULTS_DIR.mkdir(exist_ok=True)
+    path = RESULTS_DIR / f"load_{args.label or args.workload}.json"
+    path.write_text(json.dumps(output, indent=2), encoding="utf-8")
+    print(f"\nWrote {path}")
+
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Response serialization: FastAPI's `response_model` path (validate, then dump JSON with
+pydantic) against `utils.fast_json` (project the fields, then orjson), on real search
+pages and compare results.
+
+Run from the `app/` directory:
+
+    python -m benchmarks.serialization
+"""
+import argparse
+import json
+import time
+import timeit
+from typing import Any, Callable, Dict, List
+
+from pydantic import TypeAdapter
+
+from server.logic.house import HouseService
+from server.model.models import HouseSearchItem, TopsisCompareResponse, CompareRequest
+from server.routers.dss import _rank_houses
+from server.utils.fast_json import compile_serializer, dumps
+
+from .explain_search import RESULTS_DIR, connect
+
+
+def response_model_path(adapter: TypeAdapter) -> Callable[[Any], bytes]:
+    """What FastAPI does for a route with `response_model` (validate, then `serialize_json`)"""
+    return lambda content: adapter.dump_json(adapter.validate_python(content))
+
+
+def fast_path(annotation) -> Callable[[Any], bytes]:
+    serializer = compile_serializer(annotation)
+    return lambda content: dumps(serializer, content)
+
+
+def payloads(conn) -> Dict[str, tuple]:
+    result = {}
+    for limit in (10, 100):
+        result[f"search_{limit}"] = (List[HouseSearchItem], HouseService.search_house_rent(
+            conn, limit=limit, latitude=21.0285, longitude=105.8542))
+
+    # Tin không có số phòng: khi lẫn NULL và số, pandas tạo NaN mà response_model từ chối
+    with conn.cursor() as cur:
+        cur.execute("SELECT id FROM house_rent WHERE available AND bedrooms IS NULL AND living_rooms IS NULL"
+                    " AND kitchens IS NULL ORDER BY id")
+        ids = [row[0] for row in cur.fetchall()]
+    for n in (10, 100, 1000):
+        houses = HouseService.get_multiple_houses_by_ids(conn, ids[:n])
+        request = CompareRequest(house_rent_ids=ids[:n], amenities=[1, 2, 3], weights=[3, 2, 1],
+                                 topsis_weight=[1, 1, 1, 1, 1, 1], prefer_location=[21.0285, 105.8542])
+        result[f"compare_{len(houses)}"] = (TopsisCompareResponse, _rank_houses(houses, request))
+    return result
+
+
+def measure(function: Callable[[Any], bytes], content: Any, min_time: float) -> float:
+    """Median seconds per call"""
+    timer = timeit.Timer(lambda: function(content))
+    number, _ = timer.autorange()
+    number = max(1, int(number * min_time / 0.2))
+    runs = sorted(timer.repeat(repeat=5, number=number))
+    return runs[2] / number
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.serialization", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds per timing run")
+    args = parser.parse_args()
+
+    conn = connect()
+    try:
+        cases = payloads(conn)
+    finally:
+        conn.close()
+
+    results = {}
+    print(f"{'payload':16s} {'bytes':>9s} {'response_model':>15s} {'fast_json':>10s} {'speedup':>8s}  same bytes")
+    for name, (annotation, content) in cases.items():
+        current, fast = response_model_path(TypeAdapter(annotation)), fast_path(annotation)
+        same = current(content) == fast(content)
+        current_s, fast_s = measure(current, content, args.min_time), measure(fast, content, args.min_time)
+        results[name] = {"bytes": len(fast(content)), "response_model_us": current_s * 1e6,
+                         "fast_json_us": fast_s * 1e6, "speedup": current_s / fast_s, "same_bytes": same}
+        print(f"{name:16s} {results[name]['bytes']:9d} {current_s * 1e6:13.1f}us {fast_s * 1e6:8.1f}us "
+              f"{current_s / fast_s:7.2f}x  {same}")
+
+    RESULTS_DIR.mkdir(exist_ok=True)
+    path = RESULTS_DIR / "serialization.json"
+    path.write_text(json.dumps({"created_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "results": results}, indent=2),
+                    encoding="utf-8")
+    print(f"\nWrote {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else default
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value not in (None, "") else default
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value in (None, ""):
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+class Settings:
+    """
+    Runtime settings of the server, read once from the environment (and `.env`).
+    """
+
+    def __init__(self):
+        if os.getenv('DOCKER_ENV') or os.path.exists('/.dockerenv'):
+            # Đang chạy trong Docker - dùng hostname "database"
+            self.db_host = 'database'
+        else:
+            # Đang chạy local - dùng localhost với port 5433
+            self.db_host = 'localhost'
+
+        self.db_port = os.getenv('POSTGRES_PORT', '5433')  # 5433 cho local, 5432 trong Docker
+        self.db_name = os.getenv('POSTGRES_DB', 'system')
+        self.db_user = os.getenv('POSTGRES_USER', 'admin')
+        self.db_password = os.getenv('POSTGRES_PASSWORD', 'admin')
+
+        # Connection pool
+        self.db_pool_min_size = _env_int('DB_POOL_MIN_SIZE', 2)
+        self.db_pool_max_size = _env_int('DB_POOL_MAX_SIZE', 10)
+        # Thời gian tối đa chờ một connection rảnh trước khi trả lỗi (giây)
+        self.db_pool_timeout = _env_float('DB_POOL_TIMEOUT', 10.0)
+        # Connection rảnh lâu hơn ngưỡng này sẽ được `SELECT 1` trước khi giao cho request (giây)
+        self.db_pool_check_idle = _env_float('DB_POOL_CHECK_IDLE', 30.0)
+
+        # True: routers dùng psycopg (async) thay vì psycopg2 trong threadpool
+        self.db_async = _env_bool('DB_ASYNC', False)
+
+        # Cache dữ liệu danh mục (locations, house-types, amenities): thời gian sống phía server
+        # và max-age gửi cho trình duyệt/proxy (giây)
+        self.reference_cache_ttl = _env_float('REFERENCE_CACHE_TTL', 3600.0)
+        self.reference_cache_max_age = _env_int('REFERENCE_CACHE_MAX_AGE', 300)
+
+        # LRU cache kết quả /dss/compare và cache dữ liệu từng tin (số phần tử, thời gian sống - giây)
+        self.compare_cache_size = _env_int('COMPARE_CACHE_SIZE', 256)
+        self.compare_cache_ttl = _env_float('COMPARE_CACHE_TTL', 600.0)
+        self.house_row_cache_size = _env_int('HOUSE_ROW_CACHE_SIZE', 10000)
+        self.house_row_cache_ttl = _env_float('HOUSE_ROW_CACHE_TTL', 3600.0)
+
+        # Chạy các migration còn thiếu (server/migrations) khi khởi động; mặc định bật vì truy vấn
+        # search/DSS cần các bảng do migration tạo (house_rent_search, house_rent_read)
+        self.db_migrate = _env_bool('DB_MIGRATE', True)
+
+        # Bản sao dạng cột của house_rent trong RAM, phục vụ search/lookup không cần truy vấn SQL
+        self.listing_snapshot = _env_bool('LISTING_SNAPSHOT', False)
+        # Chu kỳ kiểm tra update_time để nạp các bản ghi thay đổi (giây)
+        self.listing_snapshot_refresh = _env_float('LISTING_SNAPSHOT_REFRESH', 30.0)
+        # Chu kỳ nạp lại toàn bộ, để loại bỏ các bản ghi đã bị xóa (giây)
+        self.listing_snapshot_full_reload = _env_float('LISTING_SNAPSHOT_FULL_RELOAD', 3600.0)
+
+        # Cho phép profile từng request (header `X-Profile` hoặc `?profile=`); tắt thì không tốn gì
+        self.profiling = _env_bool('PROFILING', False)
+        # Thư mục lưu file pstats và số file giữ lại (xóa file cũ nhất)
+        self.profile_dir = os.getenv('PROFILE_DIR', 'profiles')
+        self.profile_max_files = _env_int('PROFILE_MAX_FILES', 100)
+        # Nếu đặt: giá trị header/query phải đúng bằng token này thay vì "1"
+        self.profile_token = os.getenv('PROFILE_TOKEN') or None
+
+        # Token cho các endpoint quản trị (xóa cache, xem/tải profile) qua header X-Admin-Token;
+        # không đặt thì các endpoint đó không được đăng ký
+        self.admin_token = os.getenv('ADMIN_TOKEN') or None
+
+        # Logging: mức log, định dạng ("json" hoặc "text"), số bản ghi tối đa chờ thread ghi log
+        self.log_level = os.getenv('LOG_LEVEL', 'INFO')
+        self.log_format = os.getenv('LOG_FORMAT', 'json')
+        self.log_queue_size = _env_int('LOG_QUEUE_SIZE', 10000)
+        # Tỷ lệ request được ghi access log; lỗi 5xx và request chậm hơn ngưỡng (giây) luôn được ghi
+        self.log_request_sample_rate = _env_float('LOG_REQUEST_SAMPLE_RATE', 1.0)
+        self.log_slow_request_seconds = _env_float('LOG_SLOW_REQUEST_SECONDS', 1.0)
+
+
+settings = Settings()
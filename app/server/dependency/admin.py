@@ -0,0 +1,17 @@
+import hmac
+from typing import Optional
+
+from fastapi import Header, HTTPException
+
+from ..config import settings
+
+
+def require_admin_token(x_admin_token: Optional[str] = Header(default=None)):
+    """
+    Allow the request only when its `X-Admin-Token` header equals `ADMIN_TOKEN`.
+
+    The admin routes are not even registered without `ADMIN_TOKEN`; this guards them once they are.
+    """
+    if not settings.admin_token or x_admin_token is None \
+            or not hmac.compare_digest(x_admin_token.encode(), settings.admin_token.encode()):
+        raise HTTPException(status_code=403, detail="Admin token required (X-Admin-Token)")
@@ -1,23 +1,345 @@
-import os
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional, Sequence
+
+import psycopg
 import psycopg2
-from dotenv import load_dotenv
+import psycopg2.extensions
+from fastapi import HTTPException
+from psycopg.conninfo import make_conninfo
+from psycopg.rows import dict_row
+from psycopg2.extras import RealDictCursor
+from psycopg2.pool import PoolError
+from psycopg_pool import AsyncConnectionPool, PoolTimeout
+
+from ..config import settings
+from ..utils.concurrency import run_in_threadpool
+from ..utils.metrics import Histogram, register_collector
+
+POOL_WAIT_SECONDS = Histogram("db_pool_wait_seconds", "Time waiting for a connection from the psycopg2 pool")
+
+
+class DatabasePool:
+    """
+    Thread-safe, blocking psycopg2 connection pool.
+
+    Up to `max_size` connections are opened lazily (`min_size` eagerly) and kept
+    open between requests. Callers wait up to `timeout` seconds when every
+    connection is checked out, connections idle for longer than `check_idle`
+    seconds are health-checked on checkout, and wait times are recorded.
+    """
+
+    def __init__(self, min_size: int, max_size: int, timeout: float, check_idle: float, **connect_kwargs):
+        if not 0 <= min_size <= max_size or max_size < 1:
+            raise ValueError("Pool sizes must satisfy 0 <= min_size <= max_size and max_size >= 1")
+
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.check_idle = check_idle
+        self._connect_kwargs = connect_kwargs
+
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._lock = threading.Lock()
+        # (connection, thời điểm trả về pool)
+        self._idle = deque()
+        self._closed = False
+
+        self._opened = 0
+        self._checkouts = 0
+        self._in_use = 0
+        self._timeouts = 0
+        self._discarded = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+        for _ in range(min_size):
+            self._idle.append((self._connect(), time.monotonic()))
+
+    def _connect(self):
+        conn = psycopg2.connect(**self._connect_kwargs)
+        with self._lock:
+            self._opened += 1
+        return conn
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+        with self._lock:
+            self._opened -= 1
+            self._discarded += 1
+
+    def getconn(self):
+        if self._closed:
+            raise PoolError("connection pool is closed")
+
+        start = time.perf_counter()
+        if not self._slots.acquire(timeout=self.timeout):
+            with self._lock:
+                self._timeouts += 1
+            raise PoolError(f"Timed out after {self.timeout}s waiting for a database connection")
+
+        try:
+            conn = self._checkout_healthy()
+        except Exception:
+            self._slots.release()
+            raise
+
+        waited = time.perf_counter() - start
+        POOL_WAIT_SECONDS.labels().observe(waited)
+        with self._lock:
+            self._checkouts += 1
+            self._in_use += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+        return conn
+
+    def putconn(self, conn):
+        try:
+            if self._closed or conn.closed:
+                self._discard(conn)
+                return
+            status = conn.info.transaction_status
+            if status == psycopg2.extensions.TRANSACTION_STATUS_UNKNOWN:
+                # Mất kết nối tới server
+                self._discard(conn)
+                return
+            if status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    self._discard(conn)
+                    return
+            with self._lock:
+                self._idle.append((conn, time.monotonic()))
+        finally:
+            with self._lock:
+                self._in_use -= 1
+            self._slots.release()
+
+    def _checkout_healthy(self):
+        while True:
+            with self._lock:
+                item = self._idle.pop() if self._idle else None
+            if item is None:
+                return self._connect()
+
+            conn, returned_at = item
+            if self._is_healthy(conn, returned_at):
+                return conn
+            self._discard(conn)
+
+    def _is_healthy(self, conn, returned_at: float) -> bool:
+        if conn.closed:
+            return False
+        if time.monotonic() - returned_at < self.check_idle:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "opened": self._opened,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "checkouts": self._checkouts,
+                "timeouts": self._timeouts,
+                "discarded": self._discarded,
+                "wait_total_seconds": self._wait_total,
+                "wait_max_seconds": self._wait_max,
+                "wait_avg_seconds": self._wait_total / self._checkouts if self._checkouts else 0.0,
+            }
+
+    def close(self):
+        self._closed = True
+        with self._lock:
+            idle, self._idle = list(self._idle), deque()
+        for conn, _ in idle:
+            self._discard(conn)
+
+
+db_pool: Optional[DatabasePool] = None
+async_db_pool: Optional[AsyncConnectionPool] = None
+
+
+def init_db_pool() -> DatabasePool:
+    """Create the process-wide pool; called once at application startup."""
+    global db_pool
+    if db_pool is None:
+        db_pool = DatabasePool(
+            min_size=settings.db_pool_min_size,
+            max_size=settings.db_pool_max_size,
+            timeout=settings.db_pool_timeout,
+            check_idle=settings.db_pool_check_idle,
+            host=settings.db_host,
+            port=settings.db_port,
+            database=settings.db_name,
+            user=settings.db_user,
+            password=settings.db_password,
+        )
+    return db_pool
 
-load_dotenv()
+
+def close_db_pool():
+    global db_pool
+    if db_pool is not None:
+        db_pool.close()
+        db_pool = None
+
+
+async def init_async_db_pool() -> AsyncConnectionPool:
+    """Open the psycopg 3 pool used when `DB_ASYNC` is enabled."""
+    global async_db_pool
+    if async_db_pool is None:
+        conninfo = make_conninfo(
+            host=settings.db_host,
+            port=settings.db_port,
+            dbname=settings.db_name,
+            user=settings.db_user,
+            password=settings.db_password,
+        )
+        pool = AsyncConnectionPool(
+            conninfo,
+            min_size=settings.db_pool_min_size,
+            max_size=settings.db_pool_max_size,
+            timeout=settings.db_pool_timeout,
+            max_idle=max(settings.db_pool_check_idle * 10, 600.0),
+            check=AsyncConnectionPool.check_connection,
+            kwargs={"row_factory": dict_row},
+            open=False,
+        )
+        await pool.open()
+        async_db_pool = pool
+    return async_db_pool
+
+
+async def close_async_db_pool():
+    global async_db_pool
+    if async_db_pool is not None:
+        await async_db_pool.close()
+        async_db_pool = None
+
+
+@register_collector
+def _collect_pool_metrics():
+    if db_pool is not None:
+        stats = db_pool.stats()
+        yield "db_pool_connections", "gauge", "psycopg2 pool connections by state", [
+            ({"state": "in_use"}, stats["in_use"]), ({"state": "idle"}, stats["idle"]),
+            ({"state": "opened"}, stats["opened"]), ({"state": "max"}, stats["max_size"])]
+        yield "db_pool_checkouts_total", "counter", "psycopg2 pool checkouts", [({}, stats["checkouts"])]
+        yield "db_pool_timeouts_total", "counter", "psycopg2 pool checkouts that timed out", [({}, stats["timeouts"])]
+        yield "db_pool_discarded_total", "counter", "psycopg2 pool connections closed as broken", \
+            [({}, stats["discarded"])]
+    if async_db_pool is not None:
+        # get_stats(): pool_size, pool_available, requests_waiting, requests_num, requests_wait_ms, ...
+        stats = async_db_pool.get_stats()
+        yield "db_async_pool_connections", "gauge", "psycopg 3 pool connections by state", [
+            ({"state": "opened"}, stats.get("pool_size", 0)), ({"state": "idle"}, stats.get("pool_available", 0)),
+            ({"state": "max"}, stats.get("pool_max", 0))]
+        yield "db_async_pool_requests_waiting", "gauge", "Clients waiting for a psycopg 3 pool connection", \
+            [({}, stats.get("requests_waiting", 0))]
+        yield "db_async_pool_requests_total", "counter", "psycopg 3 pool connection requests", \
+            [({}, stats.get("requests_num", 0))]
+        yield "db_async_pool_wait_seconds_total", "counter", "Total time waiting for a psycopg 3 pool connection", \
+            [({}, stats.get("requests_wait_ms", 0) / 1000)]
+        yield "db_async_pool_timeouts_total", "counter", "psycopg 3 pool requests that timed out", \
+            [({}, stats.get("requests_errors", 0))]
 
 
 def get_db_connection():
-    if os.getenv('DOCKER_ENV') or os.path.exists('/.dockerenv'):
-        # Đang chạy trong Docker - dùng hostname "database"
-        db_host = 'database'
-    else:
-        # Đang chạy local - dùng localhost với port 5433
-        db_host = 'localhost'
-
-    conn = psycopg2.connect(
-        host=db_host,
-        port=os.getenv('POSTGRES_PORT', '5433'),  # 5433 cho local, 5432 trong Docker
-        database=os.getenv('POSTGRES_DB', 'system'),
-        user=os.getenv('POSTGRES_USER', 'admin'),
-        password=os.getenv('POSTGRES_PASSWORD', 'admin')
-    )
-    return conn
\ No newline at end of file
+    """
+    Yield a pooled connection for the duration of a request.
+
+    The connection always goes back to the pool, whether the handler returns or raises.
+    """
+    if db_pool is None:
+        raise RuntimeError("Database pool is not initialised; call init_db_pool() at startup")
+
+    try:
+        conn = db_pool.getconn()
+    except PoolError as e:
+        raise HTTPException(status_code=503, detail=f"Database unavailable: {e}")
+
+    try:
+        yield conn
+    finally:
+        db_pool.putconn(conn)
+
+
+async def get_async_db_connection():
+    """Async counterpart of `get_db_connection`, yielding a psycopg 3 `AsyncConnection`."""
+    if async_db_pool is None:
+        raise RuntimeError("Async database pool is not initialised; call init_async_db_pool() at startup")
+
+    try:
+        async with async_db_pool.connection() as conn:
+            yield conn
+    except PoolTimeout as e:
+        raise HTTPException(status_code=503, detail=f"Database unavailable: {e}")
+
+
+async def get_connection():
+    """
+    Connection dependency for `async def` routes.
+
+    Yields an `AsyncConnection` when `DB_ASYNC` is enabled, otherwise a pooled psycopg2
+    connection checked out in a worker thread so the event loop never blocks on the pool.
+    """
+    if settings.db_async:
+        if async_db_pool is None:
+            raise RuntimeError("Async database pool is not initialised; call init_async_db_pool() at startup")
+        try:
+            async with async_db_pool.connection() as conn:
+                yield conn
+        except PoolTimeout as e:
+            raise HTTPException(status_code=503, detail=f"Database unavailable: {e}")
+        return
+
+    if db_pool is None:
+        raise RuntimeError("Database pool is not initialised; call init_db_pool() at startup")
+
+    try:
+        conn = await run_in_threadpool(db_pool.getconn)
+    except PoolError as e:
+        raise HTTPException(status_code=503, detail=f"Database unavailable: {e}")
+
+    try:
+        yield conn
+    finally:
+        await run_in_threadpool(db_pool.putconn, conn)
+
+
+# `async with pooled_connection() as conn:` - cùng logic với dependency, dùng khi chỉ cần connection có điều kiện
+pooled_connection = asynccontextmanager(get_connection)
+
+
+def is_async_connection(conn) -> bool:
+    return isinstance(conn, psycopg.AsyncConnection)
+
+
+def _fetch_all_sync(conn, query: str, params: Optional[Sequence[Any]]) -> List[Dict]:
+    with conn.cursor(cursor_factory=RealDictCursor) as cur:
+        cur.execute(query, params)
+        return cur.fetchall()
+
+
+async def fetch_all(conn, query: str, params: Optional[Sequence[Any]] = None) -> List[Dict]:
+    """Run a read query on either connection kind and return the rows as dicts."""
+    if is_async_connection(conn):
+        async with conn.cursor(row_factory=dict_row) as cur:
+            await cur.execute(query, params)
+            return await cur.fetchall()
+    return await run_in_threadpool(_fetch_all_sync, conn, query, params)
@@ -0,0 +1,100 @@
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+WORD_BITS = 64
+
+
+def words_for(max_environment_id: int) -> int:
+    """Number of uint64 words needed so that bit `environment.id` exists"""
+    return max(1, (int(max_environment_id) + WORD_BITS) // WORD_BITS)
+
+
+def encode(id_lists: Sequence[Iterable[int]], n_words: Optional[int] = None) -> np.ndarray:
+    """
+    Encode per-house environment id lists as an (m x n_words) uint64 bitset matrix.
+
+    Bit `j` of a row is set when the house has the environment with id `j`; ids are used
+    as bit positions directly so the encoding is stable when the catalog grows.
+    """
+    flat_ids = [int(env_id) for ids in id_lists for env_id in ids]
+    if n_words is None:
+        n_words = words_for(max(flat_ids, default=0))
+
+    bits = np.zeros((len(id_lists), n_words), dtype=np.uint64)
+    if flat_ids:
+        rows = np.repeat(np.arange(len(id_lists)), [len(ids) for ids in id_lists])
+        ids = np.asarray(flat_ids, dtype=np.int64)
+        words, offsets = np.divmod(ids, WORD_BITS)
+        np.bitwise_or.at(bits, (rows, words), np.left_shift(np.uint64(1), offsets.astype(np.uint64)))
+    return bits
+
+
+def widen(bits: np.ndarray, n_words: int) -> np.ndarray:
+    """Pad a bitset matrix with zero words up to `n_words`"""
+    if bits.shape[1] >= n_words:
+        return bits
+    return np.pad(bits, ((0, 0), (0, n_words - bits.shape[1])))
+
+
+class AmenityBitset:
+    """
+    Amenities of a set of houses as one row of uint64 words per house.
+
+    Filters are bitwise ops against a query mask, amenity weight sums are one
+    matrix-vector product over the unpacked bits.
+    """
+
+    def __init__(self, bits: np.ndarray):
+        self.bits = bits
+
+    @classmethod
+    def from_houses(cls, houses: List[Dict]) -> "AmenityBitset":
+        """Build from house rows carrying an `environments` list (as returned by `HouseService`)"""
+        return cls(encode([[env['id'] for env in house['environments']] for house in houses]))
+
+    @property
+    def n_words(self) -> int:
+        return self.bits.shape[1]
+
+    def mask(self, environment_ids: Iterable[int]) -> np.ndarray:
+        """Query mask for `environment_ids`, as wide as the index (ids beyond it are dropped)"""
+        ids = [env_id for env_id in environment_ids if 0 <= env_id < self.n_words * WORD_BITS]
+        return encode([ids], self.n_words)[0]
+
+    def has_all(self, environment_ids: Iterable[int]) -> np.ndarray:
+        environment_ids = set(environment_ids)
+        if any(not 0 <= env_id < self.n_words * WORD_BITS for env_id in environment_ids):
+            # Tiện ích chưa có nhà nào sở hữu
+            return np.zeros(len(self.bits), dtype=bool)
+        mask = self.mask(environment_ids)
+        return ((self.bits & mask) == mask).all(axis=1)
+
+    def has_any(self, environment_ids: Iterable[int]) -> np.ndarray:
+        return ((self.bits & self.mask(environment_ids)) != 0).any(axis=1)
+
+    def dense(self) -> np.ndarray:
+        """(m x n_words*64) 0/1 matrix; column j is environment id j"""
+        as_bytes = self.bits.astype('<u8', copy=False).view(np.uint8)
+        return np.unpackbits(as_bytes, axis=1, bitorder='little')
+
+    def weights(self, amenity_weight_map: Dict[int, float]) -> np.ndarray:
+        """Sum of the weights of each house's amenities, as a matrix-vector product"""
+        vector = np.zeros(self.n_words * WORD_BITS)
+        for env_id, weight in amenity_weight_map.items():
+            if 0 <= env_id < len(vector):
+                vector[env_id] = weight
+        return self.dense() @ vector
+
+    def ids(self, mask: Optional[np.ndarray] = None) -> List[List[int]]:
+        """Environment ids per house (optionally restricted to `mask`), in id order"""
+        bits = self.bits if mask is None else self.bits & mask
+        rows, columns = np.nonzero(AmenityBitset(bits).dense())
+        result = [[] for _ in range(len(bits))]
+        for row, column in zip(rows.tolist(), columns.tolist()):
+            result[row].append(column)
+        return result
+
+    def matched(self, environment_ids: Iterable[int]) -> List[List[int]]:
+        """Requested environment ids each house has"""
+        return self.ids(self.mask(environment_ids))
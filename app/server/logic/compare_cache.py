@@ -0,0 +1,47 @@
+from typing import Any, Dict, List
+
+from ..config import settings
+from ..utils.cache import LRUCache
+from .house import run_house_service
+
+# Kết quả /dss/compare theo dạng chuẩn của request, kèm phiên bản các tin đã dùng
+compare_cache = LRUCache("compare", max_size=settings.compare_cache_size, ttl=settings.compare_cache_ttl)
+# Dữ liệu từng tin theo id, sống lâu hơn và dùng chung giữa các request khác nhau
+house_row_cache = LRUCache("house_rows", max_size=settings.house_row_cache_size, ttl=settings.house_row_cache_ttl)
+
+
+async def get_house_versions(conn, house_ids: List[int]) -> Dict[int, Any]:
+    """Current version of every available house in `house_ids`; one small indexed query"""
+    return await run_house_service(conn, "get_house_versions", sorted(set(house_ids)))
+
+
+def get_cached_result(key, versions: Dict[int, Any]):
+    """Cached result for `key`, or None when missing or computed from other house versions"""
+    cached = compare_cache.get(key, validate=lambda entry: entry[0] == versions)
+    return None if cached is None else cached[1]
+
+
+def cache_result(key, versions: Dict[int, Any], result):
+    compare_cache.set(key, (versions, result))
+
+
+async def fetch_houses(conn, versions: Dict[int, Any]) -> List[Dict]:
+    """
+    Houses for the ids in `versions`, ordered by id, like `get_multiple_houses_by_ids`.
+
+    Rows whose cached version matches are reused; only the others are fetched.
+    """
+    houses, missing = {}, []
+    for house_id, version in versions.items():
+        cached = house_row_cache.get(house_id, validate=lambda entry: entry[0] == version)
+        if cached is not None:
+            houses[house_id] = cached[1]
+        else:
+            missing.append(house_id)
+
+    if missing:
+        for house in await run_house_service(conn, "get_multiple_houses_by_ids", missing):
+            house_row_cache.set(house["id"], (versions.get(house["id"]), house))
+            houses[house["id"]] = house
+
+    return [houses[house_id] for house_id in sorted(houses)]
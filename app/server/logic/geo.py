@@ -0,0 +1,142 @@
+import math
+from typing import Optional, Tuple
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+def haversine_km(latitude, longitude, other_latitude, other_longitude) -> np.ndarray:
+    """Great-circle distance in km, broadcast over array arguments (NaN where a coordinate is missing)"""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(x, dtype=float))
+                              for x in (latitude, longitude, other_latitude, other_longitude))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def bounding_box(latitude: float, longitude: float, radius_km: float) -> Tuple[float, float, float, float]:
+    """(min_lat, max_lat, min_lon, max_lon) enclosing the circle of `radius_km` around the point"""
+    d_lat = radius_km / KM_PER_DEGREE
+    # Kinh độ xa nhất của đường tròn (không phải cung vĩ tuyến qua tâm, hẹp hơn một chút)
+    ratio = math.sin(min(radius_km / EARTH_RADIUS_KM, math.pi / 2)) / max(math.cos(math.radians(latitude)), 1e-6)
+    d_lon = math.degrees(math.asin(ratio)) if ratio < 1 else 180.0
+    return latitude - d_lat, latitude + d_lat, longitude - d_lon, longitude + d_lon
+
+
+def fill_missing_distances(distances: np.ndarray) -> np.ndarray:
+    """
+    Replace missing (NaN/inf) distances with the largest known one.
+
+    A listing without coordinates then ties with the farthest listing instead of
+    turning the whole TOPSIS column (and every score) into NaN.
+    """
+    distances = np.array(distances, dtype=float)
+    missing = ~np.isfinite(distances)
+    if missing.any():
+        distances[missing] = distances[~missing].max() if (~missing).any() else 0.0
+    return distances
+
+
+class GeoIndex:
+    """
+    Uniform latitude/longitude grid over a fixed set of points.
+
+    Points are sorted by cell key (row-major), so every grid row of a bounding box is one
+    contiguous slice found with `searchsorted`. Candidates from the box are then filtered
+    with the exact haversine distance.
+    """
+
+    COLUMN_OFFSET = 1 << 31
+
+    def __init__(self, latitude: np.ndarray, longitude: np.ndarray, cell_km: float = 1.0):
+        self.latitude = np.asarray(latitude, dtype=float)
+        self.longitude = np.asarray(longitude, dtype=float)
+        self.cell_deg = cell_km / KM_PER_DEGREE
+
+        valid = np.flatnonzero(~(np.isnan(self.latitude) | np.isnan(self.longitude)))
+        keys = self._keys(self._cell(self.latitude[valid]), self._cell(self.longitude[valid]))
+        order = np.argsort(keys, kind='stable')
+        self.points = valid[order]
+        self.keys = keys[order]
+
+        # Phạm vi ô lưới có dữ liệu, để truy vấn bán kính lớn không duyệt các hàng trống
+        if len(valid):
+            self.row_range = (int(self._cell(self.latitude[valid].min())), int(self._cell(self.latitude[valid].max())))
+            self.column_range = (int(self._cell(self.longitude[valid].min())), int(self._cell(self.longitude[valid].max())))
+        else:
+            self.row_range = self.column_range = (0, -1)
+
+    def __len__(self):
+        return len(self.points)
+
+    def _cell(self, degrees) -> np.ndarray:
+        return np.floor(np.asarray(degrees) / self.cell_deg).astype(np.int64)
+
+    def _keys(self, rows, columns):
+        return (rows << 32) + (columns + self.COLUMN_OFFSET)
+
+    def _clip(self, low: float, high: float, cell_range: Tuple[int, int]) -> Tuple[int, int]:
+        return max(int(self._cell(low)), cell_range[0]), min(int(self._cell(high)), cell_range[1])
+
+    def covers(self, latitude: float, longitude: float, radius_km: float) -> bool:
+        """True when the search box around the point contains every indexed point"""
+        min_lat, max_lat, min_lon, max_lon = bounding_box(latitude, longitude, radius_km)
+        return self._cell(min_lat) <= self.row_range[0] and self._cell(max_lat) >= self.row_range[1] \
+            and self._cell(min_lon) <= self.column_range[0] and self._cell(max_lon) >= self.column_range[1]
+
+    def within(self, latitude: float, longitude: float, radius_km: float,
+               mask: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Points within `radius_km` of the given point.
+
+        Returns:
+            tuple: (point indices in ascending order, distances in km)
+        """
+        min_lat, max_lat, min_lon, max_lon = bounding_box(latitude, longitude, radius_km)
+        first_row, last_row = self._clip(min_lat, max_lat, self.row_range)
+        first_column, last_column = self._clip(min_lon, max_lon, self.column_range)
+
+        slices = []
+        for row in range(first_row, last_row + 1):
+            start = int(np.searchsorted(self.keys, self._keys(row, first_column), side='left'))
+            end = int(np.searchsorted(self.keys, self._keys(row, last_column), side='right'))
+            if start < end:
+                slices.append(self.points[start:end])
+
+        if not slices:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+
+        candidates = np.sort(np.concatenate(slices))
+        if mask is not None:
+            candidates = candidates[mask[candidates]]
+        distances = haversine_km(self.latitude[candidates], self.longitude[candidates], latitude, longitude)
+        inside = distances <= radius_km
+        return candidates[inside], distances[inside]
+
+    def nearest(self, latitude: float, longitude: float, k: int,
+                mask: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        The `k` points closest to the given point, nearest first (ties by index).
+
+        Searches a growing radius until it holds `k` points; everything within the final
+        radius has been seen, so the result is exact.
+        """
+        if k <= 0 or len(self.points) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+
+        radius_km = self.cell_deg * KM_PER_DEGREE
+        while not self.covers(latitude, longitude, radius_km):
+            indices, distances = self.within(latitude, longitude, radius_km, mask)
+            if len(indices) >= k:
+                break
+            radius_km *= 2
+        else:
+            # Hộp tìm kiếm đã bao mọi điểm: xét toàn bộ
+            indices = np.sort(self.points)
+            if mask is not None:
+                indices = indices[mask[indices]]
+            distances = haversine_km(self.latitude[indices], self.longitude[indices], latitude, longitude)
+
+        order = np.lexsort((indices, distances))[:k]
+        return indices[order], distances[order]
@@ -1,14 +1,86 @@
-from collections import defaultdict
-from http.client import HTTPException
 from typing import Any, Optional, List, Dict
 
+from fastapi import HTTPException
+from psycopg.rows import dict_row, tuple_row
 from psycopg2.extras import RealDictCursor
 
+from ..dependency.db_connect import is_async_connection
+from ..utils.concurrency import run_in_threadpool
+from ..utils.metrics import Histogram
+from .geo import EARTH_RADIUS_KM, bounding_box
+from .snapshot import get_listing_snapshot
+
+DB_QUERY_SECONDS = Histogram("db_query_duration_seconds", "Time executing and fetching a HouseService query",
+                             ["query"])
+HOUSE_SERVICE_SECONDS = Histogram("house_service_duration_seconds",
+                                  "HouseService call time by method and backend (snapshot, async, threadpool)",
+                                  ["method", "backend"])
+_FEATURES_QUERY = DB_QUERY_SECONDS.labels("features")
+_VERSIONS_QUERY = DB_QUERY_SECONDS.labels("versions")
+_SEARCH_QUERY = DB_QUERY_SECONDS.labels("search")
+_HOUSES_BY_IDS_QUERY = DB_QUERY_SECONDS.labels("houses_by_ids")
+
+
+def distance_sql(latitude: float, longitude: float) -> tuple[str, list]:
+    """Haversine distance in km from (hr.latitude, hr.longitude) to the point, NULL without coordinates"""
+    # least() bỏ qua NULL nên phải kiểm tra tọa độ rỗng riêng
+    return (
+        "CASE WHEN hr.latitude IS NULL OR hr.longitude IS NULL THEN NULL"
+        " ELSE 2 * %s * asin(sqrt(least(1, power(sin(radians(hr.latitude - %s) / 2), 2)"
+        " + cos(radians(%s)) * cos(radians(hr.latitude)) * power(sin(radians(hr.longitude - %s) / 2), 2)))) END",
+        [EARTH_RADIUS_KM, latitude, latitude, longitude]
+    )
+
+
+def relevance_sql(q: str) -> tuple[str, list]:
+    """Full-text relevance of the listing's search document (`hs`, see `SEARCH_TEXT_FROM`) for `q`"""
+    return "ts_rank_cd(hs.document, public.search_tsquery(%s))", [q]
+
 
 class HouseService:
 
+    # Tên địa danh và danh sách tiện ích (json) lấy từ read model house_rent_read (migration 0004)
+    LISTING_COLUMNS = "hr.*, r.ward_name, r.district_name, r.province_name"
+
+    HOUSES_BY_IDS_QUERY = f"""
+                          SELECT {LISTING_COLUMNS}, r.environments
+                          FROM house_rent hr
+                                   LEFT JOIN public.house_rent_read r ON r.house_rent_id = hr.id
+                          WHERE hr.id = ANY(%s) \
+                            AND hr.available = TRUE
+                          ORDER BY hr.id \
+                          """
+
+    # Phiên bản của tin: update_time mới nhất của tin và các liên kết tiện ích của nó, kèm số liên kết
+    # (xóa một liên kết không làm tăng update_time nào)
+    VERSIONS_QUERY = """
+                     SELECT hr.id, GREATEST(hr.update_time, l.updated) AS version, l.links
+                     FROM house_rent hr
+                              CROSS JOIN LATERAL (SELECT max(hre.update_time) AS updated, count(*) AS links
+                                                  FROM public.house_rent_environment hre
+                                                  WHERE hre.house_rent_id = hr.id) l
+                     WHERE hr.id = ANY(%s) \
+                       AND hr.available = TRUE
+                     """
+
+    # Mỗi tin đều có một dòng house_rent_read (trigger); LEFT JOIN theo khóa chính để truy vấn
+    # đặc trưng (không dùng cột nào của r khi không lọc theo tỉnh/quận) được planner bỏ join
+    SEARCH_FROM = """
+                  FROM house_rent hr
+                           LEFT JOIN public.house_rent_read r ON r.house_rent_id = hr.id
+                  WHERE hr.available = TRUE \
+                  """
+
+    # SEARCH_FROM kèm tài liệu tìm kiếm toàn văn (migration 0003), dùng khi có tham số q
+    SEARCH_TEXT_FROM = """
+                       FROM house_rent hr
+                                JOIN public.house_rent_search hs ON hs.house_rent_id = hr.id
+                                LEFT JOIN public.house_rent_read r ON r.house_rent_id = hr.id
+                       WHERE hr.available = TRUE \
+                       """
+
     @staticmethod
-    def build_search_query(
+    def build_search_filters(
             province_id: Optional[int] = None,
             district_id: Optional[int] = None,
             ward_id: Optional[int] = None,
@@ -21,33 +93,33 @@ class HouseService:
             bedrooms: Optional[int] = None,
             living_rooms: Optional[int] = None,
             kitchens: Optional[int] = None,
-            limit: int = 10,
-            offset: int = 0
+            amenities: Optional[List[int]] = None,
+            amenities_match: str = "all",
+            latitude: Optional[float] = None,
+            longitude: Optional[float] = None,
+            radius_km: Optional[float] = None
     ) -> tuple[str, list]:
         """
-        Build SQL query and parameters for house rent search
+        Build the search conditions appended after `SEARCH_FROM`
+
+        `amenities` keeps listings having all (`amenities_match="all"`) or at least one
+        (`"any"`) of the given environment ids. `radius_km` keeps listings within that
+        distance of (`latitude`, `longitude`).
 
         Returns:
-            tuple: (query_string, parameters_list)
+            tuple: (conditions_string, parameters_list)
         """
-        query = """
-                SELECT hr.*, w.name as ward_name, d.name as district_name, p.name as province_name
-                FROM house_rent hr
-                         LEFT JOIN wards w ON hr.ward_id = w.id
-                         LEFT JOIN districts d ON w.district_id = d.id
-                         LEFT JOIN provinces p ON d.province_id = p.id
-                WHERE hr.available = TRUE \
-                """
+        conditions = ""
         params = []
 
         def add_condition(field: str, value: Any, operator: str = "="):
-            nonlocal query
+            nonlocal conditions
             if value is not None:
-                query += f" AND {field} {operator} %s"
+                conditions += f" AND {field} {operator} %s"
                 params.append(value)
 
-        add_condition("p.id", province_id)
-        add_condition("d.id", district_id)
+        add_condition("r.province_id", province_id)
+        add_condition("r.district_id", district_id)
         add_condition("hr.ward_id", ward_id)
         add_condition("hr.price", min_price, ">=")
         add_condition("hr.price", max_price, "<=")
@@ -59,33 +131,187 @@ class HouseService:
         add_condition("hr.living_rooms", living_rooms)
         add_condition("hr.kitchens", kitchens)
 
-        query += " ORDER BY hr.id LIMIT %s OFFSET %s"
-        params.extend([limit, offset])
+        if amenities:
+            amenity_ids = sorted(set(amenities))
+            if amenities_match == "any":
+                conditions += " AND EXISTS (SELECT 1 FROM public.house_rent_environment hre" \
+                              " WHERE hre.house_rent_id = hr.id AND hre.environment_id = ANY(%s))"
+                params.append(amenity_ids)
+            else:
+                conditions += " AND (SELECT COUNT(DISTINCT hre.environment_id) FROM public.house_rent_environment hre" \
+                              " WHERE hre.house_rent_id = hr.id AND hre.environment_id = ANY(%s)) = %s"
+                params.extend([amenity_ids, len(amenity_ids)])
+
+        if radius_km is not None and latitude is not None and longitude is not None:
+            # Lọc thô theo hộp bao (dùng được index) trước khi tính haversine
+            min_lat, max_lat, min_lon, max_lon = bounding_box(latitude, longitude, radius_km)
+            distance, distance_params = distance_sql(latitude, longitude)
+            conditions += " AND hr.latitude BETWEEN %s AND %s AND hr.longitude BETWEEN %s AND %s" \
+                          f" AND {distance} <= %s"
+            params.extend([min_lat, max_lat, min_lon, max_lon, *distance_params, radius_km])
+
+        return conditions, params
+
+    @classmethod
+    def build_search_query(
+            cls,
+            province_id: Optional[int] = None,
+            district_id: Optional[int] = None,
+            ward_id: Optional[int] = None,
+            min_price: Optional[float] = None,
+            max_price: Optional[float] = None,
+            min_acreage: Optional[float] = None,
+            max_acreage: Optional[float] = None,
+            house_type: Optional[str] = None,
+            contract_period: Optional[str] = None,
+            bedrooms: Optional[int] = None,
+            living_rooms: Optional[int] = None,
+            kitchens: Optional[int] = None,
+            amenities: Optional[List[int]] = None,
+            amenities_match: str = "all",
+            latitude: Optional[float] = None,
+            longitude: Optional[float] = None,
+            radius_km: Optional[float] = None,
+            q: Optional[str] = None,
+            order_by: str = "id",
+            after: Optional[Dict[str, Any]] = None,
+            limit: int = 10,
+            offset: int = 0
+    ) -> tuple[str, list]:
+        """
+        Build SQL query and parameters for house rent search
+
+        When `latitude`/`longitude` are given each row carries `distance_km`, and
+        `order_by="distance"` returns the nearest listings first.
+
+        `q` keeps listings whose title, address or amenities contain every word of it
+        (accent-insensitive, prefix match); each row then carries `relevance` and
+        `order_by="relevance"` returns the best matches first.
+
+        `after` is a keyset position ({"id": ..., "distance": ..., "relevance": ...}) of the
+        last row of the previous page; rows strictly after it are returned, so deep pages
+        cost the same as the first one. Use it with `offset=0`.
+
+        Returns:
+            tuple: (query_string, parameters_list)
+        """
+        conditions, params = cls.build_search_filters(
+            province_id=province_id,
+            district_id=district_id,
+            ward_id=ward_id,
+            min_price=min_price,
+            max_price=max_price,
+            min_acreage=min_acreage,
+            max_acreage=max_acreage,
+            house_type=house_type,
+            contract_period=contract_period,
+            bedrooms=bedrooms,
+            living_rooms=living_rooms,
+            kitchens=kitchens,
+            amenities=amenities,
+            amenities_match=amenities_match,
+            latitude=latitude,
+            longitude=longitude,
+            radius_km=radius_km
+        )
+
+        query = "SELECT " + cls.LISTING_COLUMNS
+        select_params = []
+        order = " ORDER BY hr.id"
+        by_distance = by_relevance = False
+        if latitude is not None and longitude is not None:
+            distance, distance_params = distance_sql(latitude, longitude)
+            query += f", {distance} AS distance_km"
+            select_params.extend(distance_params)
+            if order_by == "distance":
+                order = " ORDER BY distance_km NULLS LAST, hr.id"
+                by_distance = True
+
+        search_from = cls.SEARCH_FROM
+        if q:
+            search_from = cls.SEARCH_TEXT_FROM
+            relevance, relevance_params = relevance_sql(q)
+            query += f", {relevance} AS relevance"
+            select_params.extend(relevance_params)
+            conditions += " AND hs.document @@ public.search_tsquery(%s)"
+            params.append(q)
+            if order_by == "relevance":
+                order = " ORDER BY relevance DESC, hr.id"
+                by_relevance = True
+
+        if after is not None:
+            if by_relevance:
+                # ts_rank_cd trả về real: so sánh ở cùng kiểu để khớp đúng giá trị trong cursor
+                conditions += f" AND ({relevance} < %s::real OR ({relevance} = %s::real AND hr.id > %s))"
+                params.extend([*relevance_params, after["relevance"], *relevance_params, after["relevance"], after["id"]])
+            elif not by_distance:
+                conditions += " AND hr.id > %s"
+                params.append(after["id"])
+            elif after.get("distance") is None:
+                # Đã sang phần NULLS LAST: chỉ còn các tin không có tọa độ
+                conditions += " AND (hr.latitude IS NULL OR hr.longitude IS NULL) AND hr.id > %s"
+                params.append(after["id"])
+            else:
+                distance, distance_params = distance_sql(latitude, longitude)
+                conditions += f" AND ({distance} > %s OR ({distance} = %s AND hr.id > %s)" \
+                              " OR hr.latitude IS NULL OR hr.longitude IS NULL)"
+                params.extend([*distance_params, after["distance"], *distance_params, after["distance"], after["id"]])
+
+        query += ", r.environments" + search_from + conditions + order + " LIMIT %s OFFSET %s"
+        params = select_params + params + [limit, offset]
 
         return query, params
 
-    @staticmethod
-    def get_house_environments(conn, house_ids: List[int]) -> Dict[int, List[Dict]]:
-        """Get environment data for given house IDs"""
-        if not house_ids:
-            return {}
+    @classmethod
+    def build_feature_query(cls, amenity_weights: Dict[int, float], **filters) -> tuple[str, list]:
+        """
+        Build a query returning only the TOPSIS inputs of every listing matching the filters
+
+        Columns: id, price, acreage, latitude, longitude, amenities_w. The amenity weight sum
+        is computed in SQL so no environment rows leave the database.
+
+        Args:
+            amenity_weights: environment id -> weight
+            **filters: same keyword filters as `build_search_filters`
+        """
+        conditions, filter_params = cls.build_search_filters(**filters)
+        params = []
 
-        house_ids_tuple = tuple(house_ids)
+        if amenity_weights:
+            amenities_w = """
+                COALESCE((SELECT SUM(aw.weight)
+                          FROM public.house_rent_environment hre
+                                   JOIN unnest(%s::bigint[], %s::float8[]) AS aw(environment_id, weight)
+                                        ON aw.environment_id = hre.environment_id
+                          WHERE hre.house_rent_id = hr.id), 0)"""
+            params.extend([list(amenity_weights.keys()), [float(w) for w in amenity_weights.values()]])
+        else:
+            amenities_w = "0"
+
+        query = f"SELECT hr.id, hr.price, hr.acreage, hr.latitude, hr.longitude, {amenities_w} AS amenities_w" \
+                + cls.SEARCH_FROM + conditions
+        params.extend(filter_params)
 
-        with conn.cursor(cursor_factory=RealDictCursor) as cur:
-            cur.execute("""
-                        SELECT hre.house_rent_id, e.id, e.category, e.value
-                        FROM public.house_rent_environment hre
-                                 JOIN public.environment e ON hre.environment_id = e.id
-                        WHERE hre.house_rent_id IN %s
-                        """, (house_ids_tuple,))
-            env_rows = cur.fetchall()
+        return query, params
+
+    @classmethod
+    def get_house_features(cls, conn, amenity_weights: Dict[int, float], **filters) -> List[tuple]:
+        """Get (id, price, acreage, latitude, longitude, amenities_w) tuples for every matching listing"""
+        query, params = cls.build_feature_query(amenity_weights, **filters)
+
+        with conn.cursor() as cur, _FEATURES_QUERY.time():
+            cur.execute(query, tuple(params))
+            return cur.fetchall()
 
-        environments_by_house_id = defaultdict(list)
-        for env in env_rows:
-            environments_by_house_id[env['house_rent_id']].append(dict(env))
+    @classmethod
+    def get_house_versions(cls, conn, house_ids: List[int]) -> Dict[int, Any]:
+        """id -> version (latest update_time, amenity link count) of the available houses among `house_ids`"""
+        if not house_ids:
+            return {}
 
-        return environments_by_house_id
+        with conn.cursor() as cur, _VERSIONS_QUERY.time():
+            cur.execute(cls.VERSIONS_QUERY, (list(house_ids),))
+            return {house_id: (version, links) for house_id, version, links in cur.fetchall()}
 
     @classmethod
     def search_house_rent(
@@ -103,6 +329,14 @@ class HouseService:
             bedrooms: Optional[int] = None,
             living_rooms: Optional[int] = None,
             kitchens: Optional[int] = None,
+            amenities: Optional[List[int]] = None,
+            amenities_match: str = "all",
+            latitude: Optional[float] = None,
+            longitude: Optional[float] = None,
+            radius_km: Optional[float] = None,
+            q: Optional[str] = None,
+            order_by: str = "id",
+            after: Optional[Dict[str, Any]] = None,
             limit: int = 10,
             offset: int = 0
     ) -> List[Dict]:
@@ -127,29 +361,24 @@ class HouseService:
                 bedrooms=bedrooms,
                 living_rooms=living_rooms,
                 kitchens=kitchens,
+                amenities=amenities,
+                amenities_match=amenities_match,
+                latitude=latitude,
+                longitude=longitude,
+                radius_km=radius_km,
+                q=q,
+                order_by=order_by,
+                after=after,
                 limit=limit,
                 offset=offset
             )
 
-            with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            with conn.cursor(cursor_factory=RealDictCursor) as cur, _SEARCH_QUERY.time():
                 cur.execute(query, tuple(params))
                 results = cur.fetchall()
 
-            if not results:
-                return []
-
             # Convert to list of dictionaries
-            houses = [dict(row) for row in results]
-            house_ids = [house['id'] for house in houses]
-
-            # Get environment data
-            environments_by_house_id = cls.get_house_environments(conn, house_ids)
-
-            # Combine house data with environment data
-            for house in houses:
-                house['environments'] = environments_by_house_id.get(house['id'], [])
-
-            return houses
+            return [dict(row) for row in results]
 
         except Exception as e:
             raise HTTPException(
@@ -173,36 +402,63 @@ class HouseService:
             return []
 
         try:
-            house_ids_tuple = tuple(house_ids)
-            query = """
-                    SELECT hr.*, w.name as ward_name, d.name as district_name, p.name as province_name
-                    FROM house_rent hr
-                             LEFT JOIN wards w ON hr.ward_id = w.id
-                             LEFT JOIN districts d ON w.district_id = d.id
-                             LEFT JOIN provinces p ON d.province_id = p.id
-                    WHERE hr.id IN %s \
-                      AND hr.available = TRUE
-                    ORDER BY hr.id \
-                    """
-
-            with conn.cursor(cursor_factory=RealDictCursor) as cur:
-                cur.execute(query, (house_ids_tuple,))
+            with conn.cursor(cursor_factory=RealDictCursor) as cur, _HOUSES_BY_IDS_QUERY.time():
+                cur.execute(cls.HOUSES_BY_IDS_QUERY, (list(house_ids),))
                 results = cur.fetchall()
 
-            if not results:
-                return []
-
             # Convert to list of dictionaries
-            houses = [dict(row) for row in results]
+            return [dict(row) for row in results]
+
+        except Exception as e:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Database query failed: {str(e)}"
+            )
+
+
+class AsyncHouseService(HouseService):
+    """
+    Async data-access counterpart of `HouseService` for psycopg 3 `AsyncConnection`s.
 
-            # Get environment data for all houses
-            environments_by_house_id = cls.get_house_environments(conn, house_ids)
+    Shares query building and result shaping with the sync service; only I/O differs.
+    """
 
-            # Combine house data with environment data
-            for house in houses:
-                house['environments'] = environments_by_house_id.get(house['id'], [])
+    @classmethod
+    async def get_house_features(cls, conn, amenity_weights: Dict[int, float], **filters) -> List[tuple]:
+        """Get (id, price, acreage, latitude, longitude, amenities_w) tuples for every matching listing"""
+        query, params = cls.build_feature_query(amenity_weights, **filters)
+
+        async with conn.cursor(row_factory=tuple_row) as cur:
+            with _FEATURES_QUERY.time():
+                await cur.execute(query, tuple(params))
+                return await cur.fetchall()
+
+    @classmethod
+    async def get_house_versions(cls, conn, house_ids: List[int]) -> Dict[int, Any]:
+        """id -> version (latest update_time, amenity link count) of the available houses among `house_ids`"""
+        if not house_ids:
+            return {}
 
-            return houses
+        async with conn.cursor(row_factory=tuple_row) as cur:
+            with _VERSIONS_QUERY.time():
+                await cur.execute(cls.VERSIONS_QUERY, (list(house_ids),))
+                rows = await cur.fetchall()
+            return {house_id: (version, links) for house_id, version, links in rows}
+
+    @classmethod
+    async def search_house_rent(cls, conn, **filters) -> List[Dict]:
+        """
+        Search house rent information with filtering and pagination
+
+        Accepts the same keyword filters as `HouseService.search_house_rent`.
+        """
+        try:
+            query, params = cls.build_search_query(**filters)
+
+            async with conn.cursor(row_factory=dict_row) as cur:
+                with _SEARCH_QUERY.time():
+                    await cur.execute(query, tuple(params))
+                    return await cur.fetchall()
 
         except Exception as e:
             raise HTTPException(
@@ -210,3 +466,46 @@ class HouseService:
                 detail=f"Database query failed: {str(e)}"
             )
 
+    @classmethod
+    async def get_multiple_houses_by_ids(cls, conn, house_ids: List[int]) -> List[Dict]:
+        """Get multiple houses by their IDs"""
+        if not house_ids:
+            return []
+
+        try:
+            async with conn.cursor(row_factory=dict_row) as cur:
+                with _HOUSES_BY_IDS_QUERY.time():
+                    await cur.execute(cls.HOUSES_BY_IDS_QUERY, (list(house_ids),))
+                    return await cur.fetchall()
+
+        except Exception as e:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Database query failed: {str(e)}"
+            )
+
+
+# Các phương thức `ListingSnapshot` trả cùng kết quả với `HouseService`
+SNAPSHOT_METHODS = {"search_house_rent", "get_multiple_houses_by_ids", "get_house_features", "get_house_versions"}
+
+
+async def run_house_service(conn, method: str, *args, **kwargs):
+    """
+    Call `method` on the service matching the connection kind.
+
+    Async connections go through `AsyncHouseService`; psycopg2 connections run the sync
+    `HouseService` in a worker thread so `async def` routes never block the event loop.
+    When the listing snapshot is loaded, the methods it implements are answered from memory
+    (except full-text searches, which need the database's search index).
+    """
+    snapshot = get_listing_snapshot()
+    if snapshot is not None and method in SNAPSHOT_METHODS and not kwargs.get("q"):
+        with HOUSE_SERVICE_SECONDS.labels(method, "snapshot").time():
+            return getattr(snapshot, method)(*args, **kwargs)
+
+    if is_async_connection(conn):
+        with HOUSE_SERVICE_SECONDS.labels(method, "async").time():
+            return await getattr(AsyncHouseService, method)(conn, *args, **kwargs)
+    # Gồm cả thời gian chờ worker thread
+    with HOUSE_SERVICE_SECONDS.labels(method, "threadpool").time():
+        return await run_in_threadpool(getattr(HouseService, method), conn, *args, **kwargs)
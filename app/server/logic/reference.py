@@ -0,0 +1,36 @@
+from typing import Any, Hashable, Optional, Sequence
+
+from fastapi import HTTPException, Request, Response
+from pydantic import TypeAdapter
+
+from ..config import settings
+from ..dependency.db_connect import fetch_all, pooled_connection
+from ..utils.cache import LRUCache, cached_json_response
+
+# Danh mục tỉnh/huyện/xã, loại nhà, tiện ích: gần như không đổi trong ngày
+reference_cache = LRUCache("reference", max_size=1024, ttl=settings.reference_cache_ttl)
+
+
+async def reference_response(
+        request: Request,
+        key: Hashable,
+        adapter: TypeAdapter,
+        query: str,
+        params: Optional[Sequence[Any]] = None
+) -> Response:
+    """
+    Serve a reference-data query from `reference_cache` with ETag / Cache-Control headers.
+
+    A database connection is only checked out on a cache miss.
+    """
+    async def load() -> bytes:
+        async with pooled_connection() as conn:
+            rows = await fetch_all(conn, query, params)
+        return adapter.dump_json(adapter.validate_python(rows))
+
+    try:
+        return await cached_json_response(request, reference_cache, key, load, settings.reference_cache_max_age)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database query failed: {e}")
@@ -0,0 +1,589 @@
+import logging
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, NamedTuple, Optional
+
+import numpy as np
+from psycopg2.extras import RealDictCursor
+
+from ..utils.metrics import register_collector
+from . import amenity
+from .amenity import AmenityBitset
+from .geo import GeoIndex, haversine_km
+
+logger = logging.getLogger(__name__)
+
+# Giá trị đại diện NULL cho các cột số nguyên có thể rỗng (bedrooms, living_rooms, kitchens)
+NULL_INT = np.iinfo(np.int32).min
+
+# Thứ tự cột giống `hr.*` để kết quả trả ra trùng với truy vấn SQL
+HOUSE_COLUMNS = [
+    'id', 'available', 'published', 'price', 'acreage', 'address', 'house_number', 'street', 'ward_id',
+    'latitude', 'longitude', 'title', 'phone_number', 'create_time', 'update_time', 'house_type',
+    'contract_period', 'bedrooms', 'living_rooms', 'kitchens', 'ward_name', 'district_name', 'province_name',
+]
+
+INT_COLUMNS = ['id', 'ward_id', 'district_id', 'province_id']
+FLOAT_COLUMNS = ['price', 'acreage', 'latitude', 'longitude']
+NULLABLE_INT_COLUMNS = ['bedrooms', 'living_rooms', 'kitchens']
+DATE_COLUMNS = {'published': 'datetime64[D]', 'create_time': 'datetime64[us]', 'update_time': 'datetime64[us]'}
+STRING_COLUMNS = [
+    'address', 'house_number', 'street', 'title', 'phone_number', 'house_type', 'contract_period',
+    'ward_name', 'district_name', 'province_name',
+]
+
+LISTINGS_QUERY = """
+                 SELECT hr.id, hr.available, hr.published, hr.price, hr.acreage, hr.address, hr.house_number,
+                        hr.street, hr.ward_id, hr.latitude, hr.longitude, hr.title, hr.phone_number,
+                        hr.create_time, hr.update_time, hr.house_type, hr.contract_period, hr.bedrooms,
+                        hr.living_rooms, hr.kitchens, w.name as ward_name, d.name as district_name,
+                        p.name as province_name, w.district_id, d.province_id,
+                        GREATEST(hr.update_time, l.updated) as version, l.links as version_links
+                 FROM house_rent hr
+                          LEFT JOIN wards w ON hr.ward_id = w.id
+                          LEFT JOIN districts d ON w.district_id = d.id
+                          LEFT JOIN provinces p ON d.province_id = p.id
+                          CROSS JOIN LATERAL (SELECT max(hre.update_time) AS updated, count(*) AS links
+                                              FROM public.house_rent_environment hre
+                                              WHERE hre.house_rent_id = hr.id) l \
+                 """
+
+CHANGED_LISTINGS_CONDITION = """
+                             WHERE hr.update_time > %(since)s
+                                OR w.update_time > %(since)s
+                                OR d.update_time > %(since)s
+                                OR p.update_time > %(since)s
+                                OR hr.id IN (SELECT hre.house_rent_id
+                                             FROM public.house_rent_environment hre
+                                             WHERE hre.update_time > %(since)s)
+                                OR hr.id IN (SELECT u.house_rent_id
+                                             FROM public.house_rent_environment_unlinked u
+                                             WHERE u.unlinked_at > %(since)s) \
+                             """
+
+LISTING_ENVIRONMENTS_QUERY = """
+                             SELECT hre.house_rent_id, hre.environment_id
+                             FROM public.house_rent_environment hre \
+                             """
+
+
+class StringColumn:
+    """
+    Dictionary-encoded string column: one int32 code per row plus the list of distinct values.
+
+    The dictionary is append-only, so codes stay valid across incremental refreshes.
+    """
+
+    def __init__(self):
+        self.values: List[str] = []
+        self.index: Dict[str, int] = {}
+
+    def encode(self, values) -> np.ndarray:
+        codes = np.empty(len(values), dtype=np.int32)
+        for i, value in enumerate(values):
+            if value is None:
+                codes[i] = -1
+                continue
+            code = self.index.get(value)
+            if code is None:
+                code = self.index[value] = len(self.values)
+                self.values.append(value)
+            codes[i] = code
+        return codes
+
+    def code_of(self, value: str) -> Optional[int]:
+        return self.index.get(value)
+
+    def decode(self, code: int) -> Optional[str]:
+        return None if code < 0 else self.values[code]
+
+    def copy(self) -> "StringColumn":
+        column = StringColumn()
+        column.values = list(self.values)
+        column.index = dict(self.index)
+        return column
+
+    def nbytes(self) -> int:
+        return sys.getsizeof(self.values) + sys.getsizeof(self.index) + sum(sys.getsizeof(v) for v in self.values)
+
+
+class SnapshotState(NamedTuple):
+    """
+    One consistent version of the snapshot, never modified once published.
+
+    Codes in `columns` are only meaningful with the `strings` dictionaries of the same state,
+    so readers take the state once per call and use nothing else.
+    """
+    columns: Dict[str, np.ndarray]
+    strings: Dict[str, StringColumn]
+    environment_catalog: Dict[int, Dict[str, Any]]
+
+
+class ListingSnapshot:
+    """
+    In-process, columnar copy of `house_rent` (with location names and amenities) used to
+    answer searches and id lookups with NumPy boolean masks instead of SQL round-trips.
+
+    Columns are kept sorted by id. Loads and refreshes build a new `SnapshotState` aside and
+    publish it with one assignment: readers always see one consistent set of arrays,
+    dictionaries and amenity catalog, and `refresh` only re-reads rows whose `update_time` (or the
+    `update_time` of their ward/district/province/amenity links, or an amenity unlink recorded by
+    migration 0005) moved past the watermark.
+    Rows deleted from the database are only dropped by a full `load`.
+    """
+
+    # Đọc lùi lại một khoảng để không bỏ sót giao dịch commit muộn với update_time cũ hơn watermark.
+    # Watermark là now() của database lúc bắt đầu lần đọc trước, không phụ thuộc đồng hồ của server
+    WATERMARK_OVERLAP = timedelta(seconds=60)
+
+    def __init__(self):
+        self._state: Optional[SnapshotState] = None
+        self._watermark: Optional[datetime] = None
+        # (columns, GeoIndex) - index dựng lại lười khi bộ cột thay đổi
+        self._geo: Optional[tuple] = None
+        self._lock = threading.Lock()
+
+        self.loaded_at: Optional[float] = None
+        self.refreshed_at: Optional[float] = None
+        self.full_loads = 0
+        self.refreshes = 0
+        self.rows_refreshed = 0
+
+    @property
+    def ready(self) -> bool:
+        return self._state is not None
+
+    def __len__(self):
+        state = self._state
+        return 0 if state is None else len(state.columns['id'])
+
+    # ------------------------------------------------------------------ loading
+
+    def load(self, conn):
+        """Full (re)load of every listing; also drops rows deleted from the database."""
+        with self._lock:
+            started_at = self._database_now(conn)
+            catalog = self._fetch_environment_catalog(conn)
+            rows = self._fetch(conn, LISTINGS_QUERY + " ORDER BY hr.id", {})
+            environments = self._fetch_environments(conn, None)
+
+            # Bắt đầu từ dictionary rỗng để giải phóng các giá trị không còn dùng
+            strings = {name: StringColumn() for name in STRING_COLUMNS}
+            columns = self._encode(rows, environments, strings, catalog)
+            self._state = SnapshotState(columns, strings, catalog)
+            self._watermark = started_at
+
+            self.loaded_at = self.refreshed_at = time.time()
+            self.full_loads += 1
+
+    def refresh(self, conn) -> int:
+        """Re-read listings changed since the last load/refresh; returns the number of rows applied."""
+        if self._state is None:
+            self.load(conn)
+            return len(self)
+
+        with self._lock:
+            state = self._state
+            started_at = self._database_now(conn)
+            since = self._watermark - self.WATERMARK_OVERLAP
+            catalog = self._fetch_environment_catalog(conn)
+            rows = self._fetch(conn, LISTINGS_QUERY + CHANGED_LISTINGS_CONDITION + " ORDER BY hr.id", {"since": since})
+
+            columns, strings = state.columns, state.strings
+            if rows:
+                environments = self._fetch_environments(conn, [row['id'] for row in rows])
+                # Mã hóa vào bản sao của dictionary: state đang được đọc không bị thay đổi
+                strings = {name: column.copy() for name, column in strings.items()}
+                columns = self._merge(columns, self._encode(rows, environments, strings, catalog))
+            self._state = SnapshotState(columns, strings, catalog)
+
+            self._watermark = started_at
+            self.refreshed_at = time.time()
+            self.refreshes += 1
+            self.rows_refreshed += len(rows)
+            return len(rows)
+
+    @staticmethod
+    def _database_now(conn) -> datetime:
+        with conn.cursor() as cur:
+            cur.execute("SELECT LOCALTIMESTAMP")
+            now = cur.fetchone()[0]
+        conn.rollback()
+        return now
+
+    @staticmethod
+    def _fetch(conn, query: str, params: Dict) -> List[Dict]:
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute(query, params)
+            rows = cur.fetchall()
+        conn.rollback()
+        return rows
+
+    def _fetch_environments(self, conn, house_ids: Optional[List[int]]) -> Dict[int, List]:
+        query, params = LISTING_ENVIRONMENTS_QUERY, {}
+        if house_ids is not None:
+            query += " WHERE hre.house_rent_id = ANY(%(ids)s)"
+            params = {"ids": house_ids}
+        environments: Dict[int, List] = {}
+        for row in self._fetch(conn, query + " ORDER BY hre.id", params):
+            environments.setdefault(row['house_rent_id'], []).append(row['environment_id'])
+        return environments
+
+    def _fetch_environment_catalog(self, conn) -> Dict[int, Dict[str, Any]]:
+        rows = self._fetch(conn, "SELECT id, category, value FROM public.environment", {})
+        return {row['id']: dict(row) for row in rows}
+
+    @staticmethod
+    def _encode(rows: List[Dict], environments: Dict[int, List], strings: Dict[str, StringColumn],
+                catalog: Dict[int, Dict[str, Any]]) -> Dict[str, np.ndarray]:
+        """Columns of `rows`, string values encoded into (and added to) `strings`"""
+        n = len(rows)
+        columns: Dict[str, np.ndarray] = {}
+
+        for name in INT_COLUMNS:
+            columns[name] = np.array([row[name] if row[name] is not None else -1 for row in rows], dtype=np.int64)
+        for name in FLOAT_COLUMNS:
+            columns[name] = np.array([row[name] for row in rows], dtype=np.float64).reshape(n)
+        for name in NULLABLE_INT_COLUMNS:
+            columns[name] = np.array([row[name] if row[name] is not None else NULL_INT for row in rows], dtype=np.int32)
+        for name, dtype in DATE_COLUMNS.items():
+            columns[name] = np.array([row[name] if row[name] is not None else 'NaT' for row in rows], dtype=dtype)
+        for name in STRING_COLUMNS:
+            columns[name] = strings[name].encode([row[name] for row in rows])
+        # Phiên bản của tin = update_time mới nhất của tin và các liên kết tiện ích, kèm số liên kết
+        columns['version'] = np.array([row['version'] if row['version'] is not None else 'NaT' for row in rows],
+                                      dtype='datetime64[us]')
+        columns['version_links'] = np.array([row['version_links'] for row in rows], dtype=np.int32)
+
+        columns['available'] = np.array([row['available'] is True for row in rows], dtype=bool)
+
+        # Tiện ích của mỗi nhà: một hàng bitset uint64, bit j = environment.id j
+        n_words = amenity.words_for(max(catalog, default=0))
+        columns['amenity_bits'] = amenity.encode([environments.get(row['id'], ()) for row in rows], n_words)
+
+        return columns
+
+    @staticmethod
+    def _merge(base: Dict[str, np.ndarray], delta: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """Copy-on-write upsert of `delta` rows into `base`, keeping rows sorted by id."""
+        # Danh mục tiện ích có thể đã thêm id mới, cần nới rộng bitset
+        n_words = max(base['amenity_bits'].shape[1], delta['amenity_bits'].shape[1])
+        base = dict(base, amenity_bits=amenity.widen(base['amenity_bits'], n_words))
+        delta = dict(delta, amenity_bits=amenity.widen(delta['amenity_bits'], n_words))
+
+        positions = np.searchsorted(base['id'], delta['id'])
+        in_range = positions < len(base['id'])
+        existing = np.zeros(len(delta['id']), dtype=bool)
+        existing[in_range] = base['id'][positions[in_range]] == delta['id'][in_range]
+
+        merged = {name: column.copy() for name, column in base.items()}
+        for name, column in delta.items():
+            merged[name][positions[existing]] = column[existing]
+
+        if existing.all():
+            return merged
+
+        new = ~existing
+        merged = {name: np.concatenate([merged[name], delta[name][new]]) for name in merged}
+        order = np.argsort(merged['id'], kind='stable')
+        return {name: column[order] for name, column in merged.items()}
+
+    # ------------------------------------------------------------------ queries
+
+    @staticmethod
+    def _rows(state: SnapshotState, indices: np.ndarray) -> List[Dict]:
+        """Materialise rows in the same shape as `HouseService` query results."""
+        if len(indices) == 0:
+            return []
+
+        columns = state.columns
+        picked = {name: columns[name][indices] for name in columns}
+        values: Dict[str, list] = {}
+        for name in ('id', 'ward_id'):
+            values[name] = picked[name].tolist()
+        for name in FLOAT_COLUMNS:
+            values[name] = [None if np.isnan(x) else x for x in picked[name].tolist()]
+        for name in NULLABLE_INT_COLUMNS:
+            values[name] = [None if x == NULL_INT else x for x in picked[name].tolist()]
+        for name in DATE_COLUMNS:
+            # NaT -> None, còn lại -> datetime.date / datetime.datetime
+            values[name] = picked[name].astype(object).tolist()
+        for name in STRING_COLUMNS:
+            decode = state.strings[name].decode
+            values[name] = [decode(code) for code in picked[name].tolist()]
+        values['available'] = picked['available'].tolist()
+        values['ward_id'] = [None if x == -1 else x for x in values['ward_id']]
+
+        catalog = state.environment_catalog
+        environment_ids = AmenityBitset(picked['amenity_bits']).ids()
+        houses = []
+        for i in range(len(indices)):
+            house = {name: values[name][i] for name in HOUSE_COLUMNS}
+            house['environments'] = [
+                dict(catalog[env_id], house_rent_id=house['id'])
+                for env_id in environment_ids[i] if env_id in catalog
+            ]
+            houses.append(house)
+        return houses
+
+    def _filter_mask(
+            self,
+            state: SnapshotState,
+            province_id: Optional[int] = None,
+            district_id: Optional[int] = None,
+            ward_id: Optional[int] = None,
+            min_price: Optional[float] = None,
+            max_price: Optional[float] = None,
+            min_acreage: Optional[float] = None,
+            max_acreage: Optional[float] = None,
+            house_type: Optional[str] = None,
+            contract_period: Optional[str] = None,
+            bedrooms: Optional[int] = None,
+            living_rooms: Optional[int] = None,
+            kitchens: Optional[int] = None,
+            amenities: Optional[List[int]] = None,
+            amenities_match: str = "all",
+            latitude: Optional[float] = None,
+            longitude: Optional[float] = None,
+            radius_km: Optional[float] = None
+    ) -> np.ndarray:
+        """Same filters as `HouseService.build_search_filters`, evaluated as a boolean mask"""
+        columns = state.columns
+        mask = columns['available'].copy()
+
+        def add_condition(name: str, value: Any, op):
+            nonlocal mask
+            if value is not None:
+                mask &= op(columns[name], value)
+
+        def add_string_condition(name: str, value: Optional[str]):
+            nonlocal mask
+            if value is not None:
+                code = state.strings[name].code_of(value)
+                mask &= columns[name] == (code if code is not None else -2)
+
+        add_condition('province_id', province_id, np.equal)
+        add_condition('district_id', district_id, np.equal)
+        add_condition('ward_id', ward_id, np.equal)
+        add_condition('price', min_price, np.greater_equal)
+        add_condition('price', max_price, np.less_equal)
+        add_condition('acreage', min_acreage, np.greater_equal)
+        add_condition('acreage', max_acreage, np.less_equal)
+        add_string_condition('house_type', house_type)
+        add_string_condition('contract_period', contract_period)
+        add_condition('bedrooms', bedrooms, np.equal)
+        add_condition('living_rooms', living_rooms, np.equal)
+        add_condition('kitchens', kitchens, np.equal)
+
+        if amenities:
+            bitset = AmenityBitset(columns['amenity_bits'])
+            mask &= bitset.has_any(amenities) if amenities_match == "any" else bitset.has_all(amenities)
+
+        if radius_km is not None and latitude is not None and longitude is not None:
+            inside, _ = self._geo_index(columns).within(latitude, longitude, radius_km)
+            within = np.zeros(len(mask), dtype=bool)
+            within[inside] = True
+            mask &= within
+
+        return mask
+
+    def _geo_index(self, columns: Dict[str, np.ndarray]) -> GeoIndex:
+        cached = self._geo
+        if cached is None or cached[0] is not columns:
+            cached = self._geo = (columns, GeoIndex(columns['latitude'], columns['longitude']))
+        return cached[1]
+
+    def search_house_rent(self, order_by: str = "id", after: Optional[Dict[str, Any]] = None,
+                          limit: int = 10, offset: int = 0, q: Optional[str] = None, **filters) -> List[Dict]:
+        """
+        Same filters, ordering, keyset paging and `distance_km` as `HouseService.search_house_rent`.
+
+        Full-text search (`q`) is not available here; `run_house_service` sends it to the database.
+        """
+        if q:
+            raise ValueError("Full-text search is not served from the listing snapshot")
+        state = self._state
+        columns = state.columns
+        mask = self._filter_mask(state, **filters)
+        latitude, longitude = filters.get('latitude'), filters.get('longitude')
+        located = latitude is not None and longitude is not None
+        by_distance = located and order_by == "distance"
+
+        if after is not None:
+            if not by_distance:
+                # id đã được sắp xếp: bỏ qua mọi hàng đến hết after["id"]
+                mask[:np.searchsorted(columns['id'], after['id'], side='right')] = False
+            elif after.get('distance') is None:
+                mask &= (np.isnan(columns['latitude']) | np.isnan(columns['longitude'])) & (columns['id'] > after['id'])
+            else:
+                seen, distances = self._geo_index(columns).within(latitude, longitude, after['distance'])
+                seen = seen[(distances < after['distance'])
+                            | ((distances == after['distance']) & (columns['id'][seen] <= after['id']))]
+                mask[seen] = False
+
+        if by_distance:
+            nearest, _ = self._geo_index(columns).nearest(latitude, longitude, offset + limit, mask)
+            indices = nearest[offset:]
+            if len(indices) < limit:
+                # Giống NULLS LAST: tin không có tọa độ xếp sau cùng, theo id
+                no_location = mask & (np.isnan(columns['latitude']) | np.isnan(columns['longitude']))
+                start = max(0, offset - int(np.count_nonzero(mask & ~no_location)))
+                tail = np.flatnonzero(no_location)[start:start + limit - len(indices)]
+                indices = np.concatenate([indices, tail])
+        else:
+            indices = np.flatnonzero(mask)[offset:offset + limit]
+
+        houses = self._rows(state, indices)
+        if located:
+            distances = haversine_km(columns['latitude'][indices], columns['longitude'][indices], latitude, longitude)
+            for house, distance in zip(houses, distances.tolist()):
+                house['distance_km'] = None if np.isnan(distance) else distance
+        return houses
+
+    def get_house_features(self, amenity_weights: Dict[int, float], **filters) -> List[tuple]:
+        """(id, price, acreage, latitude, longitude, amenities_w) for every matching listing"""
+        state = self._state
+        columns = state.columns
+        indices = np.flatnonzero(self._filter_mask(state, **filters))
+        amenities_w = AmenityBitset(columns['amenity_bits'][indices]).weights(amenity_weights)
+        return list(zip(
+            columns['id'][indices].tolist(),
+            *(columns[name][indices].tolist() for name in ('price', 'acreage', 'latitude', 'longitude')),
+            amenities_w.tolist(),
+        ))
+
+    def get_multiple_houses_by_ids(self, house_ids: List[int]) -> List[Dict]:
+        """Available houses among `house_ids`, ordered by id"""
+        state = self._state
+        columns = state.columns
+        if not house_ids:
+            return []
+
+        wanted = np.unique(np.asarray(house_ids, dtype=np.int64))
+        positions = np.searchsorted(columns['id'], wanted)
+        positions = positions[positions < len(columns['id'])]
+        positions = positions[np.isin(columns['id'][positions], wanted)]
+        positions = positions[columns['available'][positions]]
+        return self._rows(state, positions)
+
+    def get_house_versions(self, house_ids: List[int]) -> Dict[int, Any]:
+        """id -> version (latest update_time of the listing or its amenity links, their count) of the available houses"""
+        columns = self._state.columns
+        if not house_ids:
+            return {}
+
+        wanted = np.unique(np.asarray(house_ids, dtype=np.int64))
+        positions = np.searchsorted(columns['id'], wanted)
+        positions = positions[positions < len(columns['id'])]
+        positions = positions[np.isin(columns['id'][positions], wanted)]
+        positions = positions[columns['available'][positions]]
+        versions = zip(columns['version'][positions].astype(object).tolist(),
+                       columns['version_links'][positions].tolist())
+        return dict(zip(columns['id'][positions].tolist(), versions))
+
+    # ------------------------------------------------------------------ stats
+
+    def memory_usage(self) -> Dict[str, int]:
+        """Approximate bytes held per column (dictionary-encoded columns include their dictionary)"""
+        state = self._state
+        if state is None:
+            return {'total': 0}
+        usage = {name: column.nbytes for name, column in state.columns.items()}
+        for name, strings in state.strings.items():
+            usage[name] = usage.get(name, 0) + strings.nbytes()
+        usage['total'] = sum(usage.values())
+        return usage
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "rows": len(self),
+            "watermark": self._watermark,
+            "loaded_at": self.loaded_at,
+            "refreshed_at": self.refreshed_at,
+            "full_loads": self.full_loads,
+            "refreshes": self.refreshes,
+            "rows_refreshed": self.rows_refreshed,
+            "memory_bytes": self.memory_usage(),
+        }
+
+
+class SnapshotRefresher(threading.Thread):
+    """Background thread polling the database for changed listings."""
+
+    def __init__(self, snapshot: ListingSnapshot, pool, interval: float, full_reload_interval: float):
+        super().__init__(name="listing-snapshot-refresher", daemon=True)
+        self.snapshot = snapshot
+        self.pool = pool
+        self.interval = interval
+        self.full_reload_interval = full_reload_interval
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                conn = self.pool.getconn()
+                try:
+                    if time.time() - (self.snapshot.loaded_at or 0) >= self.full_reload_interval:
+                        self.snapshot.load(conn)
+                    else:
+                        self.snapshot.refresh(conn)
+                finally:
+                    self.pool.putconn(conn)
+            except Exception:
+                logger.exception("Refreshing the listing snapshot failed")
+
+    def stop(self):
+        self._stop_event.set()
+
+
+listing_snapshot: Optional[ListingSnapshot] = None
+_refresher: Optional[SnapshotRefresher] = None
+
+
+@register_collector
+def _collect_snapshot_metrics():
+    snapshot = get_listing_snapshot()
+    if snapshot is None:
+        return
+    stats = snapshot.stats()
+    yield "listing_snapshot_rows", "gauge", "Listings held by the in-memory snapshot", [({}, stats["rows"])]
+    # memory_bytes: số byte theo từng cột, kèm "total" (bỏ qua để sum() theo cột không bị đếm hai lần)
+    yield "listing_snapshot_memory_bytes", "gauge", "Memory used by the snapshot arrays, per column", \
+        [({"column": column}, size) for column, size in stats["memory_bytes"].items() if column != "total"]
+    yield "listing_snapshot_age_seconds", "gauge", "Seconds since the snapshot was last refreshed", \
+        [({}, time.time() - (stats["refreshed_at"] or time.time()))]
+    yield "listing_snapshot_refreshes_total", "counter", "Incremental snapshot refreshes", [({}, stats["refreshes"])]
+    yield "listing_snapshot_full_loads_total", "counter", "Full snapshot loads", [({}, stats["full_loads"])]
+
+
+def get_listing_snapshot() -> Optional[ListingSnapshot]:
+    """The process-wide snapshot when enabled and loaded, else None"""
+    snapshot = listing_snapshot
+    return snapshot if snapshot is not None and snapshot.ready else None
+
+
+def start_listing_snapshot(pool, interval: float, full_reload_interval: float) -> ListingSnapshot:
+    """Load the snapshot once and start polling for changes; called at application startup."""
+    global listing_snapshot, _refresher
+    snapshot = ListingSnapshot()
+    conn = pool.getconn()
+    try:
+        snapshot.load(conn)
+    finally:
+        pool.putconn(conn)
+
+    listing_snapshot = snapshot
+    _refresher = SnapshotRefresher(snapshot, pool, interval, full_reload_interval)
+    _refresher.start()
+    return snapshot
+
+
+def stop_listing_snapshot():
+    global listing_snapshot, _refresher
+    if _refresher is not None:
+        _refresher.stop()
+        _refresher = None
+    listing_snapshot = None
@@ -1,19 +1,27 @@
 import numpy as np
-import pandas as pd
 
 class TOPSIS:
+    # Giới hạn số phần tử của tensor (k x m x n) tính trong một lần để không bùng bộ nhớ
+    MAX_BLOCK_ELEMENTS = 4_000_000
+
     def __init__(self, decision_matrix, weights, criteria_types):
         """
         decision_matrix: Ma trận quyết định (m x n)
-        weights: Trọng số các tiêu chí (n,)
+        weights: Trọng số các tiêu chí (n,) hoặc một chồng k bộ trọng số (k x n)
         criteria_types: List loại tiêu chí ['benefit', 'cost', ...]
         """
         self.matrix = np.array(decision_matrix)
         self.weights = np.array(weights)
         self.criteria_types = criteria_types
+        self.benefit_mask = np.array([t == 'benefit' for t in criteria_types], dtype=bool)
         self.normalized_matrix = None
         self.weighted_matrix = None
-        
+
+    @property
+    def is_batch(self):
+        """True khi weights là ma trận k x n (nhiều kịch bản trọng số)"""
+        return self.weights.ndim == 2
+
     def vector_normalization(self):
         """Chuẩn hóa vector"""
         squared = self.matrix ** 2
@@ -22,59 +30,41 @@ class TOPSIS:
         self.normalized_matrix = self.matrix / np.sqrt(sum_squared)
         return self.normalized_matrix
     
-    def apply_weights(self):
-        """Áp dụng trọng số"""
-        self.weighted_matrix = self.normalized_matrix * self.weights
-        return self.weighted_matrix
-    
-    def find_ideal_solutions(self):
+    def apply_weights(self, weights=None):
+        """Áp dụng trọng số: (m x n) với một bộ trọng số, (k x m x n) với k bộ"""
+        weights = self.weights if weights is None else weights
+        if weights.ndim == 2:
+            weighted = self.normalized_matrix[np.newaxis, :, :] * weights[:, np.newaxis, :]
+        else:
+            weighted = self.normalized_matrix * weights
+        if weights is self.weights:
+            self.weighted_matrix = weighted
+        return weighted
+
+    def _ideal(self, matrix):
+        """Giá trị lý tưởng theo cột (trục m) cho mọi tiêu chí cùng lúc"""
+        col_max = np.max(matrix, axis=-2)
+        col_min = np.min(matrix, axis=-2)
+        ideal_best = np.where(self.benefit_mask, col_max, col_min)
+        ideal_worst = np.where(self.benefit_mask, col_min, col_max)
+        return ideal_best, ideal_worst
+
+    def find_ideal_solutions(self, weighted_matrix=None):
         """Tìm giải pháp lý tưởng tốt nhất và xấu nhất"""
-        ideal_best = []
-        ideal_worst = []
-        
-        for j, criterion_type in enumerate(self.criteria_types):
-            column = self.weighted_matrix[:, j]
-            
-            if criterion_type == 'benefit':
-                ideal_best.append(np.max(column))
-                ideal_worst.append(np.min(column))
-            else:  # cost criterion
-                ideal_best.append(np.min(column))
-                ideal_worst.append(np.max(column))
-                
-        return np.array(ideal_best), np.array(ideal_worst)
-    
+        weighted_matrix = self.weighted_matrix if weighted_matrix is None else weighted_matrix
+        return self._ideal(weighted_matrix)
+
     def find_ideal_solutions_raw(self):
         """Tìm giải pháp lý tưởng tốt nhất và xấu nhất"""
-        ideal_best = []
-        ideal_worst = []
-        
-        for j, criterion_type in enumerate(self.criteria_types):
-            column = self.matrix[:, j]
-            
-            if criterion_type == 'benefit':
-                ideal_best.append(np.max(column))
-                ideal_worst.append(np.min(column))
-            else:  # cost criterion
-                ideal_best.append(np.min(column))
-                ideal_worst.append(np.max(column))
-                
-        return np.array(ideal_best), np.array(ideal_worst)
-    
-    def calculate_distances(self, ideal_best, ideal_worst):
+        return self._ideal(self.matrix)
+
+    def calculate_distances(self, ideal_best, ideal_worst, weighted_matrix=None):
         """Tính khoảng cách tới các giải pháp lý tưởng"""
-        n_alternatives = self.weighted_matrix.shape[0]
-        distances_best = np.zeros(n_alternatives)
-        distances_worst = np.zeros(n_alternatives)
-        
-        for i in range(n_alternatives):
-            distances_best[i] = np.sqrt(np.sum(
-                (self.weighted_matrix[i] - ideal_best) ** 2
-            ))
-            distances_worst[i] = np.sqrt(np.sum(
-                (self.weighted_matrix[i] - ideal_worst) ** 2
-            ))
-            
+        weighted_matrix = self.weighted_matrix if weighted_matrix is None else weighted_matrix
+        ideal_best = np.expand_dims(ideal_best, axis=-2)
+        ideal_worst = np.expand_dims(ideal_worst, axis=-2)
+        distances_best = np.sqrt(np.sum((weighted_matrix - ideal_best) ** 2, axis=-1))
+        distances_worst = np.sqrt(np.sum((weighted_matrix - ideal_worst) ** 2, axis=-1))
         return distances_best, distances_worst
     
     def calculate_scores(self, distances_best, distances_worst):
@@ -94,19 +84,33 @@ class TOPSIS:
         # Những vị trí khác tính bình thường
         scores[~zero_mask] = distances_worst[~zero_mask] / (distances_best[~zero_mask] + distances_worst[~zero_mask])
         return scores
-    
+
+    def _solve_weights(self, weights):
+        weighted = self.apply_weights(weights)
+        ideal_best, ideal_worst = self.find_ideal_solutions(weighted)
+        dist_best, dist_worst = self.calculate_distances(ideal_best, ideal_worst, weighted)
+        return self.calculate_scores(dist_best, dist_worst)
+
     def solve(self):
-        """Thực hiện toàn bộ quy trình TOPSIS"""
+        """
+        Thực hiện toàn bộ quy trình TOPSIS
+
+        Trả về điểm (m,) với một bộ trọng số, hoặc ma trận điểm (k x m) với k bộ trọng số;
+        ma trận chỉ được chuẩn hóa một lần cho mọi kịch bản.
+        """
         self.vector_normalization()
-        
-        self.apply_weights()
-        
-        ideal_best, ideal_worst = self.find_ideal_solutions()
-        
-        dist_best, dist_worst = self.calculate_distances(ideal_best, ideal_worst)
-
-        scores = self.calculate_scores(dist_best, dist_worst)
-        
+
+        if not self.is_batch:
+            return self._solve_weights(self.weights)
+
+        n_scenarios = self.weights.shape[0]
+        block = max(1, self.MAX_BLOCK_ELEMENTS // max(1, self.normalized_matrix.size))
+        if block >= n_scenarios:
+            return self._solve_weights(self.weights)
+
+        scores = np.empty((n_scenarios, self.matrix.shape[0]), dtype=float)
+        for start in range(0, n_scenarios, block):
+            scores[start:start + block] = self._solve_weights(self.weights[start:start + block])
         return scores
 #
 # # Ví dụ sử dụng
@@ -4,13 +4,43 @@ from fastapi import FastAPI, Depends, Query, Request
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from typing import Optional, List, Dict
+from contextlib import asynccontextmanager
 
 
+from .config import settings
+from .dependency.db_connect import init_db_pool, close_db_pool, init_async_db_pool, close_async_db_pool
+from .logic.snapshot import start_listing_snapshot, stop_listing_snapshot
+from .migrations import migrate
 from .middleware.default import setup_middlewares
-from .routers import locations, search, item, dss, web
+from .utils.log import setup_logging, stop_logging
+from .routers import locations, search, item, dss, web, system, metrics
 
 
-app = FastAPI(title="House Rental API", version="1.0.0")
+setup_logging(settings.log_level, settings.log_format, settings.log_queue_size)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Tạo connection pool một lần khi khởi động, đóng khi tắt server
+    pool = init_db_pool()
+    if settings.db_migrate:
+        conn = pool.getconn()
+        try:
+            migrate(conn)
+        finally:
+            pool.putconn(conn)
+    if settings.db_async:
+        await init_async_db_pool()
+    if settings.listing_snapshot:
+        start_listing_snapshot(pool, settings.listing_snapshot_refresh, settings.listing_snapshot_full_reload)
+    yield
+    stop_listing_snapshot()
+    await close_async_db_pool()
+    close_db_pool()
+    stop_logging()
+
+
+app = FastAPI(title="House Rental API", version="1.0.0", lifespan=lifespan)
 
 # middle ware
 setup_middlewares(app)
@@ -25,4 +55,9 @@ app.include_router(locations.router, prefix="/api", tags=["Locations"])
 app.include_router(search.router, prefix="/api", tags=["Search"])
 app.include_router(item.router, prefix="/api", tags=["Items"])
 app.include_router(dss.router, prefix="/api", tags=["DSS"])
+app.include_router(system.router, prefix="/api", tags=["System"])
+if settings.admin_token:
+    app.include_router(system.admin_router, prefix="/api", tags=["System"])
 app.include_router(web.router, prefix="", tags=["Web"])
+# Prometheus scrape ở /metrics (ngoài /api, theo quy ước)
+app.include_router(metrics.router, prefix="")
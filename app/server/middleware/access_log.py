@@ -0,0 +1,56 @@
+import logging
+import random
+import time
+
+from .metrics import route_template
+
+access_logger = logging.getLogger("server.access")
+
+
+class AccessLogMiddleware:
+    """
+    ASGI middleware writing one structured access-log record per sampled request.
+
+    A `sample_rate` share of requests is logged; server errors and requests slower than
+    `slow_seconds` always are. Nothing is built for requests that are not logged.
+    """
+
+    def __init__(self, app, sample_rate: float = 1.0, slow_seconds: float = 1.0):
+        self.app = app
+        self.sample_rate = sample_rate
+        self.slow_seconds = slow_seconds
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not access_logger.isEnabledFor(logging.INFO):
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            if status >= 500 or elapsed >= self.slow_seconds or random.random() < self.sample_rate:
+                client = scope.get("client")
+                access_logger.log(
+                    logging.WARNING if status >= 500 else logging.INFO,
+                    "%s %s %s %.1fms", scope["method"], scope["path"], status, elapsed * 1000,
+                    extra={
+                        "method": scope["method"],
+                        "path": scope["path"],
+                        "query": scope.get("query_string", b"").decode("latin-1"),
+                        "route": route_template(scope),
+                        "status": status,
+                        "duration_ms": round(elapsed * 1000, 3),
+                        "client": client[0] if client else None,
+                        "sample_rate": self.sample_rate,
+                    },
+                )
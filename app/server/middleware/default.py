@@ -1,9 +1,17 @@
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
-from fastapi import Request
-import time
+
+from ..config import settings
+from .access_log import AccessLogMiddleware
+from .metrics import MetricsMiddleware
+from .profiling import ProfilingMiddleware
 
 def setup_middlewares(app):
+    # Profiling theo yêu cầu: thêm đầu tiên để nằm trong cùng, cùng task với route
+    if settings.profiling:
+        app.add_middleware(ProfilingMiddleware, directory=settings.profile_dir,
+                           max_files=settings.profile_max_files, token=settings.profile_token)
+
     # CORS
     app.add_middleware(
         CORSMiddleware,
@@ -15,11 +23,9 @@ def setup_middlewares(app):
     # GZip
     app.add_middleware(GZipMiddleware)
 
-    # Custom middleware
-    @app.middleware("http")
-    async def log_requests(request: Request, call_next):
-        start_time = time.time()
-        response = await call_next(request)
-        process_time = time.time() - start_time
-        print(f"{request.method} {request.url} - {response.status_code} - {process_time:.2f}s")
-        return response
\ No newline at end of file
+    # Metrics: latency / status / in-flight theo route template, xuất ở /metrics
+    app.add_middleware(MetricsMiddleware)
+
+    # Access log có cấu trúc, ghi qua hàng đợi (server/utils/log.py)
+    app.add_middleware(AccessLogMiddleware, sample_rate=settings.log_request_sample_rate,
+                       slow_seconds=settings.log_slow_request_seconds)
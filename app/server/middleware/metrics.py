@@ -0,0 +1,73 @@
+import time
+
+from ..utils.metrics import Counter, Gauge, Histogram
+
+HTTP_REQUESTS = Counter("http_requests_total", "HTTP requests by method, route template and status",
+                        ["method", "route", "status"])
+HTTP_REQUEST_SECONDS = Histogram("http_request_duration_seconds", "HTTP request latency by method and route template",
+                                 ["method", "route"])
+HTTP_IN_PROGRESS = Gauge("http_requests_in_progress", "HTTP requests being processed", ["method"])
+HTTP_EXCEPTIONS = Counter("http_request_exceptions_total", "Requests that raised an unhandled exception",
+                          ["method", "route", "exception"])
+
+# Request không khớp route nào gộp chung một nhãn, để URL lạ không làm nổ số chuỗi metric
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+def route_template(scope) -> str:
+    """Path template of the route that handled the request ("/api/item/{house_id}")"""
+    route = scope.get("route")
+    template = getattr(route, "path", None)
+    if template is None:
+        return UNMATCHED_ROUTE
+    # Một số bản FastAPI giữ route gốc của router (chưa có prefix như "/api"): khôi phục prefix
+    # từ phần đầu của URL mà regex của route không khớp
+    path = scope.get("path", "")
+    regex = getattr(route, "path_regex", None)
+    if regex is not None and not regex.match(path):
+        start = path.find("/", 1)
+        while start != -1:
+            if regex.match(path[start:]):
+                return path[:start] + template
+            start = path.find("/", start + 1)
+    return template
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording latency, status and in-flight count of every HTTP request.
+
+    Routes are labelled by template, read from the scope after routing, not by raw URL.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        in_progress = HTTP_IN_PROGRESS.labels(method)
+        in_progress.inc()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        except Exception as e:
+            HTTP_EXCEPTIONS.labels(method, route_template(scope), type(e).__name__).inc()
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            route = route_template(scope)
+            HTTP_REQUEST_SECONDS.labels(method, route).observe(elapsed)
+            HTTP_REQUESTS.labels(method, route, status).inc()
+            in_progress.dec()
@@ -0,0 +1,59 @@
+from typing import Optional
+from urllib.parse import parse_qs
+
+from starlette.concurrency import run_in_threadpool
+
+from ..utils.profiling import RequestProfile, profile_request
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_QUERY = "profile"
+PROFILE_ID_HEADER = b"x-profile-id"
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware profiling the requests that ask for it with `X-Profile: 1` or `?profile=1`.
+
+    With a `token`, the header / query value must be that token instead. The profile is saved
+    under `directory` after the response and its id is returned in `X-Profile-Id`.
+    """
+
+    def __init__(self, app, directory: str, max_files: int, token: Optional[str] = None):
+        self.app = app
+        self.directory = directory
+        self.max_files = max_files
+        self.token = token
+
+    def _accepts(self, value: str) -> bool:
+        if self.token:
+            return value == self.token
+        return value.strip().lower() in ("1", "true", "yes", "on")
+
+    def _requested(self, scope) -> bool:
+        for name, value in scope["headers"]:
+            if name == PROFILE_HEADER:
+                return self._accepts(value.decode("latin-1"))
+        query_string = scope.get("query_string", b"")
+        if PROFILE_QUERY.encode() in query_string:
+            values = parse_qs(query_string.decode("latin-1")).get(PROFILE_QUERY)
+            return bool(values) and self._accepts(values[-1])
+        return False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile()
+
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((PROFILE_ID_HEADER, profile.id.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await profile_request(self.app(scope, receive, send_with_profile_id), profile)
+        finally:
+            await run_in_threadpool(profile.save, self.directory, self.max_files)
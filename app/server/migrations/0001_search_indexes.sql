@@ -0,0 +1,33 @@
+-- Partial indexes for house search: every query filters on available = TRUE,
+-- so only available listings are indexed.
+
+-- ORDER BY hr.id LIMIT ... and keyset pages (hr.id > %s) without selective filters
+CREATE INDEX IF NOT EXISTS ix_house_rent_available_id
+    ON public.house_rent (id)
+    WHERE available = TRUE;
+
+-- ward_id / district_id / province_id (districts and provinces resolve to ward ids through the joins)
+CREATE INDEX IF NOT EXISTS ix_house_rent_available_ward_id
+    ON public.house_rent (ward_id, id)
+    WHERE available = TRUE;
+
+CREATE INDEX IF NOT EXISTS ix_house_rent_available_ward_price
+    ON public.house_rent (ward_id, price)
+    WHERE available = TRUE;
+
+-- min/max price and acreage ranges without a location filter
+CREATE INDEX IF NOT EXISTS ix_house_rent_available_price_acreage
+    ON public.house_rent (price, acreage)
+    WHERE available = TRUE;
+
+-- equality filters first, then the price range
+CREATE INDEX IF NOT EXISTS ix_house_rent_available_type
+    ON public.house_rent (house_type, contract_period, bedrooms, price)
+    WHERE available = TRUE;
+
+-- bounding-box prefilter of radius searches
+CREATE INDEX IF NOT EXISTS ix_house_rent_available_location
+    ON public.house_rent (latitude, longitude)
+    WHERE available = TRUE;
+
+ANALYZE public.house_rent;
@@ -0,0 +1,15 @@
+-- Covering indexes for amenity lookups: environments of a list of houses
+-- (snapshot.LISTING_ENVIRONMENTS_QUERY) and the amenities filter of
+-- HouseService.build_search_filters become index-only scans. They supersede the
+-- single-column FK indexes.
+
+CREATE INDEX IF NOT EXISTS ix_hre_house_rent_environment
+    ON public.house_rent_environment (house_rent_id, environment_id);
+
+CREATE INDEX IF NOT EXISTS ix_hre_environment_house_rent
+    ON public.house_rent_environment (environment_id, house_rent_id);
+
+DROP INDEX IF EXISTS public.idx_hre_house_rent_id;
+DROP INDEX IF EXISTS public.idx_hre_environment_id;
+
+ANALYZE public.house_rent_environment;
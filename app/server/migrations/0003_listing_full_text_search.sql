@@ -0,0 +1,181 @@
+-- Accent-insensitive full-text search over listing title, address and amenity values.
+-- The documents live in their own table so `SELECT hr.*` keeps its columns.
+
+-- lower case, strip Vietnamese diacritics ("Điều hòa" -> "dieu hoa"); no unaccent extension needed
+CREATE OR REPLACE FUNCTION public.search_normalize(value text) RETURNS text
+    LANGUAGE sql
+    IMMUTABLE
+    PARALLEL SAFE
+    RETURNS NULL ON NULL INPUT
+AS
+$$
+SELECT translate(regexp_replace(normalize(lower(value), NFD), '[\u0300-\u036f]', '', 'g'), 'đ', 'd')
+$$;
+
+-- every word of the (normalized) user query, each matched as a prefix: "dieu ho" -> 'dieu':* & 'ho':*
+-- (NULL, matching nothing, when the query has no words)
+CREATE OR REPLACE FUNCTION public.search_tsquery(value text) RETURNS tsquery
+    LANGUAGE sql
+    IMMUTABLE
+    PARALLEL SAFE
+    RETURNS NULL ON NULL INPUT
+AS
+$$
+SELECT to_tsquery('simple', string_agg(quote_literal(lexeme) || ':*', ' & '))
+FROM unnest(to_tsvector('simple', public.search_normalize(value)))
+$$;
+
+CREATE TABLE IF NOT EXISTS public.house_rent_search
+(
+    house_rent_id bigint PRIMARY KEY REFERENCES public.house_rent (id) ON DELETE CASCADE,
+    document      tsvector NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS ix_house_rent_search_document
+    ON public.house_rent_search USING gin (document);
+
+-- title (A) > address (B) > amenities (C) when ranking
+CREATE OR REPLACE FUNCTION public.house_rent_search_document(house_rent_id bigint, title text, address text)
+    RETURNS tsvector
+    LANGUAGE sql
+    STABLE
+AS
+$$
+SELECT setweight(to_tsvector('simple', coalesce(public.search_normalize(title), '')), 'A')
+           || setweight(to_tsvector('simple', coalesce(public.search_normalize(address), '')), 'B')
+           || setweight(to_tsvector('simple', coalesce(public.search_normalize(
+        (SELECT string_agg(e.value, ' ' ORDER BY e.id)
+         FROM public.house_rent_environment hre
+                  JOIN public.environment e ON hre.environment_id = e.id
+         WHERE hre.house_rent_id = $1)), '')), 'C')
+$$;
+
+CREATE OR REPLACE FUNCTION public.refresh_house_rent_search(house_rent_ids bigint[]) RETURNS void
+    LANGUAGE sql
+AS
+$$
+INSERT INTO public.house_rent_search (house_rent_id, document)
+SELECT hr.id, public.house_rent_search_document(hr.id, hr.title, hr.address)
+FROM public.house_rent hr
+WHERE hr.id = ANY (house_rent_ids)
+ON CONFLICT (house_rent_id) DO UPDATE SET document = excluded.document
+$$;
+
+-- house_rent: new listings and edited title/address
+CREATE OR REPLACE FUNCTION public.house_rent_search_on_house_rent() RETURNS trigger
+    LANGUAGE plpgsql
+AS
+$$
+BEGIN
+    PERFORM public.refresh_house_rent_search(ARRAY(SELECT id FROM new_rows));
+    RETURN NULL;
+END
+$$;
+
+-- (transition tables cannot be combined with UPDATE OF column lists, so changed rows are picked here)
+CREATE OR REPLACE FUNCTION public.house_rent_search_on_house_rent_update() RETURNS trigger
+    LANGUAGE plpgsql
+AS
+$$
+BEGIN
+    PERFORM public.refresh_house_rent_search(ARRAY(
+            SELECT n.id
+            FROM new_rows n
+                     JOIN old_rows o ON n.id = o.id
+            WHERE n.title IS DISTINCT FROM o.title
+               OR n.address IS DISTINCT FROM o.address));
+    RETURN NULL;
+END
+$$;
+
+DROP TRIGGER IF EXISTS house_rent_search_insert ON public.house_rent;
+CREATE TRIGGER house_rent_search_insert
+    AFTER INSERT
+    ON public.house_rent
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+EXECUTE FUNCTION public.house_rent_search_on_house_rent();
+
+DROP TRIGGER IF EXISTS house_rent_search_update ON public.house_rent;
+CREATE TRIGGER house_rent_search_update
+    AFTER UPDATE
+    ON public.house_rent
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+EXECUTE FUNCTION public.house_rent_search_on_house_rent_update();
+
+-- house_rent_environment: amenities linked to / unlinked from a listing
+CREATE OR REPLACE FUNCTION public.house_rent_search_on_environment_link() RETURNS trigger
+    LANGUAGE plpgsql
+AS
+$$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM public.refresh_house_rent_search(ARRAY(SELECT DISTINCT house_rent_id FROM new_rows));
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM public.refresh_house_rent_search(ARRAY(SELECT DISTINCT house_rent_id FROM old_rows));
+    ELSE
+        PERFORM public.refresh_house_rent_search(ARRAY(SELECT house_rent_id FROM new_rows
+                                                       UNION
+                                                       SELECT house_rent_id FROM old_rows));
+    END IF;
+    RETURN NULL;
+END
+$$;
+
+DROP TRIGGER IF EXISTS house_rent_search_link_insert ON public.house_rent_environment;
+CREATE TRIGGER house_rent_search_link_insert
+    AFTER INSERT
+    ON public.house_rent_environment
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+EXECUTE FUNCTION public.house_rent_search_on_environment_link();
+
+DROP TRIGGER IF EXISTS house_rent_search_link_update ON public.house_rent_environment;
+CREATE TRIGGER house_rent_search_link_update
+    AFTER UPDATE
+    ON public.house_rent_environment
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+EXECUTE FUNCTION public.house_rent_search_on_environment_link();
+
+DROP TRIGGER IF EXISTS house_rent_search_link_delete ON public.house_rent_environment;
+CREATE TRIGGER house_rent_search_link_delete
+    AFTER DELETE
+    ON public.house_rent_environment
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT
+EXECUTE FUNCTION public.house_rent_search_on_environment_link();
+
+-- environment: a renamed amenity changes the document of every listing that has it
+CREATE OR REPLACE FUNCTION public.house_rent_search_on_environment() RETURNS trigger
+    LANGUAGE plpgsql
+AS
+$$
+BEGIN
+    PERFORM public.refresh_house_rent_search(ARRAY(
+            SELECT DISTINCT hre.house_rent_id
+            FROM public.house_rent_environment hre
+            WHERE hre.environment_id IN (SELECT n.id
+                                         FROM new_rows n
+                                                  JOIN old_rows o ON n.id = o.id
+                                         WHERE n.value IS DISTINCT FROM o.value)));
+    RETURN NULL;
+END
+$$;
+
+DROP TRIGGER IF EXISTS house_rent_search_environment_update ON public.environment;
+CREATE TRIGGER house_rent_search_environment_update
+    AFTER UPDATE
+    ON public.environment
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+EXECUTE FUNCTION public.house_rent_search_on_environment();
+
+-- backfill
+INSERT INTO public.house_rent_search (house_rent_id, document)
+SELECT hr.id, public.house_rent_search_document(hr.id, hr.title, hr.address)
+FROM public.house_rent hr
+ON CONFLICT (house_rent_id) DO UPDATE SET document = excluded.document;
+
+ANALYZE public.house_rent_search;
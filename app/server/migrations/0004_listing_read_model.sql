@@ -0,0 +1,230 @@
+-- Read model of the listings: location names inlined and amenities pre-aggregated, so
+-- HouseService reads a listing with one primary-key join instead of three name joins plus a
+-- second query for its amenities. Like the search documents it lives in its own table, so
+-- `SELECT hr.*` keeps its columns, and triggers refresh only the listings a statement touched.
+
+CREATE TABLE IF NOT EXISTS public.house_rent_read
+(
+    house_rent_id bigint PRIMARY KEY REFERENCES public.house_rent (id) ON DELETE CASCADE,
+    ward_name     text,
+    district_id   bigint,
+    district_name text,
+    province_id   bigint,
+    province_name text,
+    -- [{house_rent_id, id, category, value}, ...] ordered by id, as HouseService returned them
+    -- (json, not jsonb: keeps the key order)
+    environments  json   NOT NULL DEFAULT '[]'
+);
+
+-- search filters on province / district, listings in id order (first pages, keyset pagination)
+CREATE INDEX IF NOT EXISTS ix_house_rent_read_province
+    ON public.house_rent_read (province_id, house_rent_id);
+
+CREATE INDEX IF NOT EXISTS ix_house_rent_read_district
+    ON public.house_rent_read (district_id, house_rent_id);
+
+CREATE OR REPLACE FUNCTION public.refresh_house_rent_read(house_rent_ids bigint[]) RETURNS void
+    LANGUAGE sql
+AS
+$$
+INSERT INTO public.house_rent_read (house_rent_id, ward_name, district_id, district_name, province_id, province_name,
+                                    environments)
+SELECT hr.id,
+       w.name,
+       d.id,
+       d.name,
+       p.id,
+       p.name,
+       coalesce((SELECT json_agg(json_build_object('house_rent_id', hre.house_rent_id, 'id', e.id,
+                                                   'category', e.category, 'value', e.value) ORDER BY e.id)
+                 FROM public.house_rent_environment hre
+                          JOIN public.environment e ON hre.environment_id = e.id
+                 WHERE hre.house_rent_id = hr.id), '[]')
+FROM public.house_rent hr
+         LEFT JOIN public.wards w ON hr.ward_id = w.id
+         LEFT JOIN public.districts d ON w.district_id = d.id
+         LEFT JOIN public.provinces p ON d.province_id = p.id
+WHERE hr.id = ANY (house_rent_ids)
+ON CONFLICT (house_rent_id) DO UPDATE SET ward_name     = excluded.ward_name,
+                                          district_id   = excluded.district_id,
+                                          district_name = excluded.district_name,
+                                          province_id   = excluded.province_id,
+                                          province_name = excluded.province_name,
+                                          environments  = excluded.environments
+$$;
+
+-- house_rent: new listings and listings moved to another ward
+CREATE OR REPLACE FUNCTION public.house_rent_read_on_house_rent() RETURNS trigger
+    LANGUAGE plpgsql
+AS
+$$
+BEGIN
+    PERFORM public.refresh_house_rent_read(ARRAY(SELECT id FROM new_rows));
+    RETURN NULL;
+END
+$$;
+
+CREATE OR REPLACE FUNCTION public.house_rent_read_on_house_rent_update() RETURNS trigger
+    LANGUAGE plpgsql
+AS
+$$
+BEGIN
+    PERFORM public.refresh_house_rent_read(ARRAY(
+            SELECT n.id
+            FROM new_rows n
+                     JOIN old_rows o ON n.id = o.id
+            WHERE n.ward_id IS DISTINCT FROM o.ward_id));
+    RETURN NULL;
+END
+$$;
+
+DROP TRIGGER IF EXISTS house_rent_read_insert ON public.house_rent;
+CREATE TRIGGER house_rent_read_insert
+    AFTER INSERT
+    ON public.house_rent
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+EXECUTE FUNCTION public.house_rent_read_on_house_rent();
+
+DROP TRIGGER IF EXISTS house_rent_read_update ON public.house_rent;
+CREATE TRIGGER house_rent_read_update
+    AFTER UPDATE
+    ON public.house_rent
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+EXECUTE FUNCTION public.house_rent_read_on_house_rent_update();
+
+-- house_rent_environment: amenities linked to / unlinked from a listing
+CREATE OR REPLACE FUNCTION public.house_rent_read_on_environment_link() RETURNS trigger
+    LANGUAGE plpgsql
+AS
+$$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM public.refresh_house_rent_read(ARRAY(SELECT DISTINCT house_rent_id FROM new_rows));
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM public.refresh_house_rent_read(ARRAY(SELECT DISTINCT house_rent_id FROM old_rows));
+    ELSE
+        PERFORM public.refresh_house_rent_read(ARRAY(SELECT house_rent_id FROM new_rows
+                                                     UNION
+                                                     SELECT house_rent_id FROM old_rows));
+    END IF;
+    RETURN NULL;
+END
+$$;
+
+DROP TRIGGER IF EXISTS house_rent_read_link_insert ON public.house_rent_environment;
+CREATE TRIGGER house_rent_read_link_insert
+    AFTER INSERT
+    ON public.house_rent_environment
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+EXECUTE FUNCTION public.house_rent_read_on_environment_link();
+
+DROP TRIGGER IF EXISTS house_rent_read_link_update ON public.house_rent_environment;
+CREATE TRIGGER house_rent_read_link_update
+    AFTER UPDATE
+    ON public.house_rent_environment
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+EXECUTE FUNCTION public.house_rent_read_on_environment_link();
+
+DROP TRIGGER IF EXISTS house_rent_read_link_delete ON public.house_rent_environment;
+CREATE TRIGGER house_rent_read_link_delete
+    AFTER DELETE
+    ON public.house_rent_environment
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT
+EXECUTE FUNCTION public.house_rent_read_on_environment_link();
+
+-- environment: an edited amenity changes the read model of every listing that has it
+CREATE OR REPLACE FUNCTION public.house_rent_read_on_environment() RETURNS trigger
+    LANGUAGE plpgsql
+AS
+$$
+BEGIN
+    PERFORM public.refresh_house_rent_read(ARRAY(
+            SELECT DISTINCT hre.house_rent_id
+            FROM public.house_rent_environment hre
+            WHERE hre.environment_id IN (SELECT n.id
+                                         FROM new_rows n
+                                                  JOIN old_rows o ON n.id = o.id
+                                         WHERE n.category IS DISTINCT FROM o.category
+                                            OR n.value IS DISTINCT FROM o.value)));
+    RETURN NULL;
+END
+$$;
+
+DROP TRIGGER IF EXISTS house_rent_read_environment_update ON public.environment;
+CREATE TRIGGER house_rent_read_environment_update
+    AFTER UPDATE
+    ON public.environment
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+EXECUTE FUNCTION public.house_rent_read_on_environment();
+
+-- wards / districts / provinces: renamed or moved under another parent
+CREATE OR REPLACE FUNCTION public.house_rent_read_on_location() RETURNS trigger
+    LANGUAGE plpgsql
+AS
+$$
+BEGIN
+    IF TG_TABLE_NAME = 'wards' THEN
+        PERFORM public.refresh_house_rent_read(ARRAY(
+                SELECT hr.id
+                FROM public.house_rent hr
+                WHERE hr.ward_id IN (SELECT n.id
+                                     FROM new_rows n
+                                              JOIN old_rows o ON n.id = o.id
+                                     WHERE n.name IS DISTINCT FROM o.name
+                                        OR n.district_id IS DISTINCT FROM o.district_id)));
+    ELSIF TG_TABLE_NAME = 'districts' THEN
+        PERFORM public.refresh_house_rent_read(ARRAY(
+                SELECT r.house_rent_id
+                FROM public.house_rent_read r
+                WHERE r.district_id IN (SELECT n.id
+                                        FROM new_rows n
+                                                 JOIN old_rows o ON n.id = o.id
+                                        WHERE n.name IS DISTINCT FROM o.name
+                                           OR n.province_id IS DISTINCT FROM o.province_id)));
+    ELSE
+        PERFORM public.refresh_house_rent_read(ARRAY(
+                SELECT r.house_rent_id
+                FROM public.house_rent_read r
+                WHERE r.province_id IN (SELECT n.id
+                                        FROM new_rows n
+                                                 JOIN old_rows o ON n.id = o.id
+                                        WHERE n.name IS DISTINCT FROM o.name)));
+    END IF;
+    RETURN NULL;
+END
+$$;
+
+DROP TRIGGER IF EXISTS house_rent_read_ward_update ON public.wards;
+CREATE TRIGGER house_rent_read_ward_update
+    AFTER UPDATE
+    ON public.wards
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+EXECUTE FUNCTION public.house_rent_read_on_location();
+
+DROP TRIGGER IF EXISTS house_rent_read_district_update ON public.districts;
+CREATE TRIGGER house_rent_read_district_update
+    AFTER UPDATE
+    ON public.districts
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+EXECUTE FUNCTION public.house_rent_read_on_location();
+
+DROP TRIGGER IF EXISTS house_rent_read_province_update ON public.provinces;
+CREATE TRIGGER house_rent_read_province_update
+    AFTER UPDATE
+    ON public.provinces
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+EXECUTE FUNCTION public.house_rent_read_on_location();
+
+-- backfill
+SELECT public.refresh_house_rent_read(ARRAY(SELECT id FROM public.house_rent));
+
+ANALYZE public.house_rent_read;
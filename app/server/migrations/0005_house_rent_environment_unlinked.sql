@@ -0,0 +1,54 @@
+-- Tombstones of amenity links removed from a listing. Deleting a house_rent_environment row
+-- leaves no newer update_time behind, so the incremental refresh of the listing snapshot
+-- (CHANGED_LISTINGS_CONDITION) also looks here. One row per listing, bumped on every unlink.
+
+CREATE TABLE IF NOT EXISTS public.house_rent_environment_unlinked
+(
+    house_rent_id bigint PRIMARY KEY REFERENCES public.house_rent (id) ON DELETE CASCADE,
+    unlinked_at   timestamp NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS ix_hre_unlinked_unlinked_at
+    ON public.house_rent_environment_unlinked (unlinked_at);
+
+CREATE OR REPLACE FUNCTION public.house_rent_environment_on_unlink() RETURNS trigger
+    LANGUAGE plpgsql
+AS
+$$
+BEGIN
+    -- LOCALTIMESTAMP: same clock as update_time and the snapshot watermark
+    IF TG_OP = 'DELETE' THEN
+        INSERT INTO public.house_rent_environment_unlinked (house_rent_id, unlinked_at)
+        SELECT DISTINCT o.house_rent_id, LOCALTIMESTAMP
+        FROM old_rows o
+        WHERE EXISTS (SELECT 1 FROM public.house_rent hr WHERE hr.id = o.house_rent_id)
+        ON CONFLICT (house_rent_id) DO UPDATE SET unlinked_at = excluded.unlinked_at;
+    ELSE
+        -- a link moved to another listing or amenity is an unlink for the old listing
+        INSERT INTO public.house_rent_environment_unlinked (house_rent_id, unlinked_at)
+        SELECT DISTINCT o.house_rent_id, LOCALTIMESTAMP
+        FROM old_rows o
+                 JOIN new_rows n ON n.id = o.id
+        WHERE n.house_rent_id IS DISTINCT FROM o.house_rent_id
+           OR n.environment_id IS DISTINCT FROM o.environment_id
+        ON CONFLICT (house_rent_id) DO UPDATE SET unlinked_at = excluded.unlinked_at;
+    END IF;
+    RETURN NULL;
+END
+$$;
+
+DROP TRIGGER IF EXISTS house_rent_environment_unlink_delete ON public.house_rent_environment;
+CREATE TRIGGER house_rent_environment_unlink_delete
+    AFTER DELETE
+    ON public.house_rent_environment
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT
+EXECUTE FUNCTION public.house_rent_environment_on_unlink();
+
+DROP TRIGGER IF EXISTS house_rent_environment_unlink_update ON public.house_rent_environment;
+CREATE TRIGGER house_rent_environment_unlink_update
+    AFTER UPDATE
+    ON public.house_rent_environment
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+EXECUTE FUNCTION public.house_rent_environment_on_unlink();
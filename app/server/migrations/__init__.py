@@ -0,0 +1,102 @@
+"""
+Versioned SQL migrations.
+
+Each `NNNN_name.sql` file in this package is applied once, in version order, inside its
+own transaction, and recorded in `public.schema_migrations`.
+"""
+import logging
+import re
+from pathlib import Path
+from typing import List, NamedTuple
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent
+FILE_PATTERN = re.compile(r"^(\d{4})_(\w+)\.sql$")
+
+# Khóa advisory để nhiều worker khởi động cùng lúc không chạy migration chồng nhau
+ADVISORY_LOCK_KEY = 61040975
+
+logger = logging.getLogger(__name__)
+
+CREATE_TABLE = """
+               CREATE TABLE IF NOT EXISTS public.schema_migrations
+               (
+                   version    integer PRIMARY KEY,
+                   name       text      NOT NULL,
+                   applied_at timestamp NOT NULL DEFAULT now()
+               ) \
+               """
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    path: Path
+
+    def sql(self) -> str:
+        return self.path.read_text(encoding="utf-8")
+
+
+def discover() -> List[Migration]:
+    """All migration files, ordered by version"""
+    migrations = []
+    for path in MIGRATIONS_DIR.glob("*.sql"):
+        match = FILE_PATTERN.match(path.name)
+        if match:
+            migrations.append(Migration(int(match.group(1)), match.group(2), path))
+    migrations.sort()
+
+    versions = [m.version for m in migrations]
+    if len(versions) != len(set(versions)):
+        raise RuntimeError(f"Duplicate migration versions in {MIGRATIONS_DIR}")
+    return migrations
+
+
+def applied_versions(conn) -> List[int]:
+    with conn.cursor() as cur:
+        cur.execute(CREATE_TABLE)
+        cur.execute("SELECT version FROM public.schema_migrations ORDER BY version")
+        versions = [row[0] for row in cur.fetchall()]
+    conn.commit()
+    return versions
+
+
+def pending(conn) -> List[Migration]:
+    done = set(applied_versions(conn))
+    return [m for m in discover() if m.version not in done]
+
+
+def migrate(conn, target: int = None) -> List[Migration]:
+    """
+    Apply pending migrations up to `target` (all by default) on a psycopg2 connection.
+
+    Returns:
+        The migrations applied by this call
+    """
+    with conn.cursor() as cur:
+        cur.execute("SELECT pg_advisory_lock(%s)", (ADVISORY_LOCK_KEY,))
+    conn.commit()
+
+    applied = []
+    try:
+        for migration in pending(conn):
+            if target is not None and migration.version > target:
+                break
+            try:
+                with conn.cursor() as cur:
+                    cur.execute(migration.sql())
+                    cur.execute(
+                        "INSERT INTO public.schema_migrations (version, name) VALUES (%s, %s)",
+                        (migration.version, migration.name)
+                    )
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            logger.info("Applied migration %04d_%s", migration.version, migration.name)
+            applied.append(migration)
+    finally:
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_advisory_unlock(%s)", (ADVISORY_LOCK_KEY,))
+        conn.commit()
+
+    return applied
@@ -0,0 +1,47 @@
+"""
+Run from the `app/` directory:
+
+    python -m server.migrations            # apply pending migrations
+    python -m server.migrations status     # list applied / pending migrations
+    python -m server.migrations up 1       # apply up to version 1
+"""
+import argparse
+
+import psycopg2
+
+from ..config import settings
+from . import applied_versions, discover, migrate
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m server.migrations", description="Apply database migrations")
+    parser.add_argument("command", nargs="?", choices=["up", "status"], default="up")
+    parser.add_argument("target", nargs="?", type=int, default=None, help="highest version to apply")
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(
+        host=settings.db_host,
+        port=settings.db_port,
+        database=settings.db_name,
+        user=settings.db_user,
+        password=settings.db_password,
+    )
+    try:
+        if args.command == "status":
+            done = set(applied_versions(conn))
+            for migration in discover():
+                state = "applied" if migration.version in done else "pending"
+                print(f"{migration.version:04d}_{migration.name}: {state}")
+            return
+
+        applied = migrate(conn, args.target)
+        for migration in applied:
+            print(f"Applied migration {migration.version:04d}_{migration.name}")
+        if not applied:
+            print("Database is up to date")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
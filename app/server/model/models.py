@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, List, Dict
 from datetime import date, datetime
 
@@ -67,6 +67,21 @@ class HouseRentItem(BaseModel):
     province_name: str
     environments: List[EnvironmentTag] = []
 
+class HouseSearchItem(HouseRentItem):
+    """
+    Response model for a search result; `distance_km` is set when the search has a location,
+    `relevance` when it has a full-text query.
+    """
+    distance_km: Optional[float] = None
+    relevance: Optional[float] = None
+
+class HouseSearchPage(BaseModel):
+    """
+    Response model for a keyset-paginated search page.
+    """
+    items: List[HouseSearchItem]
+    next_cursor: Optional[str] = None
+
 class CompareRequest(BaseModel):
     """
     Request model for the TOPSIS endpoint.
@@ -96,3 +111,87 @@ class TopsisCompareResponse(BaseModel):
     ranked_houses: List[CompareResultItem]
     ideal_best: Dict[str, float]
     ideal_worst: Dict[str, float]
+
+
+class PoolStats(BaseModel):
+    """
+    Response model for the database connection pool statistics.
+    """
+    min_size: int
+    max_size: int
+    opened: int
+    in_use: int
+    idle: int
+    checkouts: int
+    timeouts: int
+    discarded: int
+    wait_total_seconds: float
+    wait_max_seconds: float
+    wait_avg_seconds: float
+
+class CompareBatchRequest(BaseModel):
+    """
+    Request model for scoring several TOPSIS weight profiles against the same houses.
+    """
+    house_rent_ids: List[int]
+    amenities: Optional[List[int]]
+    weights: Optional[List[int]]
+    topsis_weights: List[List[float]]
+    prefer_location: Optional[List[float]]
+
+class CompareHouseItem(HouseRentItem):
+    """
+    Response model for a house with its TOPSIS criteria values.
+    """
+    acreage_ratio: float
+    amenities_w: float
+    amenities_ratio: float
+    distance_to_prefer_location: float
+    matched_amenities: List[EnvironmentTag] = []
+
+class TopsisScenarioResult(BaseModel):
+    """
+    Response model for the ranking produced by one weight profile.
+    """
+    topsis_weight: List[float]
+    ranked_ids: List[int]
+    scores: List[Optional[float]]
+
+class TopsisBatchResponse(BaseModel):
+    """
+    Response model for the batched TOPSIS comparison result.
+    """
+    houses: List[CompareHouseItem]
+    scenarios: List[TopsisScenarioResult]
+    ideal_best: Dict[str, float]
+    ideal_worst: Dict[str, float]
+
+class RankRequest(BaseModel):
+    """
+    Request model for ranking every listing matching the search filters with TOPSIS.
+    """
+    province_id: Optional[int] = None
+    district_id: Optional[int] = None
+    ward_id: Optional[int] = None
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    min_acreage: Optional[float] = None
+    max_acreage: Optional[float] = None
+    house_type: Optional[str] = None
+    contract_period: Optional[str] = None
+    bedrooms: Optional[int] = None
+    living_rooms: Optional[int] = None
+    kitchens: Optional[int] = None
+    amenities: Optional[List[int]] = []
+    weights: Optional[List[int]] = None
+    topsis_weight: Optional[List[float]] = None
+    prefer_location: Optional[List[float]] = None
+    # Chỉ xếp hạng các tin trong bán kính (km) quanh prefer_location
+    radius_km: Optional[float] = Field(None, gt=0)
+    k: int = Field(20, ge=1, le=100)
+
+class TopsisRankResponse(TopsisCompareResponse):
+    """
+    Response model for the top-k TOPSIS ranking over a filtered search.
+    """
+    total_candidates: int
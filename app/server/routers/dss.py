@@ -1,22 +1,40 @@
 from typing import List
 
 from fastapi import APIRouter, Depends, HTTPException
-from psycopg2.extras import RealDictCursor
 
-from ..logic.house import HouseService
+from ..logic import compare_cache
+from ..logic.amenity import AmenityBitset
+from ..logic.geo import haversine_km, fill_missing_distances
+from ..logic.house import run_house_service
 from ..logic.topsis import TOPSIS
+from ..utils.concurrency import run_in_threadpool
+from ..utils.fast_json import compile_serializer, json_response
+from ..utils.metrics import Histogram
 from ..utils.normL2 import normL2
 
-import pandas as pd
 import numpy as np
 
-from ..dependency.db_connect import get_db_connection
-from ..model.models import CompareRequest, CompareResultItem, TopsisCompareResponse
+from ..dependency.db_connect import get_connection
+from ..model.models import CompareRequest, CompareResultItem, TopsisCompareResponse, CompareBatchRequest, TopsisBatchResponse, \
+    RankRequest, TopsisRankResponse
 
 router = APIRouter(prefix="/dss", tags=["DSS"])
 
+CRITERIA_COLUMNS = ['price', 'acreage', 'acreage_ratio', 'amenities_w', 'amenities_ratio', 'distance_to_prefer_location']
+CRITERIA_TYPES = ['cost', 'benefit', 'benefit', 'benefit', 'benefit', 'cost']
+MAX_BATCH_SCENARIOS = 1000
+# Kết quả do server tự tạo: bỏ qua bước validate lại của response_model, mã hóa bằng orjson
+COMPARE_RESPONSE = compile_serializer(TopsisCompareResponse)
+BATCH_RESPONSE = compile_serializer(TopsisBatchResponse)
+RANK_RESPONSE = compile_serializer(TopsisRankResponse)
+# Thời gian từng bước tính toán (decision_matrix, topsis, ranking) của các endpoint DSS
+DSS_STAGE_SECONDS = Histogram("dss_stage_duration_seconds", "Time spent in each stage of the TOPSIS endpoints",
+                              ["endpoint", "stage"])
+SEARCH_FILTERS = ['province_id', 'district_id', 'ward_id', 'min_price', 'max_price', 'min_acreage', 'max_acreage',
+                  'house_type', 'contract_period', 'bedrooms', 'living_rooms', 'kitchens']
+
 @router.post("/compare", response_model=TopsisCompareResponse)
-def compare(request: CompareRequest, conn=Depends(get_db_connection)):
+async def compare(request: CompareRequest, conn=Depends(get_connection)):
 
     if not request.prefer_location:
         request.prefer_location = [21.0285, 105.8542]
@@ -25,78 +43,297 @@ def compare(request: CompareRequest, conn=Depends(get_db_connection)):
         return []
 
     try:
-        houses = HouseService.get_multiple_houses_by_ids(conn, request.house_rent_ids)
-
-        houses_df = pd.DataFrame(houses)
-        
-        dss_matrix = _data_vectorizer(houses, request)
-        
-        houses_df = pd.merge(houses_df, dss_matrix[['id', 'acreage_ratio', 'amenities_w', 'amenities_ratio', 'distance_to_prefer_location']], on='id')
-
-        cols = ['price', 'acreage', 'acreage_ratio', 'amenities_w', 'amenities_ratio', 'distance_to_prefer_location']
-        decision_matrix = houses_df[cols].to_numpy()
-        
-        topsis_weights = normL2(request.topsis_weight) \
-            if request.topsis_weight is not None and len(request.topsis_weight) != 0 \
-            else np.ones(len(cols)) / len(cols)
-            
-        criteria_types = ['cost', 'benefit', 'benefit', 'benefit', 'benefit', 'cost']
-        topsis = TOPSIS(decision_matrix, topsis_weights, criteria_types)
-        scores = topsis.solve()
+        # Kết quả đã tính cho cùng request chuẩn hóa vẫn dùng được nếu không tin nào thay đổi
+        key = _compare_key(request)
+        versions = await compare_cache.get_house_versions(conn, request.house_rent_ids)
+        result = compare_cache.get_cached_result(key, versions)
+        if result is not None:
+            return json_response(COMPARE_RESPONSE, result)
 
-        # Gán điểm TOPSIS và xếp hạng
-        houses_df['topsis_score'] = scores
-        houses_df = houses_df.sort_values(by='topsis_score', ascending=False).reset_index(drop=True)
-        houses_df['rank'] = houses_df.index + 1
+        houses = await compare_cache.fetch_houses(conn, versions)
+        if not houses:
+            return {"ranked_houses": [], "ideal_best": {}, "ideal_worst": {}}
 
-        # Thêm thông tin tiện ích khớp và tiện ích có sẵn
-        requested_amenities_ids = set(request.amenities)
-        houses_df['matched_amenities'] = houses_df['environments'].apply(lambda envs: [env for env in envs if env['id'] in requested_amenities_ids])
-        ranked_houses = houses_df.to_dict('records')
+        # Phần tính toán TOPSIS chạy trong threadpool để không chặn event loop
+        result = await run_in_threadpool(_rank_houses, houses, request)
+        compare_cache.cache_result(key, versions, result)
+        return json_response(COMPARE_RESPONSE, result)
 
-        # Lấy ideal best/worst từ dữ liệu gốc (chưa chuẩn hóa)
-        ideal_best_raw, ideal_worst_raw = topsis.find_ideal_solutions_raw()
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database query failed: {e}")
+
+@router.post("/compare/batch", response_model=TopsisBatchResponse)
+async def compare_batch(request: CompareBatchRequest, conn=Depends(get_connection)):
+    """
+    Score many TOPSIS weight profiles against the same houses.
+
+    Houses are fetched and normalized once; the response lists the houses with their
+    criteria values and, per profile, the house ids from best to worst.
+    """
+    if not request.prefer_location:
+        request.prefer_location = [21.0285, 105.8542]
+
+    if not request.topsis_weights:
+        raise HTTPException(status_code=422, detail="topsis_weights must contain at least one weight profile")
+    if len(request.topsis_weights) > MAX_BATCH_SCENARIOS:
+        raise HTTPException(status_code=422, detail=f"At most {MAX_BATCH_SCENARIOS} weight profiles per request")
+    if any(len(w) != len(CRITERIA_COLUMNS) for w in request.topsis_weights):
+        raise HTTPException(status_code=422, detail=f"Each weight profile must have {len(CRITERIA_COLUMNS)} values: {CRITERIA_COLUMNS}")
+
+    if not request.house_rent_ids:
+        return {"houses": [], "scenarios": [], "ideal_best": {}, "ideal_worst": {}}
+
+    try:
+        versions = await compare_cache.get_house_versions(conn, request.house_rent_ids)
+        houses = await compare_cache.fetch_houses(conn, versions)
+        if not houses:
+            return {"houses": [], "scenarios": [], "ideal_best": {}, "ideal_worst": {}}
 
-        return {
+        return json_response(BATCH_RESPONSE, await run_in_threadpool(_rank_houses_batch, houses, request))
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database query failed: {e}")
+
+@router.post("/rank", response_model=TopsisRankResponse)
+async def rank(request: RankRequest, conn=Depends(get_connection)):
+    """
+    Rank every listing matching the search filters and return the best `k`.
+
+    Only the TOPSIS inputs are read for the candidates (amenity weights are summed in SQL);
+    full details are fetched for the `k` winners only.
+    """
+    if not request.prefer_location:
+        request.prefer_location = [21.0285, 105.8542]
+    request.amenities = request.amenities or []
+
+    filters = {name: getattr(request, name) for name in SEARCH_FILTERS}
+    if request.radius_km is not None:
+        filters.update(latitude=request.prefer_location[0], longitude=request.prefer_location[1],
+                       radius_km=request.radius_km)
+
+    try:
+        features = await run_house_service(conn, "get_house_features", _amenity_weight_map(request), **filters)
+        if not features:
+            return {"ranked_houses": [], "ideal_best": {}, "ideal_worst": {}, "total_candidates": 0}
+
+        top = await run_in_threadpool(_score_top_k, features, request)
+
+        houses = await run_house_service(conn, "get_multiple_houses_by_ids", [row["id"] for row in top["ranked"]])
+        houses_by_id = {house["id"]: house for house in houses}
+
+        requested_amenities_ids = set(request.amenities)
+        ranked_houses = []
+        for row in top["ranked"]:
+            house = houses_by_id.get(row["id"])
+            if house is None:
+                # Tin đăng bị gỡ giữa hai truy vấn
+                continue
+            house.update(row)
+            house["matched_amenities"] = [env for env in house["environments"] if env["id"] in requested_amenities_ids]
+            house["rank"] = len(ranked_houses) + 1
+            ranked_houses.append(house)
+
+        return json_response(RANK_RESPONSE, {
             "ranked_houses": ranked_houses,
-            "ideal_best": dict(zip(cols, ideal_best_raw)),
-            "ideal_worst": dict(zip(cols, ideal_worst_raw))
-        }
+            "ideal_best": top["ideal_best"],
+            "ideal_worst": top["ideal_worst"],
+            "total_candidates": len(features)
+        })
 
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database query failed: {e}")
 
-def _data_vectorizer(house_data: list, request: CompareRequest):
-    if not house_data:
-        return []
+def _topsis_weights(topsis_weight):
+    return normL2(topsis_weight) \
+        if topsis_weight is not None and len(topsis_weight) != 0 \
+        else np.ones(len(CRITERIA_COLUMNS)) / len(CRITERIA_COLUMNS)
 
-    df = pd.DataFrame(house_data)
+def _compare_key(request: CompareRequest) -> tuple:
+    """Canonical form of a compare request: id set, amenity -> weight map, normalized TOPSIS weights"""
+    return (
+        tuple(sorted(set(request.house_rent_ids))),
+        tuple(sorted((int(amenity), float(weight)) for amenity, weight in _amenity_weight_map(request).items())),
+        tuple(round(float(w), 12) for w in _topsis_weights(request.topsis_weight)),
+        tuple(float(x) for x in request.prefer_location),
+    )
 
+def _build_decision_matrix(houses: list, request):
+    """
+    Compute the per-house criteria and return (rows, decision_matrix).
+
+    `rows` are copies of the house rows with the criteria values and matched amenities
+    added; `decision_matrix` is the (m x 6) float matrix in `CRITERIA_COLUMNS` order.
+    """
+    amenity_bits = AmenityBitset.from_houses(houses)
+
+    decision_matrix = _data_vectorizer(houses, request, amenity_bits)
+
+    # Thêm thông tin tiện ích khớp: AND bitset với tiện ích yêu cầu, rồi lấy lại thông tin từ danh mục
+    catalog = {env['id']: env for house in houses for env in house['environments']}
+    matched = amenity_bits.matched(request.amenities)
+
+    rows = []
+    for house, criteria, env_ids in zip(houses, decision_matrix[:, 2:].tolist(), matched):
+        # Sao chép: các hàng có thể nằm trong cache dùng chung
+        row = dict(house)
+        row.update(zip(CRITERIA_COLUMNS[2:], criteria))
+        row['matched_amenities'] = [catalog[env_id] for env_id in env_ids]
+        rows.append(row)
+
+    return rows, decision_matrix
+
+def _descending_order(scores: np.ndarray) -> np.ndarray:
+    """
+    Indices sorting `scores` from best to worst, NaN last.
+
+    Same algorithm (and tie order) as pandas `sort_values(ascending=False)`: reverse,
+    quicksort ascending, reverse again.
+    """
+    nan_mask = np.isnan(scores)
+    idx = np.arange(len(scores))
+    non_nans = scores[~nan_mask][::-1]
+    non_nan_idx = idx[~nan_mask][::-1]
+    order = non_nan_idx[non_nans.argsort(kind='quicksort')][::-1]
+    return np.concatenate([order, np.nonzero(nan_mask)[0]])
+
+def _stage(endpoint: str, stage: str):
+    return DSS_STAGE_SECONDS.labels(endpoint, stage).time()
+
+def _rank_houses(houses: list, request: CompareRequest):
+    """Score and rank the fetched houses with TOPSIS (CPU-bound, run off the event loop)."""
+    with _stage("compare", "decision_matrix"):
+        rows, decision_matrix = _build_decision_matrix(houses, request)
+
+    with _stage("compare", "topsis"):
+        topsis_weights = _topsis_weights(request.topsis_weight)
+
+        topsis = TOPSIS(decision_matrix, topsis_weights, CRITERIA_TYPES)
+        scores = topsis.solve()
+
+    with _stage("compare", "ranking"):
+        # Gán điểm TOPSIS và xếp hạng
+        ranked_houses = []
+        for rank, i in enumerate(_descending_order(scores).tolist(), start=1):
+            row = rows[i]
+            row['topsis_score'] = float(scores[i])
+            row['rank'] = rank
+            ranked_houses.append(row)
+
+        # Lấy ideal best/worst từ dữ liệu gốc (chưa chuẩn hóa)
+        ideal_best_raw, ideal_worst_raw = topsis.find_ideal_solutions_raw()
+
+    return {
+        "ranked_houses": ranked_houses,
+        "ideal_best": dict(zip(CRITERIA_COLUMNS, ideal_best_raw.tolist())),
+        "ideal_worst": dict(zip(CRITERIA_COLUMNS, ideal_worst_raw.tolist()))
+    }
+
+def _rank_houses_batch(houses: list, request: CompareBatchRequest):
+    """Score every weight profile against the same decision matrix in one TOPSIS pass."""
+    with _stage("batch", "decision_matrix"):
+        rows, decision_matrix = _build_decision_matrix(houses, request)
+
+    with _stage("batch", "topsis"):
+        weight_matrix = np.array([_topsis_weights(w) for w in request.topsis_weights], dtype=float)
+
+        topsis = TOPSIS(decision_matrix, weight_matrix, CRITERIA_TYPES)
+        scores = topsis.solve()  # (k x m)
+
+    with _stage("batch", "ranking"):
+        # argsort ổn định trên -score: NaN xếp cuối
+        order = np.argsort(-scores, axis=1, kind='stable')
+        ids = np.array([house['id'] for house in houses], dtype=np.int64)
+
+        scenarios = []
+        for i, topsis_weight in enumerate(weight_matrix):
+            ranked_scores = scores[i, order[i]]
+            scenarios.append({
+                "topsis_weight": topsis_weight.tolist(),
+                "ranked_ids": ids[order[i]].tolist(),
+                "scores": [None if np.isnan(x) else float(x) for x in ranked_scores],
+            })
+
+        ideal_best_raw, ideal_worst_raw = topsis.find_ideal_solutions_raw()
+
+    return {
+        "houses": rows,
+        "scenarios": scenarios,
+        "ideal_best": dict(zip(CRITERIA_COLUMNS, ideal_best_raw.tolist())),
+        "ideal_worst": dict(zip(CRITERIA_COLUMNS, ideal_worst_raw.tolist()))
+    }
+
+def _amenity_weight_map(request) -> dict:
     weights = request.weights \
         if request.weights is not None and len(request.weights) != 0 \
         else np.ones(len(request.amenities)) * 100
+    return dict(zip(request.amenities, weights))
+
+def _score_top_k(features: list, request: RankRequest):
+    """
+    Build the decision matrix from (id, price, acreage, latitude, longitude, amenities_w) rows,
+    score it with TOPSIS and select the best `k` with a partial sort.
+    """
+    with _stage("rank", "decision_matrix"), np.errstate(divide='ignore', invalid='ignore'):
+        ids = np.array([row[0] for row in features], dtype=np.int64)
+        data = np.array([row[1:] for row in features], dtype=float)
+        price, acreage, latitude, longitude, amenities_w = data.T
 
-    amenities = request.amenities
+        prefer_location = request.prefer_location
+        distance = fill_missing_distances(haversine_km(latitude, longitude, prefer_location[0], prefer_location[1]))
+        decision_matrix = np.column_stack([
+            price, acreage, acreage / price, amenities_w, amenities_w / price, distance
+        ])
 
-    dss_matrix = df[['id']].copy()
+    with _stage("rank", "topsis"), np.errstate(divide='ignore', invalid='ignore'):
+        topsis = TOPSIS(decision_matrix, _topsis_weights(request.topsis_weight), CRITERIA_TYPES)
+        scores = topsis.solve()
 
-    dss_matrix['price'] = df['price']
-    dss_matrix['acreage'] = df['acreage']
-    dss_matrix['acreage_ratio'] = df['acreage'] / df['price']
+    with _stage("rank", "ranking"):
+        # Chọn top-k bằng argpartition (O(m)), chỉ sắp xếp k phần tử thắng
+        k = min(request.k, len(ids))
+        sortable = np.where(np.isnan(scores), -np.inf, scores)
+        top = np.argpartition(-sortable, k - 1)[:k]
+        top = top[np.argsort(-sortable[top], kind='stable')]
 
-    amenity_weight_map = dict(zip(amenities, weights))
+        ranked = []
+        for i in top:
+            row = dict(zip(CRITERIA_COLUMNS, decision_matrix[i].tolist()))
+            row["id"] = int(ids[i])
+            row["topsis_score"] = float(scores[i])
+            ranked.append(row)
+
+        ideal_best_raw, ideal_worst_raw = topsis.find_ideal_solutions_raw()
+
+    return {
+        "ranked": ranked,
+        "ideal_best": dict(zip(CRITERIA_COLUMNS, ideal_best_raw.tolist())),
+        "ideal_worst": dict(zip(CRITERIA_COLUMNS, ideal_worst_raw.tolist()))
+    }
+
+def _data_vectorizer(house_data: list, request: CompareRequest, amenity_bits: AmenityBitset = None) -> np.ndarray:
+    """Decision matrix (m x 6, `CRITERIA_COLUMNS` order) built directly from the house rows"""
+    if amenity_bits is None:
+        amenity_bits = AmenityBitset.from_houses(house_data)
+
+    # None (NULL) thành NaN như khi đi qua DataFrame
+    price = np.array([house['price'] for house in house_data], dtype=float)
+    acreage = np.array([house['acreage'] for house in house_data], dtype=float)
+    latitude = np.array([house['latitude'] for house in house_data], dtype=float)
+    longitude = np.array([house['longitude'] for house in house_data], dtype=float)
+
+    amenities_w = np.asarray(amenity_bits.weights(_amenity_weight_map(request)), dtype=float)
 
-    dss_matrix['amenities_w'] = df['environments'].apply(
-        lambda house_amenities: sum(amenity_weight_map.get(amenity['id'], 0) for amenity in house_amenities)
-    )
-    dss_matrix['amenities_ratio'] = dss_matrix['amenities_w'] / df['price']
     prefer_location = request.prefer_location
-    dss_matrix['distance_to_prefer_location'] = df.apply(
-        lambda row: np.inf if pd.isna(row['latitude']) or pd.isna(row['longitude'])
-        else ((prefer_location[0] - row['latitude']) ** 2 + (prefer_location[1] - row['longitude']) ** 2) ** 0.5,
-        axis=1
-    )
+    # Khoảng cách haversine (km); tin không có tọa độ lấy bằng khoảng cách xa nhất
+    distance = fill_missing_distances(haversine_km(latitude, longitude, prefer_location[0], prefer_location[1]))
 
-    return dss_matrix
\ No newline at end of file
+    with np.errstate(divide='ignore', invalid='ignore'):
+        columns = [price, acreage, acreage / price, amenities_w, amenities_w / price, distance]
+    # Lưu theo cột (Fortran order) như DataFrame.to_numpy(): tổng theo cột trong TOPSIS cộng cùng thứ tự
+    return np.vstack(columns).T
@@ -1,51 +1,29 @@
 from typing import List
 
-from fastapi import Depends, HTTPException, Query, APIRouter
-from psycopg2.extras import RealDictCursor
+from fastapi import Query, APIRouter, Request
+from pydantic import TypeAdapter
 
-from ..dependency.db_connect import get_db_connection
+from ..logic.reference import reference_response
 from ..model.models import LocationItem
 
 router = APIRouter(prefix="/locations", tags=["locations"])
 
+LOCATION_LIST = TypeAdapter(List[LocationItem])
+
 @router.get("/provinces", response_model=List[LocationItem])
-def get_provinces(conn=Depends(get_db_connection)):
-    try:
-        with conn.cursor(cursor_factory=RealDictCursor) as cur:
-            cur.execute("SELECT id, name FROM public.provinces")
-            provinces = cur.fetchall()
-        conn.close()
-        return provinces
-    except Exception as e:
-        conn.close()
-        raise HTTPException(status_code=500, detail=f"Database query failed: {e}")
+async def get_provinces(request: Request):
+    return await reference_response(request, ("provinces",), LOCATION_LIST, "SELECT id, name FROM public.provinces")
 
 @router.get("/districts", response_model=List[LocationItem])
-def get_districts(province_id: int = Query(None), conn=Depends(get_db_connection)):
-    try:
-        with conn.cursor(cursor_factory=RealDictCursor) as cur:
-            if province_id:
-                cur.execute("SELECT id, name FROM public.districts WHERE province_id = %s", (province_id,))
-            else:
-                cur.execute("SELECT id, name FROM public.districts")
-            districts = cur.fetchall()
-        conn.close()
-        return districts
-    except Exception as e:
-        conn.close()
-        raise HTTPException(status_code=500, detail=f"Database query failed: {e}")
+async def get_districts(request: Request, province_id: int = Query(None)):
+    if province_id:
+        return await reference_response(request, ("districts", province_id), LOCATION_LIST,
+                                        "SELECT id, name FROM public.districts WHERE province_id = %s", (province_id,))
+    return await reference_response(request, ("districts",), LOCATION_LIST, "SELECT id, name FROM public.districts")
 
 @router.get("/wards", response_model=List[LocationItem])
-def get_wards(district_id: int = Query(None), conn=Depends(get_db_connection)):
-    try:
-        with conn.cursor(cursor_factory=RealDictCursor) as cur:
-            if district_id:
-                cur.execute("SELECT id, name FROM public.wards WHERE district_id = %s", (district_id,))
-            else:
-                cur.execute("SELECT id, name FROM public.wards")
-            wards = cur.fetchall()
-        conn.close()
-        return wards
-    except Exception as e:
-        conn.close()
-        raise HTTPException(status_code=500, detail=f"Database query failed: {e}")
\ No newline at end of file
+async def get_wards(request: Request, district_id: int = Query(None)):
+    if district_id:
+        return await reference_response(request, ("wards", district_id), LOCATION_LIST,
+                                        "SELECT id, name FROM public.wards WHERE district_id = %s", (district_id,))
+    return await reference_response(request, ("wards",), LOCATION_LIST, "SELECT id, name FROM public.wards")
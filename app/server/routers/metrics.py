@@ -0,0 +1,10 @@
+from fastapi import APIRouter, Response
+
+from ..utils import metrics
+
+router = APIRouter(tags=["System"])
+
+@router.get("/metrics", response_class=Response)
+async def get_metrics():
+    """Every metric in the Prometheus text exposition format, for scraping"""
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
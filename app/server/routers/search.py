@@ -1,15 +1,22 @@
-from typing import List
+import logging
+from typing import Any, Dict, List
 
 from fastapi import Query, Depends, HTTPException, APIRouter
 
-from ..dependency.db_connect import get_db_connection
-from ..logic.house import HouseService
-from ..model.models import HouseRentItem
+from ..dependency.db_connect import get_connection
+from ..logic.house import run_house_service
+from ..model.models import HouseSearchItem, HouseSearchPage
+from ..utils.cursor import encode_cursor, decode_cursor
+from ..utils.fast_json import compile_serializer, json_response
 
 router = APIRouter(prefix="/search", tags=["Search"])
+logger = logging.getLogger(__name__)
 
-@router.get("/house-rent", response_model=List[HouseRentItem])
-def search_house_rent(
+# Hàng lấy từ DB/snapshot: bỏ qua bước validate lại của response_model, mã hóa bằng orjson
+SEARCH_RESULTS = compile_serializer(List[HouseSearchItem])
+SEARCH_PAGE = compile_serializer(HouseSearchPage)
+
+def search_filters(
         province_id: int = Query(None),
         district_id: int = Query(None),
         ward_id: int = Query(None),
@@ -22,37 +29,107 @@ def search_house_rent(
         bedrooms: int = Query(None),
         living_rooms: int = Query(None),
         kitchens: int = Query(None),
+        amenities: List[int] = Query(None, description="Environment ids the listing must have"),
+        amenities_match: str = Query("all", pattern="^(all|any)$", description="Require all or any of `amenities`"),
+        latitude: float = Query(None, ge=-90, le=90),
+        longitude: float = Query(None, ge=-180, le=180),
+        radius_km: float = Query(None, gt=0, description="Only listings within this distance of (latitude, longitude)"),
+        q: str = Query(None, max_length=200, description="Words to find in the title, address or amenities (diacritics optional)"),
+        order_by: str = Query(None, pattern="^(id|distance|relevance)$",
+                              description="`distance`: nearest to (latitude, longitude) first; `relevance`: best `q` matches"
+                                          " first (default when `q` is given, `id` otherwise)")
+) -> Dict[str, Any]:
+    """
+    Filter and sort query parameters shared by the search endpoints
+    """
+    q = q.strip() if q and q.strip() else None
+    if order_by is None:
+        order_by = "relevance" if q else "id"
+    if (radius_km is not None or order_by == "distance") and (latitude is None or longitude is None):
+        raise HTTPException(status_code=422, detail="radius_km and order_by=distance require latitude and longitude")
+    if order_by == "relevance" and q is None:
+        raise HTTPException(status_code=422, detail="order_by=relevance requires q")
+
+    return dict(
+        province_id=province_id,
+        district_id=district_id,
+        ward_id=ward_id,
+        min_price=min_price,
+        max_price=max_price,
+        min_acreage=min_acreage,
+        max_acreage=max_acreage,
+        house_type=house_type,
+        contract_period=contract_period,
+        bedrooms=bedrooms,
+        living_rooms=living_rooms,
+        kitchens=kitchens,
+        amenities=amenities,
+        amenities_match=amenities_match,
+        latitude=latitude,
+        longitude=longitude,
+        radius_km=radius_km,
+        q=q,
+        order_by=order_by
+    )
+
+@router.get("/house-rent", response_model=List[HouseSearchItem])
+async def search_house_rent(
+        filters: Dict[str, Any] = Depends(search_filters),
         limit: int = Query(10, ge=1, le=100),
         offset: int = Query(0, ge=0),
-        conn=Depends(get_db_connection)
+        conn=Depends(get_connection)
 ):
     """
     Search for house rent listings with various filters
     """
     try:
-        results = HouseService.search_house_rent(
-            conn=conn,
-            province_id=province_id,
-            district_id=district_id,
-            ward_id=ward_id,
-            min_price=min_price,
-            max_price=max_price,
-            min_acreage=min_acreage,
-            max_acreage=max_acreage,
-            house_type=house_type,
-            contract_period=contract_period,
-            bedrooms=bedrooms,
-            living_rooms=living_rooms,
-            kitchens=kitchens,
-            limit=limit,
-            offset=offset
-        )
-
-        return results
+        results = await run_house_service(conn, "search_house_rent", **filters, limit=limit, offset=offset)
+
+        return json_response(SEARCH_RESULTS, results)
 
     except HTTPException:
         raise
     except Exception as e:
-        print(f"ERROR in search_house_rent: {e}")
-        conn.close()
-        raise HTTPException(status_code=500, detail=f"Database query failed: {e}")
\ No newline at end of file
+        logger.exception("search_house_rent failed")
+        raise HTTPException(status_code=500, detail=f"Database query failed: {e}")
+
+@router.get("/house-rent/page", response_model=HouseSearchPage)
+async def search_house_rent_page(
+        filters: Dict[str, Any] = Depends(search_filters),
+        cursor: str = Query(None, description="`next_cursor` of the previous page"),
+        limit: int = Query(10, ge=1, le=100),
+        conn=Depends(get_connection)
+):
+    """
+    Search with keyset pagination: pass back `next_cursor` to get the following page
+    """
+    by_distance = filters["order_by"] == "distance"
+    after = None
+    if cursor:
+        try:
+            after = decode_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if after.get("order_by", "id") != filters["order_by"]:
+            raise HTTPException(status_code=400, detail="Cursor was issued for a different order_by")
+
+    try:
+        results = await run_house_service(conn, "search_house_rent", **filters, after=after, limit=limit)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("search_house_rent_page failed")
+        raise HTTPException(status_code=500, detail=f"Database query failed: {e}")
+
+    next_cursor = None
+    if len(results) == limit:
+        last = results[-1]
+        position = {"order_by": filters["order_by"], "id": last["id"]}
+        if by_distance:
+            position["distance"] = last.get("distance_km")
+        elif filters["order_by"] == "relevance":
+            position["relevance"] = last["relevance"]
+        next_cursor = encode_cursor(position)
+
+    return json_response(SEARCH_PAGE, {"items": results, "next_cursor": next_cursor})
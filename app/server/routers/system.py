@@ -0,0 +1,68 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import FileResponse
+
+from ..config import settings
+
+from ..dependency import db_connect
+from ..dependency.admin import require_admin_token
+from ..dependency.db_connect import get_db_connection
+from ..logic import snapshot
+from ..utils.cache import CACHES
+from ..utils.profiling import list_profiles, profile_path
+from ..model.models import DbCheck, PoolStats
+
+router = APIRouter(prefix="/system", tags=["System"])
+# Endpoint thay đổi trạng thái server: chỉ đăng ký khi có ADMIN_TOKEN (xem main.py)
+admin_router = APIRouter(prefix="/system", tags=["System"], dependencies=[Depends(require_admin_token)])
+
+@router.get("/db-check", response_model=DbCheck)
+def db_check(conn=Depends(get_db_connection)):
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1")
+        return {"status": "success", "message": "Database connection successful!"}
+    except Exception as e:
+        return {"status": "error", "message": f"Database connection failed: {e}"}
+
+@router.get("/db-pool", response_model=PoolStats)
+def get_pool_stats():
+    if db_connect.db_pool is None:
+        raise HTTPException(status_code=503, detail="Database pool is not initialised")
+    return db_connect.db_pool.stats()
+
+@router.get("/db-pool/async")
+def get_async_pool_stats():
+    if db_connect.async_db_pool is None:
+        raise HTTPException(status_code=404, detail="Async database access is disabled (DB_ASYNC)")
+    # psycopg_pool counters: requests_waiting, requests_wait_ms, pool_size, pool_available, ...
+    return db_connect.async_db_pool.get_stats()
+
+@router.get("/snapshot")
+def get_snapshot_stats():
+    if snapshot.listing_snapshot is None:
+        raise HTTPException(status_code=404, detail="Listing snapshot is disabled (LISTING_SNAPSHOT)")
+    return snapshot.listing_snapshot.stats()
+
+@router.get("/cache")
+def get_cache_stats():
+    return {name: cache.stats() for name, cache in CACHES.items()}
+
+@admin_router.post("/cache/{name}/invalidate")
+def invalidate_cache(name: str):
+    cache = CACHES.get(name)
+    if cache is None:
+        raise HTTPException(status_code=404, detail=f"Unknown cache '{name}'")
+    return {"name": name, "invalidated": cache.invalidate()}
+
+@admin_router.get("/profiles")
+def get_profiles():
+    if not settings.profiling:
+        raise HTTPException(status_code=404, detail="Request profiling is disabled (PROFILING)")
+    return list_profiles(settings.profile_dir)
+
+@admin_router.get("/profiles/{profile_id}")
+def get_profile(profile_id: str):
+    path = profile_path(settings.profile_dir, profile_id) if settings.profiling else None
+    if path is None:
+        raise HTTPException(status_code=404, detail=f"Unknown profile '{profile_id}'")
+    return FileResponse(path, media_type="application/octet-stream", filename=f"{profile_id}.prof")
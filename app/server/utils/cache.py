@@ -0,0 +1,160 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+from fastapi import Request, Response
+
+from .metrics import register_collector
+
+# Mọi cache được đăng ký theo tên để /api/system/cache báo cáo và xóa được
+CACHES: Dict[str, "LRUCache"] = {}
+
+_MISSING = object()
+
+
+class LRUCache:
+    """
+    Thread-safe bounded LRU cache with an optional time-to-live per entry.
+
+    Keeps hit/miss/eviction/expiration counters and registers itself in `CACHES` under `name`.
+    """
+
+    def __init__(self, name: str, max_size: int = 1024, ttl: Optional[float] = None):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.name = name
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+        CACHES[name] = self
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key: Hashable, default: Any = None, validate: Optional[Callable[[Any], bool]] = None) -> Any:
+        """
+        Cached value for `key`, or `default`.
+
+        When `validate` is given and returns False for the cached value, the entry is
+        dropped (counted as an invalidation) and the lookup is a miss.
+        """
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is not _MISSING:
+                value, expires_at = entry
+                if expires_at is not None and expires_at <= time.monotonic():
+                    del self._entries[key]
+                    self.expirations += 1
+                elif validate is not None and not validate(value):
+                    del self._entries[key]
+                    self.invalidations += 1
+                else:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+            self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key: Hashable) -> Any:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self.invalidations += 1
+                return entry[0]
+        return None
+
+    def invalidate(self, predicate: Optional[Callable[[Hashable], bool]] = None) -> int:
+        """Drop every entry (or those whose key matches `predicate`); returns the number dropped"""
+        with self._lock:
+            keys = [key for key in self._entries if predicate is None or predicate(key)]
+            for key in keys:
+                del self._entries[key]
+            self.invalidations += len(keys)
+        return len(keys)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+
+@register_collector
+def _collect_cache_metrics():
+    stats = {name: cache.stats() for name, cache in CACHES.items()}
+    for counter, documentation in (("hits", "Cache hits"), ("misses", "Cache misses"),
+                                   ("evictions", "Entries evicted by the size bound"),
+                                   ("expirations", "Entries dropped after their TTL"),
+                                   ("invalidations", "Entries invalidated")):
+        yield f"cache_{counter}_total", "counter", documentation, \
+            [({"cache": name}, cache_stats[counter]) for name, cache_stats in stats.items()]
+    yield "cache_entries", "gauge", "Entries held by the cache", \
+        [({"cache": name}, cache_stats["size"]) for name, cache_stats in stats.items()]
+
+
+class CachedBody:
+    """A serialized JSON response body and its strong ETag"""
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self.etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+async def cached_json_response(
+        request: Request,
+        cache: LRUCache,
+        key: Hashable,
+        load: Callable[[], Awaitable[bytes]],
+        max_age: int
+) -> Response:
+    """
+    Serve a JSON body from `cache`, loading it with `load()` on a miss.
+
+    Sends a strong ETag and `Cache-Control`, and answers `304 Not Modified` when the
+    client's `If-None-Match` already holds the current version.
+    """
+    entry = cache.get(key)
+    if entry is None:
+        entry = CachedBody(await load())
+        cache.set(key, entry)
+
+    headers = {"ETag": entry.etag, "Cache-Control": f"public, max-age={max_age}"}
+    if etag_matches(request.headers.get("if-none-match"), entry.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
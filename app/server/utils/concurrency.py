@@ -0,0 +1,30 @@
+"""
+Running blocking calls (psycopg2 queries, TOPSIS, decision matrices) off the event loop.
+
+`run_in_threadpool` is Starlette's, with one extension point: a request can install a hook
+through `threadpool_hook` that every call it sends to the threadpool goes through, e.g. the
+profiler (`utils.profiling`) running the call inside a profile segment:
+
+    token = threadpool_hook.set(lambda func, *args, **kwargs: func(*args, **kwargs))
+    try:
+        await handler()
+    finally:
+        threadpool_hook.reset(token)
+
+Without a hook it costs one ContextVar lookup.
+"""
+from contextvars import ContextVar
+from typing import Any, Callable, Optional
+
+from starlette.concurrency import run_in_threadpool as _run_in_threadpool
+
+# Hàm bọc mọi lời gọi vào threadpool của request hiện tại: hook(func, *args, **kwargs), chạy trong thread của pool
+threadpool_hook: ContextVar[Optional[Callable[..., Any]]] = ContextVar("threadpool_hook", default=None)
+
+
+async def run_in_threadpool(func: Callable, *args, **kwargs) -> Any:
+    """`starlette.concurrency.run_in_threadpool`, through the current request's hook if it has one"""
+    hook = threadpool_hook.get()
+    if hook is None:
+        return await _run_in_threadpool(func, *args, **kwargs)
+    return await _run_in_threadpool(hook, func, *args, **kwargs)
@@ -0,0 +1,43 @@
+import base64
+import json
+import math
+from typing import Any, Dict
+
+
+def encode_cursor(position: Dict[str, Any]) -> str:
+    """
+    Encodes a keyset position (sort order, last id and last sort key) as an opaque URL-safe token.
+
+    :param position: e.g. {"order_by": "id", "id": 120} or {"order_by": "distance", "id": 87, "distance": 1.25}
+    :return: The cursor string.
+    """
+    raw = json.dumps(position, separators=(",", ":"), sort_keys=True).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """
+    Decodes a cursor produced by `encode_cursor`.
+
+    :raises ValueError: If the cursor is malformed.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        position = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {e}") from e
+
+    if not isinstance(position, dict) or not isinstance(position.get("id"), int):
+        raise ValueError("Invalid cursor: missing id")
+    order_by = position.get("order_by")
+    # distance có thể NULL (nhà không có tọa độ xếp cuối); relevance luôn là số
+    if order_by == "distance" and position.get("distance") is not None \
+            and not _is_finite_number(position["distance"]):
+        raise ValueError("Invalid cursor: bad distance")
+    if order_by == "relevance" and not _is_finite_number(position.get("relevance")):
+        raise ValueError("Invalid cursor: bad relevance")
+    return position
+
+
+def _is_finite_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
@@ -0,0 +1,151 @@
+import datetime
+import decimal
+import types
+import typing
+from typing import Any, Callable, Dict, List, Union
+
+import numpy as np
+import orjson
+from fastapi import Response
+from pydantic import BaseModel
+
+ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY
+
+
+def _default(value: Any) -> Any:
+    """Types orjson does not encode natively (pandas Timestamps, Decimals, ...)"""
+    if isinstance(value, datetime.datetime):
+        return datetime.datetime.isoformat(value)
+    if isinstance(value, datetime.date):
+        return datetime.date.isoformat(value)
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def _optional(convert: Callable) -> Callable:
+    if convert is _int:
+        return lambda value: None if value is None or value != value else int(value)
+    return lambda value: None if value is None else convert(value)
+
+
+def _unwrap_optional(annotation):
+    origin = typing.get_origin(annotation)
+    if origin in (Union, types.UnionType):
+        args = [arg for arg in typing.get_args(annotation) if arg is not type(None)]
+        if len(args) == 1:
+            return args[0], True
+    return annotation, False
+
+
+def _float(value) -> float:
+    return float(value)
+
+
+def _int(value) -> int:
+    return int(value)
+
+
+def _bool(value) -> bool:
+    return bool(value)
+
+
+def _identity(value):
+    return value
+
+
+def compile_serializer(annotation) -> Callable[[Any], Any]:
+    """
+    Build a function shaping trusted server-built data like `TypeAdapter(annotation)` would.
+
+    It keeps only the model's fields, in declaration order, fills defaults, and coerces
+    numbers (`float` fields become floats, `int` fields ints), but does not validate.
+    The result is meant for `orjson.dumps` and yields the same bytes as FastAPI's
+    `response_model` serialization for data that would pass its validation.
+    """
+    annotation, optional = _unwrap_optional(annotation)
+    origin = typing.get_origin(annotation)
+
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        convert = _compile_model(annotation)
+    elif origin in (list, List):
+        (item,) = typing.get_args(annotation) or (Any,)
+        convert_item = compile_serializer(item)
+        if convert_item is _identity:
+            convert = list
+        else:
+            convert = lambda values: [convert_item(value) for value in values]
+    elif origin in (dict, Dict):
+        _, value_type = typing.get_args(annotation) or (Any, Any)
+        convert_value = compile_serializer(value_type)
+        convert = lambda values: {str(key): convert_value(value) for key, value in values.items()}
+    elif annotation is float:
+        convert = _float
+    elif annotation is bool:
+        convert = _bool
+    elif annotation is int:
+        convert = _int
+    else:
+        # str, date, datetime, Any: orjson (và _default) mã hóa trực tiếp
+        return _identity
+
+    return _optional(convert) if optional else convert
+
+
+def _field_expression(annotation, getter: str, index: int, namespace: Dict[str, Any]) -> str:
+    """Python expression converting `getter` for a field of type `annotation`"""
+    inner, optional = _unwrap_optional(annotation)
+    convert = compile_serializer(annotation)
+    if convert is _identity:
+        return getter
+    if inner in (float, int, bool):
+        name = inner.__name__
+        if not optional:
+            return f"{name}({getter})"
+        if inner is int:
+            # pandas đổi cột số nguyên có NULL thành float NaN
+            return f"(None if (v{index} := {getter}) is None or v{index} != v{index} else int(v{index}))"
+        return f"(None if (v{index} := {getter}) is None else {name}(v{index}))"
+    namespace[f"convert_{index}"] = convert
+    return f"convert_{index}({getter})"
+
+
+def _compile_model(model) -> Callable[[Any], Dict[str, Any]]:
+    # Sinh một hàm phẳng cho model (như dataclasses/attrs) thay vì gọi một closure cho từng trường
+    namespace: Dict[str, Any] = {"BaseModel": BaseModel}
+    items = []
+    for index, (name, field) in enumerate(model.model_fields.items()):
+        key = field.serialization_alias or field.alias or name
+        if field.is_required():
+            getter = f"value[{name!r}]"
+        else:
+            namespace[f"default_{index}"] = field.get_default(call_default_factory=True)
+            getter = f"value.get({name!r}, default_{index})"
+        items.append(f"        {key!r}: {_field_expression(field.annotation, getter, index, namespace)},")
+
+    source = "\n".join([
+        "def convert(value):",
+        "    if type(value) is not dict and isinstance(value, BaseModel):",
+        "        value = value.__dict__",
+        "    return {",
+        *items,
+        "    }",
+    ])
+    exec(compile(source, f"<fast_json {model.__name__}>", "exec"), namespace)
+    return namespace["convert"]
+
+
+def dumps(serializer: Callable[[Any], Any], content: Any) -> bytes:
+    return orjson.dumps(serializer(content), default=_default, option=ORJSON_OPTIONS)
+
+
+def json_response(serializer: Callable[[Any], Any], content: Any, status_code: int = 200) -> Response:
+    """
+    JSON response for server-built `content`, bypassing `response_model` re-validation.
+
+    Keep `response_model` on the route for the OpenAPI schema; returning a `Response`
+    makes FastAPI send it as is.
+    """
+    return Response(content=dumps(serializer, content), status_code=status_code, media_type="application/json")
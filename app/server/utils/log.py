@@ -0,0 +1,129 @@
+"""
+Structured logging through a queue.
+
+`setup_logging()` sends every record (the server's and uvicorn's) to a bounded in-memory
+queue; a background thread formats them - as one JSON object per line, or plain text - and
+writes them to stdout, so request handlers and worker threads never block on the stream.
+Records are only formatted by that thread, once they passed the level checks, and are
+dropped (counted in `log_records_dropped_total`) when the queue is full.
+
+Fields passed with `extra=` become JSON fields:
+
+    logger.info("search done", extra={"results": len(rows)})
+"""
+import datetime
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+from typing import Optional
+
+import orjson
+
+from .metrics import register_collector
+
+TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+# Thuộc tính sẵn có của LogRecord; các thuộc tính khác (truyền qua extra=) được ghi thành field JSON
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {
+    "message", "asctime", "taskName", "color_message"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, message, extra fields, exception"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc)
+            .isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        if record.stack_info:
+            entry["stack"] = self.formatStack(record.stack_info)
+        return orjson.dumps(entry, default=str, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Non-blocking hand-off to the writer thread; records that do not fit are dropped"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Cùng process nên không cần format/pickle trước: để thread ghi log làm
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+
+
+class _QueueListener(logging.handlers.QueueListener):
+    def enqueue_sentinel(self):
+        # Hàng đợi đầy khi tắt server: chờ thread ghi log giải phóng chỗ thay vì lỗi
+        self.queue.put(self._sentinel, timeout=5)
+
+
+_handler: Optional[_QueueHandler] = None
+_listener: Optional[_QueueListener] = None
+_stream: Optional[logging.Handler] = None
+
+
+def setup_logging(level: str = "INFO", fmt: str = "json", queue_size: int = 10000) -> None:
+    """Route the root and uvicorn loggers through the queue; called once at startup"""
+    global _handler, _listener, _stream
+    if _listener is not None:
+        return
+
+    _stream = logging.StreamHandler(sys.stdout)
+    _stream.setFormatter(JsonFormatter() if fmt == "json" else logging.Formatter(TEXT_FORMAT))
+    log_queue = queue.Queue(maxsize=queue_size)
+    _handler = _QueueHandler(log_queue)
+
+    root = logging.getLogger()
+    root.handlers = [_handler]
+    root.setLevel(level.upper())
+    for name in ("uvicorn", "uvicorn.error"):
+        uvicorn_logger = logging.getLogger(name)
+        uvicorn_logger.handlers = []
+        uvicorn_logger.propagate = True
+    # Access log của uvicorn được thay bằng server.access (có sampling, route, thời gian xử lý)
+    access_logger = logging.getLogger("uvicorn.access")
+    access_logger.handlers = []
+    access_logger.propagate = False
+
+    _listener = _QueueListener(log_queue, _stream)
+    _listener.start()
+
+
+def stop_logging() -> None:
+    """Write out the queued records; later records are written directly"""
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    _listener = None
+    root = logging.getLogger()
+    root.removeHandler(_handler)
+    root.addHandler(_stream)
+
+
+@register_collector
+def _collect_log_metrics():
+    if _handler is not None:
+        yield "log_records_dropped_total", "counter", "Log records dropped because the log queue was full", \
+            [({}, _handler.dropped)]
+        yield "log_queue_size", "gauge", "Log records waiting for the writer thread", [({}, _handler.queue.qsize())]
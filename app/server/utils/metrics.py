@@ -0,0 +1,210 @@
+"""
+In-process metrics in the Prometheus text exposition format (version 0.0.4).
+
+Counters, gauges and fixed-bucket histograms register themselves in `METRICS` and are
+rendered by `/metrics`. Values that already live elsewhere (pool and cache counters) are
+read at scrape time through `register_collector` instead of being updated on every request.
+
+Label children are created once and can be kept in module variables, so the hot path is a
+lock, one bisect and two additions:
+
+    DB_QUERY_SECONDS = Histogram("db_query_duration_seconds", "...", ["query"])
+    with DB_QUERY_SECONDS.labels("search").time():
+        cur.execute(...)
+"""
+import math
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+# Mọi metric được đăng ký theo tên để /metrics xuất ra
+METRICS: Dict[str, "_Metric"] = {}
+# Hàm đọc số liệu lúc scrape: trả về các (name, type, help, [(labels, value), ...])
+COLLECTORS: List[Callable[[], Iterable[tuple]]] = []
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Bucket mặc định (giây): từ truy vấn/bước NumPy dưới 1ms tới request chậm nhiều giây
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if value == -math.inf:
+        return "-Inf"
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels.items()) + "}"
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        if name in METRICS:
+            raise ValueError(f"metric '{name}' is already registered")
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        METRICS[name] = self
+
+    def labels(self, *values) -> object:
+        """Child for one combination of label values (created on first use)"""
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _samples(self, labels: Dict[str, str], child) -> Iterable[Tuple[str, Dict[str, str], float]]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for key, child in sorted(self._children.items()):
+            labels = dict(zip(self.labelnames, key))
+            for name, sample_labels, value in self._samples(labels, child):
+                lines.append(f"{name}{_format_labels(sample_labels)} {_format_value(value)}")
+        return lines
+
+
+class _Value:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value: float):
+        self.value = float(value)
+
+
+class Counter(_Metric):
+    """Monotonic count; the name should end in `_total`"""
+    kind = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def _samples(self, labels, child):
+        yield self.name, labels, child.value
+
+
+class Gauge(_Metric):
+    """Value that goes up and down (in-flight requests, queue lengths)"""
+    kind = "gauge"
+
+    def _new_child(self):
+        return _Value()
+
+    def _samples(self, labels, child):
+        yield self.name, labels, child.value
+
+
+class _Timer:
+    __slots__ = ("_histogram", "_start")
+
+    def __init__(self, histogram: "_HistogramValue"):
+        self._histogram = histogram
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._histogram.observe(time.perf_counter() - self._start)
+
+
+class _HistogramValue:
+    __slots__ = ("_upper_bounds", "counts", "sum", "_lock")
+
+    def __init__(self, upper_bounds: Tuple[float, ...]):
+        self._upper_bounds = upper_bounds
+        # Số quan sát theo bucket (không cộng dồn); ô cuối là +Inf
+        self.counts = [0] * (len(upper_bounds) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        i = bisect_left(self._upper_bounds, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+
+    def time(self) -> _Timer:
+        """Context manager observing the wall time of its block, in seconds"""
+        return _Timer(self)
+
+
+class Histogram(_Metric):
+    """Distribution over fixed buckets (`le` upper bounds, in seconds for durations)"""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(float(b) for b in buckets if b != math.inf))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def _samples(self, labels, child):
+        with child._lock:
+            counts, total = list(child.counts), child.sum
+        cumulative = 0
+        for upper_bound, count in zip(self.buckets + (math.inf,), counts):
+            cumulative += count
+            yield f"{self.name}_bucket", {**labels, "le": _format_value(upper_bound)}, cumulative
+        yield f"{self.name}_sum", labels, total
+        yield f"{self.name}_count", labels, cumulative
+
+
+def register_collector(collector: Callable[[], Iterable[tuple]]) -> Callable[[], Iterable[tuple]]:
+    """
+    Add a function called at every scrape; it yields (name, type, help, samples) families
+    where samples are (labels dict, value) pairs. Usable as a decorator.
+    """
+    COLLECTORS.append(collector)
+    return collector
+
+
+def render() -> str:
+    """Every registered metric and collector, in the Prometheus text format"""
+    lines = []
+    for metric in list(METRICS.values()):
+        lines.extend(metric.render())
+    for collector in COLLECTORS:
+        for name, kind, documentation, samples in collector():
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,143 @@
+"""
+Opt-in cProfile profiles of single requests.
+
+A profiled request collects one `cProfile.Profile` per segment of its work: every step of its
+coroutine on the event loop (other requests served in between are not recorded) and every
+call it sends to the threadpool through `utils.concurrency.run_in_threadpool` (TOPSIS, decision
+matrix, psycopg2 queries), whose hook it sets for the request. The segments are merged into one
+pstats file named after the profile id:
+
+    python -m pstats profiles/<id>.prof      # or snakeviz / gprof2dot
+"""
+import cProfile
+import os
+import pstats
+import re
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+from .concurrency import threadpool_hook
+
+PROFILE_SUFFIX = ".prof"
+_PROFILE_ID = re.compile(r"^\d{8}-\d{6}-[0-9a-f]{8}$")
+
+
+def _enable(segment: cProfile.Profile) -> bool:
+    try:
+        segment.enable()
+        return True
+    except ValueError:
+        # Python 3.12+: chỉ một profiler hoạt động cùng lúc trong interpreter, bỏ qua đoạn này
+        return False
+
+
+class RequestProfile:
+    """Profile segments of one request, saved together as a pstats file"""
+
+    def __init__(self, profile_id: Optional[str] = None):
+        self.id = profile_id or f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        self.segments: List[cProfile.Profile] = []
+        self._lock = threading.Lock()
+
+    def segment(self) -> cProfile.Profile:
+        segment = cProfile.Profile()
+        with self._lock:
+            self.segments.append(segment)
+        return segment
+
+    def call(self, func: Callable, *args, **kwargs) -> Any:
+        """Run `func` in the current thread inside a new segment"""
+        segment = self.segment()
+        enabled = _enable(segment)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            if enabled:
+                segment.disable()
+
+    def save(self, directory: str, max_files: int) -> Optional[str]:
+        """Write the merged segments to `directory`, keeping the newest `max_files` profiles"""
+        with self._lock:
+            segments = list(self.segments)
+        if not segments:
+            return None
+        stats = pstats.Stats(segments[0])
+        for segment in segments[1:]:
+            stats.add(segment)
+
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, self.id + PROFILE_SUFFIX)
+        stats.dump_stats(path + ".tmp")
+        os.replace(path + ".tmp", path)
+        _prune(directory, max_files)
+        return path
+
+
+class _ProfiledCoroutine:
+    """Awaitable driving `coro` with the profiler enabled only while it runs"""
+
+    def __init__(self, coro, profile: RequestProfile):
+        self._coro = coro
+        self._profile = profile
+
+    def __await__(self):
+        send_value, error = None, None
+        while True:
+            segment = self._profile.segment()
+            enabled = _enable(segment)
+            try:
+                if error is not None:
+                    future = self._coro.throw(error)
+                else:
+                    future = self._coro.send(send_value)
+            except StopIteration as stop:
+                return stop.value
+            finally:
+                if enabled:
+                    segment.disable()
+            try:
+                send_value, error = (yield future), None
+            except BaseException as e:
+                send_value, error = None, e
+
+
+async def profile_request(coro, profile: RequestProfile):
+    """Await `coro` as the profiled request `profile`; its threadpool calls are profiled too"""
+    token = threadpool_hook.set(profile.call)
+    try:
+        return await _ProfiledCoroutine(coro, profile)
+    finally:
+        threadpool_hook.reset(token)
+
+
+def _prune(directory: str, max_files: int) -> None:
+    profiles = sorted((entry for entry in os.scandir(directory) if entry.name.endswith(PROFILE_SUFFIX)),
+                      key=lambda entry: entry.stat().st_mtime)
+    for entry in profiles[:max(0, len(profiles) - max_files)]:
+        try:
+            os.remove(entry.path)
+        except FileNotFoundError:
+            pass
+
+
+def list_profiles(directory: str) -> List[Dict[str, Any]]:
+    """Saved profiles, newest first"""
+    if not os.path.isdir(directory):
+        return []
+    profiles = []
+    for entry in os.scandir(directory):
+        if entry.name.endswith(PROFILE_SUFFIX):
+            stat = entry.stat()
+            profiles.append({"id": entry.name[:-len(PROFILE_SUFFIX)], "size_bytes": stat.st_size,
+                             "created_at": stat.st_mtime})
+    return sorted(profiles, key=lambda profile: profile["created_at"], reverse=True)
+
+
+def profile_path(directory: str, profile_id: str) -> Optional[str]:
+    """Path of a saved profile, None for an unknown or malformed id"""
+    if not _PROFILE_ID.match(profile_id):
+        return None
+    path = os.path.join(directory, profile_id + PROFILE_SUFFIX)
+    return path if os.path.isfile(path) else None
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from server.logic import amenity
+from server.logic.amenity import AmenityBitset
+
+
+@pytest.fixture
+def id_lists():
+    rng = np.random.default_rng(7)
+    # id 0, 63/64 (ranh giới word) và id lớn để có nhiều word
+    pool = [0, 1, 3, 5, 63, 64, 65, 127, 128, 200]
+    lists = [sorted(set(rng.choice(pool, size=rng.integers(0, 6)).tolist())) for _ in range(60)]
+    return lists + [[], pool]
+
+
+def test_encode_sets_one_bit_per_id(id_lists):
+    bits = amenity.encode(id_lists)
+
+    assert bits.shape == (len(id_lists), amenity.words_for(200))
+    assert AmenityBitset(bits).ids() == id_lists
+
+
+def test_words_for_covers_the_largest_id():
+    assert amenity.words_for(0) == 1
+    assert amenity.words_for(63) == 1
+    assert amenity.words_for(64) == 2
+
+
+def test_widen_keeps_bits():
+    bits = amenity.encode([[1, 63]])
+
+    widened = amenity.widen(bits, 3)
+
+    assert widened.shape == (1, 3)
+    assert AmenityBitset(widened).ids() == [[1, 63]]
+    assert amenity.widen(bits, 1) is bits
+
+
+@pytest.mark.parametrize("query", [[], [5], [3, 64], [0, 127, 200], [63, 128], [999], [5, 999]])
+def test_filters_match_set_operations(id_lists, query):
+    bitset = AmenityBitset(amenity.encode(id_lists))
+
+    assert bitset.has_all(query).tolist() == [set(query) <= set(ids) for ids in id_lists]
+    assert bitset.has_any(query).tolist() == [bool(set(query) & set(ids)) for ids in id_lists]
+    assert bitset.matched(query) == [sorted(set(query) & set(ids)) for ids in id_lists]
+
+
+def test_weights_sum_amenity_weights(id_lists):
+    weight_map = {0: 1.5, 5: 100, 64: 30, 200: 2.25, 999: 1000}
+    bitset = AmenityBitset(amenity.encode(id_lists))
+
+    expected = [sum(weight_map.get(env_id, 0) for env_id in ids) for ids in id_lists]
+
+    np.testing.assert_allclose(bitset.weights(weight_map), expected)
+
+
+def test_from_houses_reads_environment_ids():
+    houses = [{'environments': [{'id': 4}, {'id': 7}]}, {'environments': []}]
+
+    assert AmenityBitset.from_houses(houses).ids() == [[4, 7], []]
@@ -0,0 +1,60 @@
+"""
+The api service runs on its own from api/ and cannot import the app server, so api/function.py
+carries copies of the connection pool and of the logging classes. These tests fail as soon as
+a copy and its original drift apart.
+"""
+import ast
+import os
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+API_FUNCTION = os.path.join(ROOT, "api", "function.py")
+APP_DB_CONNECT = os.path.join(ROOT, "app", "server", "dependency", "db_connect.py")
+APP_LOG = os.path.join(ROOT, "app", "server", "utils", "log.py")
+
+# Tên trong app -> tên của bản sao trong api
+RENAMED = {"_QueueHandler": "LogQueueHandler", "_QueueListener": "LogQueueListener"}
+
+
+class _Normalize(ast.NodeTransformer):
+    """Apply the renames and drop the app's Prometheus metric updates, which the api copy leaves out"""
+
+    def visit_Name(self, node):
+        node.id = RENAMED.get(node.id, node.id)
+        return node
+
+    def visit_ClassDef(self, node):
+        node.name = RENAMED.get(node.name, node.name)
+        return self.generic_visit(node)
+
+    def visit_Expr(self, node):
+        if any(isinstance(child, ast.Name) and child.id.isupper() and child.id.endswith("_SECONDS")
+               for child in ast.walk(node)):
+            return None
+        return node
+
+
+def definitions(path):
+    with open(path, encoding="utf-8") as f:
+        tree = _Normalize().visit(ast.parse(f.read()))
+    found = {}
+    for node in tree.body:
+        if isinstance(node, ast.ClassDef):
+            found[node.name] = node
+        elif isinstance(node, ast.Assign) and isinstance(node.targets[0], ast.Name):
+            found[node.targets[0].id] = node
+    return {name: ast.dump(node) for name, node in found.items()}
+
+
+@pytest.mark.parametrize("original, name", [
+    (APP_DB_CONNECT, "DatabasePool"),
+    (APP_LOG, "JsonFormatter"),
+    (APP_LOG, "LogQueueHandler"),
+    (APP_LOG, "LogQueueListener"),
+    (APP_LOG, "TEXT_FORMAT"),
+    (APP_LOG, "_RECORD_ATTRS"),
+])
+def test_api_copy_matches_app(original, name):
+    assert definitions(API_FUNCTION)[name] == definitions(original)[name], \
+        f"{name} in api/function.py differs from {os.path.relpath(original, ROOT)}"
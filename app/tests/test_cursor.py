@@ -0,0 +1,41 @@
+import pytest
+
+from server.utils.cursor import decode_cursor, encode_cursor
+
+
+@pytest.mark.parametrize("position", [
+    {"order_by": "id", "id": 120},
+    {"order_by": "distance", "id": 87, "distance": 1.25},
+    {"order_by": "distance", "id": 87, "distance": None},
+    {"order_by": "relevance", "id": 5, "relevance": 0.0333},
+    {"order_by": "relevance", "id": 5, "relevance": 1},
+    {"id": 2 ** 40},
+])
+def test_round_trip(position):
+    cursor = encode_cursor(position)
+
+    assert "=" not in cursor and "/" not in cursor and "+" not in cursor
+    assert decode_cursor(cursor) == position
+
+
+@pytest.mark.parametrize("cursor", ["", "not a cursor", "!!!", encode_cursor([1, 2])[:-1]])
+def test_malformed_cursor(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+@pytest.mark.parametrize("position", [
+    [1, 2],
+    {"order_by": "id"},
+    {"order_by": "id", "id": "12"},
+    {"order_by": "distance", "id": 1, "distance": "far"},
+    {"order_by": "distance", "id": 1, "distance": float("inf")},
+    {"order_by": "relevance", "id": 1},
+    {"order_by": "relevance", "id": 1, "relevance": None},
+    {"order_by": "relevance", "id": 1, "relevance": "0.5"},
+    {"order_by": "relevance", "id": 1, "relevance": True},
+    {"order_by": "relevance", "id": 1, "relevance": float("nan")},
+])
+def test_invalid_position(position):
+    with pytest.raises(ValueError):
+        decode_cursor(encode_cursor(position))
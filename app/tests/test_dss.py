@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from server.logic.amenity import AmenityBitset
+from server.logic.geo import fill_missing_distances, haversine_km
+from server.logic.topsis import TOPSIS
+from server.model.models import CompareBatchRequest, CompareRequest
+from server.routers.dss import (CRITERIA_COLUMNS, CRITERIA_TYPES, _amenity_weight_map, _rank_houses,
+                                _rank_houses_batch, _topsis_weights)
+
+CATALOG = {env_id: {'id': env_id, 'category': 'room', 'value': f'Tiện ích {env_id}'} for env_id in (3, 4, 5, 7, 9)}
+
+
+def reference_rank(houses, request):
+    """The pandas pipeline the NumPy one replaced: DataFrame merge, TOPSIS, sort_values"""
+    houses_df = pd.DataFrame(houses)
+    amenity_bits = AmenityBitset.from_houses(houses)
+    dss_matrix = houses_df[['id']].copy()
+    dss_matrix['acreage_ratio'] = houses_df['acreage'] / houses_df['price']
+    dss_matrix['amenities_w'] = amenity_bits.weights(_amenity_weight_map(request))
+    dss_matrix['amenities_ratio'] = dss_matrix['amenities_w'] / houses_df['price']
+    dss_matrix['distance_to_prefer_location'] = fill_missing_distances(haversine_km(
+        houses_df['latitude'].to_numpy(dtype=float, na_value=np.nan),
+        houses_df['longitude'].to_numpy(dtype=float, na_value=np.nan), *request.prefer_location))
+    houses_df = pd.merge(houses_df, dss_matrix, on='id')
+
+    topsis = TOPSIS(houses_df[CRITERIA_COLUMNS].to_numpy(), _topsis_weights(request.topsis_weight), CRITERIA_TYPES)
+    houses_df['topsis_score'] = topsis.solve()
+    houses_df = houses_df.sort_values(by='topsis_score', ascending=False).reset_index(drop=True)
+    houses_df['rank'] = houses_df.index + 1
+    return houses_df, topsis.find_ideal_solutions_raw()
+
+
+@pytest.fixture
+def houses():
+    rng = np.random.default_rng(11)
+    rows = []
+    for house_id in range(1, 41):
+        env_ids = sorted(set(rng.choice(list(CATALOG), size=rng.integers(0, 4)).tolist()))
+        rows.append({
+            'id': house_id, 'price': float(rng.integers(15, 80)) / 10, 'acreage': float(rng.integers(12, 50)),
+            'latitude': 21.0 + rng.normal(0, 0.05), 'longitude': 105.85 + rng.normal(0, 0.05),
+            'title': f'Phòng {house_id}',
+            'environments': [dict(CATALOG[env_id], house_rent_id=house_id) for env_id in env_ids],
+        })
+    # tin không có tọa độ và các tin giống hệt nhau (cùng điểm: thứ tự hòa phải giữ như pandas)
+    rows[3].update(latitude=None, longitude=None)
+    for row in rows[10:14]:
+        row.update({key: value for key, value in rows[20].items() if key not in ('id', 'title', 'environments')},
+                   environments=[dict(env, house_rent_id=row['id']) for env in rows[20]['environments']])
+    return rows
+
+
+REQUESTS = [
+    {'amenities': [3, 4, 7], 'weights': [100, 50, 30], 'topsis_weight': [1, 1, 1, 1, 1, 1]},
+    {'amenities': [5], 'weights': None, 'topsis_weight': [3, 1, 0, 2, 0.5, 4]},
+    {'amenities': [], 'weights': [], 'topsis_weight': None},
+]
+
+
+@pytest.mark.parametrize("fields", REQUESTS)
+def test_rank_houses_matches_pandas_pipeline(houses, fields):
+    request = CompareRequest(house_rent_ids=[house['id'] for house in houses], prefer_location=[21.0285, 105.8542],
+                             **fields)
+    expected, (ideal_best, ideal_worst) = reference_rank(houses, request)
+
+    result = _rank_houses(houses, request)
+    ranked = result['ranked_houses']
+
+    assert [row['id'] for row in ranked] == expected['id'].tolist()
+    assert [row['rank'] for row in ranked] == list(range(1, len(houses) + 1))
+    # cùng thứ tự phép tính: giống từng bit, không chỉ xấp xỉ
+    for name in ('topsis_score', *CRITERIA_COLUMNS):
+        assert [row[name] for row in ranked] == expected[name].tolist(), name
+    # so sánh theo các trường của EnvironmentTag (house_rent_id không được trả ra)
+    requested = set(request.amenities)
+    assert [[(env['id'], env['category'], env['value']) for env in row['matched_amenities']] for row in ranked] == [
+        [(env['id'], env['category'], env['value']) for env in envs if env['id'] in requested]
+        for envs in expected['environments']]
+    assert result['ideal_best'] == dict(zip(CRITERIA_COLUMNS, ideal_best.tolist()))
+    assert result['ideal_worst'] == dict(zip(CRITERIA_COLUMNS, ideal_worst.tolist()))
+
+
+def test_rank_houses_does_not_modify_input_rows(houses):
+    request = CompareRequest(house_rent_ids=[1], amenities=[3], weights=[1], topsis_weight=None,
+                             prefer_location=[21.0285, 105.8542])
+    before = [dict(house) for house in houses]
+
+    _rank_houses(houses, request)
+
+    assert houses == before
+
+
+def test_batch_scenarios_match_single_compare(houses):
+    weights = [[1, 1, 1, 1, 1, 1], [5, 0, 1, 0, 1, 0], [0, 0, 0, 0, 0, 1]]
+    batch = _rank_houses_batch(houses, CompareBatchRequest(
+        house_rent_ids=[1], amenities=[3, 4], weights=[10, 20], topsis_weights=weights,
+        prefer_location=[21.0285, 105.8542]))
+
+    for scenario, topsis_weight in zip(batch['scenarios'], weights):
+        single = _rank_houses(houses, CompareRequest(
+            house_rent_ids=[1], amenities=[3, 4], weights=[10, 20], topsis_weight=topsis_weight,
+            prefer_location=[21.0285, 105.8542]))
+        scores = {row['id']: row['topsis_score'] for row in single['ranked_houses']}
+        assert scenario['scores'] == pytest.approx([scores[house_id] for house_id in scenario['ranked_ids']], abs=1e-12)
+        assert scenario['scores'] == sorted(scenario['scores'], reverse=True)
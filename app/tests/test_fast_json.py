@@ -0,0 +1,90 @@
+import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+import orjson
+import pytest
+from pydantic import BaseModel, TypeAdapter
+
+from server.model.models import (HouseSearchItem, HouseSearchPage, TopsisBatchResponse, TopsisCompareResponse,
+                                 TopsisRankResponse)
+from server.utils.fast_json import compile_serializer, dumps
+
+
+def house(house_id: int, **overrides) -> Dict:
+    """A listing row as HouseService / the snapshot return it (numpy scalars, extra keys)"""
+    row = {
+        'id': np.int64(house_id), 'available': True, 'published': datetime.date(2024, 5, 1),
+        'price': np.float64(3.5), 'acreage': 25, 'address': 'Số 1, Phường Dịch Vọng, Quận Cầu Giấy, Hà Nội',
+        'house_number': 'Số 1', 'street': None, 'ward_id': 11, 'latitude': 21.03, 'longitude': np.float32(105.79),
+        'title': 'Phòng khép kín', 'phone_number': '0912345678',
+        'create_time': datetime.datetime(2024, 5, 1, 8, 30), 'update_time': datetime.datetime(2024, 5, 2, 9, 0, 0, 1234),
+        'house_type': 'Phòng trọ', 'contract_period': None, 'bedrooms': np.int32(1), 'kitchens': 1,
+        'ward_name': 'Dịch Vọng', 'district_name': 'Cầu Giấy', 'province_name': 'Hà Nội',
+        'environments': [{'id': 3, 'category': 'room', 'value': 'Khép kín', 'house_rent_id': house_id}],
+        'district_id': 5, 'province_id': 1,
+    }
+    row.update(overrides)
+    return row
+
+
+def compare_result(house_id: int, rank: int) -> Dict:
+    return house(house_id, topsis_score=np.float64(0.75) / rank, rank=np.int64(rank), acreage_ratio=8.3,
+                 amenities_w=np.float64(100), amenities_ratio=0.5, distance_to_prefer_location=1.2,
+                 matched_amenities=[{'id': 3, 'category': 'room', 'value': 'Khép kín'}])
+
+
+def pydantic_json(annotation, content) -> bytes:
+    """What FastAPI's response_model produces: validate, then serialize in JSON mode"""
+    adapter = TypeAdapter(annotation)
+    return adapter.dump_json(adapter.validate_python(content))
+
+
+CASES = [
+    (List[HouseSearchItem], [house(1), house(2, distance_km=np.float64(0.25), relevance=0.1, environments=[]),
+                             house(3, latitude=None, longitude=None, bedrooms=None)]),
+    (HouseSearchPage, {'items': [house(4, acreage=np.int64(30))], 'next_cursor': 'eyJpZCI6NH0'}),
+    (HouseSearchPage, {'items': []}),
+    (TopsisCompareResponse, {'ranked_houses': [compare_result(7, 1), compare_result(8, 2)],
+                             'ideal_best': {'price': np.float64(3), 'acreage': 40},
+                             'ideal_worst': {'price': 9.5, 'acreage': np.int64(12)}}),
+    (TopsisBatchResponse, {'houses': [compare_result(7, 1)],
+                           'scenarios': [{'topsis_weight': [1, 0.5], 'ranked_ids': [np.int64(7)],
+                                          'scores': [np.float64(0.5), None]}],
+                           'ideal_best': {}, 'ideal_worst': {}}),
+    (TopsisRankResponse, {'ranked_houses': [compare_result(9, 1)], 'ideal_best': {'price': 1.5},
+                          'ideal_worst': {'price': 2.5}, 'total_candidates': np.int64(1200)}),
+]
+
+
+@pytest.mark.parametrize("annotation, content", CASES)
+def test_same_bytes_as_pydantic(annotation, content):
+    assert dumps(compile_serializer(annotation), content) == pydantic_json(annotation, content)
+
+
+def test_pydantic_instances_are_accepted():
+    item = HouseSearchItem.model_validate(house(9))
+
+    assert dumps(compile_serializer(HouseSearchItem), item) == pydantic_json(HouseSearchItem, item)
+
+
+def test_nan_in_optional_int_becomes_null():
+    # pandas đổi cột số nguyên có NULL thành float NaN
+    content = house(10, bedrooms=float('nan'), living_rooms=np.float64('nan'), kitchens=2.0)
+
+    result = orjson.loads(dumps(compile_serializer(HouseSearchItem), content))
+
+    assert (result['bedrooms'], result['living_rooms'], result['kitchens']) == (None, None, 2)
+
+
+def test_field_order_defaults_and_aliases():
+    class Model(BaseModel):
+        b: int
+        a: Optional[float] = None
+        tags: List[str] = []
+        nested: Dict[int, List[float]] = {}
+
+    content = {'a': np.float64(1), 'b': np.int64(2), 'nested': {1: [np.int64(3)]}, 'extra': object()}
+
+    assert dumps(compile_serializer(Model), content) == b'{"b":2,"a":1.0,"tags":[],"nested":{"1":[3.0]}}'
+    assert dumps(compile_serializer(Model), content) == pydantic_json(Model, {**content, 'extra': None})
@@ -0,0 +1,110 @@
+import numpy as np
+import pytest
+
+from server.logic.geo import EARTH_RADIUS_KM, GeoIndex, bounding_box, fill_missing_distances, haversine_km
+
+CENTER = (21.0285, 105.8542)
+
+
+@pytest.fixture
+def points():
+    rng = np.random.default_rng(42)
+    latitude = CENTER[0] + rng.normal(0, 0.15, 2000)
+    longitude = CENTER[1] + rng.normal(0, 0.15, 2000)
+    # tin không có tọa độ và vài điểm trùng nhau
+    latitude[::97] = np.nan
+    latitude[10:15], longitude[10:15] = latitude[20], longitude[20]
+    return latitude, longitude
+
+
+def brute_force_distances(points, latitude, longitude):
+    return haversine_km(points[0], points[1], latitude, longitude)
+
+
+def test_haversine_known_distance():
+    # Hà Nội - TP.HCM khoảng 1140 km theo đường chim bay
+    assert haversine_km(21.0285, 105.8542, 10.8231, 106.6297) == pytest.approx(1137, abs=5)
+    assert np.isnan(haversine_km(np.nan, 105.0, 21.0, 105.0))
+
+
+def destination(latitude, longitude, distance_km, bearings):
+    """Points at `distance_km` from the given point along each bearing (radians)"""
+    angle = distance_km / EARTH_RADIUS_KM
+    lat1, lon1 = np.radians(latitude), np.radians(longitude)
+    lat2 = np.arcsin(np.sin(lat1) * np.cos(angle) + np.cos(lat1) * np.sin(angle) * np.cos(bearings))
+    lon2 = lon1 + np.arctan2(np.sin(bearings) * np.sin(angle) * np.cos(lat1), np.cos(angle) - np.sin(lat1) * np.sin(lat2))
+    return np.degrees(lat2), np.degrees(lon2)
+
+
+@pytest.mark.parametrize("latitude", [0.0, CENTER[0], 60.0])
+@pytest.mark.parametrize("radius_km", [0.5, 5.0, 100.0, 1000.0])
+def test_bounding_box_contains_the_circle(latitude, radius_km):
+    min_lat, max_lat, min_lon, max_lon = bounding_box(latitude, CENTER[1], radius_km)
+    circle_lat, circle_lon = destination(latitude, CENTER[1], radius_km, np.linspace(0, 2 * np.pi, 20001))
+
+    # sai số làm tròn của chính phép tính điểm trên đường tròn
+    tolerance = 1e-9
+    assert min_lat - tolerance <= circle_lat.min() and circle_lat.max() <= max_lat + tolerance
+    assert min_lon - tolerance <= circle_lon.min() and circle_lon.max() <= max_lon + tolerance
+    # chặt: không rộng hơn đường tròn quá 1 mét
+    assert circle_lon.min() - min_lon < 1e-5 and max_lon - circle_lon.max() < 1e-5
+
+
+@pytest.mark.parametrize("radius_km", [0.1, 1.0, 3.5, 20.0, 500.0])
+@pytest.mark.parametrize("cell_km", [0.5, 2.0])
+def test_within_matches_brute_force(points, radius_km, cell_km):
+    index = GeoIndex(*points, cell_km=cell_km)
+    distances = brute_force_distances(points, *CENTER)
+    expected = np.flatnonzero(distances <= radius_km)
+
+    found, found_distances = index.within(*CENTER, radius_km)
+
+    np.testing.assert_array_equal(found, expected)
+    np.testing.assert_allclose(found_distances, distances[expected])
+
+
+def test_within_respects_mask(points):
+    mask = np.arange(len(points[0])) % 3 == 0
+    distances = brute_force_distances(points, *CENTER)
+
+    found, _ = GeoIndex(*points).within(*CENTER, 10, mask)
+
+    np.testing.assert_array_equal(found, np.flatnonzero((distances <= 10) & mask))
+
+
+@pytest.mark.parametrize("k", [1, 5, 50, 3000])
+def test_nearest_matches_brute_force(points, k):
+    distances = brute_force_distances(points, *CENTER)
+    candidates = np.flatnonzero(~np.isnan(distances))
+    # gần nhất trước, cùng khoảng cách thì theo chỉ số
+    expected = candidates[np.lexsort((candidates, distances[candidates]))][:k]
+
+    found, found_distances = GeoIndex(*points).nearest(*CENTER, k)
+
+    np.testing.assert_array_equal(found, expected)
+    np.testing.assert_allclose(found_distances, distances[expected])
+
+
+def test_nearest_with_mask_and_far_query(points):
+    mask = np.arange(len(points[0])) % 2 == 1
+    query = (16.0, 108.2)  # xa mọi điểm: bán kính tăng dần đến khi bao toàn bộ
+    distances = brute_force_distances(points, *query)
+    candidates = np.flatnonzero(~np.isnan(distances) & mask)
+    expected = candidates[np.lexsort((candidates, distances[candidates]))][:7]
+
+    found, _ = GeoIndex(*points).nearest(*query, 7, mask)
+
+    np.testing.assert_array_equal(found, expected)
+
+
+def test_empty_index():
+    index = GeoIndex(np.array([np.nan]), np.array([np.nan]))
+
+    assert len(index) == 0
+    assert len(index.within(*CENTER, 10)[0]) == 0
+    assert len(index.nearest(*CENTER, 3)[0]) == 0
+
+
+def test_fill_missing_distances():
+    np.testing.assert_array_equal(fill_missing_distances([1.0, np.nan, 3.0, np.inf]), [1, 3, 3, 3])
+    np.testing.assert_array_equal(fill_missing_distances([np.nan]), [0])
@@ -0,0 +1,196 @@
+import datetime
+from typing import Dict, List
+
+import numpy as np
+import pytest
+
+from server.logic.geo import haversine_km
+from server.logic.snapshot import HOUSE_COLUMNS, STRING_COLUMNS, ListingSnapshot, SnapshotState, StringColumn
+
+CATALOG = {env_id: {'id': env_id, 'category': 'room', 'value': f'Tiện ích {env_id}'} for env_id in (1, 3, 4, 5, 7, 70)}
+CENTER = (21.0285, 105.8542)
+HOUSE_TYPES = ['Phòng trọ', 'Chung cư mini', 'Nhà nguyên căn', None]
+
+
+def listing(rng, house_id: int) -> Dict:
+    """A row as LISTINGS_QUERY returns it"""
+    located = rng.random() > 0.1
+    ward_id = int(rng.integers(1, 6))
+    return {
+        'id': house_id, 'available': [True, True, True, False, None][rng.integers(5)],
+        'published': datetime.date(2024, 1, 1) + datetime.timedelta(days=int(rng.integers(300))),
+        'price': float(rng.integers(10, 100)) / 10, 'acreage': float(rng.integers(10, 60)),
+        'address': f'Số {house_id}, Phường {ward_id}', 'house_number': f'Số {house_id}',
+        'street': None if rng.random() < 0.3 else f'Đường {house_id % 7}', 'ward_id': ward_id,
+        'latitude': CENTER[0] + rng.normal(0, 0.05) if located else None,
+        'longitude': CENTER[1] + rng.normal(0, 0.05) if located else None,
+        'title': f'Phòng {house_id}', 'phone_number': '0912345678',
+        'create_time': datetime.datetime(2024, 1, 1, 8), 'update_time': datetime.datetime(2024, 2, 1, 8, 0, 0, house_id),
+        'house_type': HOUSE_TYPES[rng.integers(len(HOUSE_TYPES))], 'contract_period': '1 năm',
+        'bedrooms': None if rng.random() < 0.2 else int(rng.integers(1, 4)), 'living_rooms': None, 'kitchens': 1,
+        'ward_name': f'Phường {ward_id}', 'district_name': f'Quận {ward_id % 2}', 'province_name': 'Hà Nội',
+        'district_id': ward_id % 2, 'province_id': 1,
+        'version': datetime.datetime(2024, 2, 1, 8), 'version_links': 0,
+    }
+
+
+@pytest.fixture
+def data(request):
+    rng = np.random.default_rng(getattr(request, 'param', 3))
+    ids = np.sort(rng.choice(np.arange(1, 2000), size=300, replace=False)).tolist()
+    rows = [listing(rng, house_id) for house_id in ids]
+    # id 2 không có trong danh mục: bị bỏ qua như khi JOIN environment
+    environments = {house_id: sorted(set(rng.choice([1, 2, 3, 4, 5, 7, 70], size=rng.integers(0, 4)).tolist()))
+                    for house_id in ids}
+    return rows, environments
+
+
+def make_snapshot(rows: List[Dict], environments: Dict[int, List[int]]) -> ListingSnapshot:
+    strings = {name: StringColumn() for name in STRING_COLUMNS}
+    snapshot = ListingSnapshot()
+    snapshot._state = SnapshotState(ListingSnapshot._encode(rows, environments, strings, CATALOG), strings, CATALOG)
+    return snapshot
+
+
+def house(row: Dict, environments: Dict[int, List[int]], catalog: Dict = CATALOG) -> Dict:
+    """The row in the shape `HouseService` returns"""
+    result = {name: row[name] for name in HOUSE_COLUMNS}
+    # snapshot lưu available dạng bool: NULL thành False (dù sao cũng bị lọc như hr.available = true)
+    result['available'] = row['available'] is True
+    result['environments'] = [dict(catalog[env_id], house_rent_id=row['id'])
+                              for env_id in environments.get(row['id'], []) if env_id in catalog]
+    return result
+
+
+def brute_force(rows, environments, amenities=None, amenities_match='all', latitude=None, longitude=None,
+                radius_km=None, min_price=None, max_price=None, **equal) -> List[Dict]:
+    matches = []
+    for row in rows:
+        ids = set(environments.get(row['id'], []))
+        if row['available'] is not True:
+            continue
+        if any(row[name] != value for name, value in equal.items() if value is not None):
+            continue
+        if min_price is not None and row['price'] < min_price or max_price is not None and row['price'] > max_price:
+            continue
+        if amenities and not (set(amenities) <= ids if amenities_match == 'all' else set(amenities) & ids):
+            continue
+        if radius_km is not None and (row['latitude'] is None
+                                      or haversine_km(row['latitude'], row['longitude'], latitude, longitude) > radius_km):
+            continue
+        matches.append(row)
+    return matches
+
+
+def test_encode_round_trips_rows(data):
+    rows, environments = data
+    snapshot = make_snapshot(rows, environments)
+    state = snapshot._state
+
+    assert len(snapshot) == len(rows)
+    assert snapshot._rows(state, np.arange(len(rows))) == [house(row, environments) for row in rows]
+    assert state.columns['version_links'].tolist() == [0] * len(rows)
+
+
+def test_merge_upserts_and_keeps_id_order(data):
+    rows, environments = data
+    old, changed = rows[::2], rows[1::2] + [dict(row, title=f"{row['title']} (sửa)", price=1.0) for row in rows[:20:2]]
+    snapshot = make_snapshot(old, environments)
+    state = snapshot._state
+
+    strings = {name: column.copy() for name, column in state.strings.items()}
+    # danh mục mới có tiện ích id 130: bitset phải nới rộng thêm một word
+    catalog = {**CATALOG, 130: {'id': 130, 'category': 'room', 'value': 'Mới'}}
+    environments = {**environments, changed[0]['id']: [1, 130]}
+    delta = ListingSnapshot._encode(changed, environments, strings, catalog)
+    merged = SnapshotState(ListingSnapshot._merge(state.columns, delta), strings, catalog)
+
+    final = {row['id']: row for row in old + changed}
+    expected = [house(final[house_id], environments, catalog) for house_id in sorted(final)]
+    assert merged.columns['amenity_bits'].shape[1] == 3
+    assert ListingSnapshot._rows(merged, np.arange(len(expected))) == expected
+    # state cũ không đổi (copy-on-write), kể cả dictionary của cột chuỗi
+    assert snapshot._rows(state, np.arange(len(old))) == [house(row, environments) for row in old]
+    assert state.strings['title'].code_of(f"{rows[0]['title']} (sửa)") is None
+
+
+FILTERS = [
+    {},
+    {'ward_id': 3},
+    {'district_id': 1, 'bedrooms': 2},
+    {'min_price': 3.0, 'max_price': 6.5},
+    {'house_type': 'Chung cư mini'},
+    {'house_type': 'Không có'},
+    {'amenities': [3, 4]},
+    {'amenities': [3, 70], 'amenities_match': 'any'},
+    {'amenities': [99]},
+    {'latitude': CENTER[0], 'longitude': CENTER[1], 'radius_km': 4.0},
+    {'latitude': CENTER[0], 'longitude': CENTER[1], 'radius_km': 6.0, 'amenities': [1]},
+]
+
+
+@pytest.mark.parametrize("filters", FILTERS)
+def test_search_matches_brute_force(data, filters):
+    rows, environments = data
+    snapshot = make_snapshot(rows, environments)
+    expected = [house(row, environments) for row in brute_force(rows, environments, **filters)]
+
+    found = snapshot.search_house_rent(limit=len(rows), **filters)
+    for item in found:
+        item.pop('distance_km', None)
+
+    assert found == expected
+    assert [row[0] for row in snapshot.get_house_features({3: 10.0}, **filters)] == [row['id'] for row in expected]
+
+
+def test_keyset_and_offset_pages_match_brute_force(data):
+    rows, environments = data
+    snapshot = make_snapshot(rows, environments)
+    expected = [row['id'] for row in brute_force(rows, environments, ward_id=2)]
+
+    pages, after = [], None
+    while True:
+        page = snapshot.search_house_rent(ward_id=2, after=after, limit=7)
+        pages.extend(item['id'] for item in page)
+        if len(page) < 7:
+            break
+        after = {'id': page[-1]['id']}
+
+    assert pages == expected
+    assert [item['id'] for item in snapshot.search_house_rent(ward_id=2, offset=5, limit=4)] == expected[5:9]
+
+
+def test_distance_order_matches_brute_force(data):
+    rows, environments = data
+    snapshot = make_snapshot(rows, environments)
+    available = brute_force(rows, environments)
+    distance = {row['id']: haversine_km(row['latitude'], row['longitude'], *CENTER) if row['latitude'] is not None
+                else None for row in available}
+    # ORDER BY distance_km NULLS LAST, hr.id
+    expected = sorted(distance, key=lambda house_id: (distance[house_id] is None, distance[house_id] or 0, house_id))
+
+    location = {'latitude': CENTER[0], 'longitude': CENTER[1], 'order_by': 'distance'}
+    everything = snapshot.search_house_rent(limit=len(rows), **location)
+    pages, after = [], None
+    while True:
+        page = snapshot.search_house_rent(after=after, limit=9, **location)
+        pages.extend(item['id'] for item in page)
+        if len(page) < 9:
+            break
+        after = {'id': page[-1]['id'], 'distance': page[-1]['distance_km']}
+
+    assert [item['id'] for item in everything] == expected
+    assert pages == expected
+    assert [item['distance_km'] for item in everything] == pytest.approx(
+        [distance[house_id] for house_id in expected], nan_ok=True)
+
+
+def test_id_lookups(data):
+    rows, environments = data
+    snapshot = make_snapshot(rows, environments)
+    wanted = [rows[5]['id'], rows[0]['id'], 10 ** 6, rows[5]['id'], rows[-1]['id']]
+    expected = [row for row in rows if row['id'] in wanted and row['available'] is True]
+
+    assert snapshot.get_multiple_houses_by_ids(wanted) == [house(row, environments) for row in expected]
+    assert snapshot.get_house_versions(wanted) == {row['id']: (row['version'], 0) for row in expected}
+    assert snapshot.get_multiple_houses_by_ids([]) == []
@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+
+from server.logic.topsis import TOPSIS
+
+CRITERIA_TYPES = ['cost', 'benefit', 'benefit', 'benefit', 'benefit', 'cost']
+
+
+def reference_scores(decision_matrix, weights, criteria_types):
+    """TOPSIS as the loop implementation before vectorization computed it"""
+    matrix = np.array(decision_matrix, dtype=float)
+    sum_squared = np.sum(matrix ** 2, axis=0)
+    sum_squared[sum_squared == 0] = 1
+    weighted = matrix / np.sqrt(sum_squared) * np.array(weights)
+
+    ideal_best, ideal_worst = [], []
+    for j, criterion_type in enumerate(criteria_types):
+        column = weighted[:, j]
+        best, worst = (np.max(column), np.min(column)) if criterion_type == 'benefit' else (np.min(column), np.max(column))
+        ideal_best.append(best)
+        ideal_worst.append(worst)
+
+    scores = np.zeros(len(matrix))
+    for i in range(len(matrix)):
+        distance_best = np.sqrt(np.sum((weighted[i] - ideal_best) ** 2))
+        distance_worst = np.sqrt(np.sum((weighted[i] - ideal_worst) ** 2))
+        total = distance_best + distance_worst
+        scores[i] = 0.5 if total == 0 else distance_worst / total
+    return scores
+
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(20240601)
+
+
+def random_matrix(rng, m):
+    matrix = rng.uniform(1, 100, size=(m, len(CRITERIA_TYPES)))
+    matrix[:, 3] = rng.integers(0, 3, size=m)  # cột toàn 0 hoặc nhiều giá trị trùng
+    return matrix
+
+
+def test_single_weights_match_reference(rng):
+    matrix = random_matrix(rng, 40)
+    weights = rng.uniform(0, 1, len(CRITERIA_TYPES))
+
+    scores = TOPSIS(matrix, weights, CRITERIA_TYPES).solve()
+
+    np.testing.assert_allclose(scores, reference_scores(matrix, weights, CRITERIA_TYPES), rtol=0, atol=1e-12)
+
+
+def test_batch_matches_one_solve_per_scenario(rng):
+    matrix = random_matrix(rng, 25)
+    weights = rng.uniform(0, 1, size=(7, len(CRITERIA_TYPES)))
+
+    scores = TOPSIS(matrix, weights, CRITERIA_TYPES).solve()
+
+    assert scores.shape == (7, 25)
+    for k, scenario in enumerate(weights):
+        np.testing.assert_allclose(scores[k], reference_scores(matrix, scenario, CRITERIA_TYPES), rtol=0, atol=1e-12)
+
+
+def test_blocked_batch_matches_unblocked(rng, monkeypatch):
+    matrix = random_matrix(rng, 30)
+    weights = rng.uniform(0, 1, size=(11, len(CRITERIA_TYPES)))
+    unblocked = TOPSIS(matrix, weights, CRITERIA_TYPES).solve()
+
+    # 2 kịch bản mỗi khối: 11 kịch bản thành 6 khối, khối cuối thiếu
+    monkeypatch.setattr(TOPSIS, "MAX_BLOCK_ELEMENTS", 2 * matrix.size)
+    blocked = TOPSIS(matrix, weights, CRITERIA_TYPES).solve()
+
+    np.testing.assert_array_equal(blocked, unblocked)
+
+
+def test_identical_alternatives_score_one_half():
+    matrix = np.tile([10.0, 20, 1, 2, 0.5, 3], (4, 1))
+
+    scores = TOPSIS(matrix, np.ones(len(CRITERIA_TYPES)), CRITERIA_TYPES).solve()
+
+    np.testing.assert_array_equal(scores, np.full(4, 0.5))
+
+
+def test_ideal_solutions_raw_follow_criteria_types():
+    matrix = np.array([[100.0, 20, 1, 2, 3, 5], [80, 30, 2, 1, 4, 1]])
+
+    ideal_best, ideal_worst = TOPSIS(matrix, np.ones(6), CRITERIA_TYPES).find_ideal_solutions_raw()
+
+    np.testing.assert_array_equal(ideal_best, [80, 30, 2, 2, 4, 1])
+    np.testing.assert_array_equal(ideal_worst, [100, 20, 1, 1, 3, 5])
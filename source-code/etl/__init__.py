@@ -0,0 +1,4 @@
+"""
+Command-line ETL for the scraped listings (`data/raw/*.csv`) into `house_rent` and
+`house_rent_environment`; run `python -m etl` from `source-code/`.
+"""
@@ -0,0 +1,110 @@
+"""
+Load the scraped listings into the database, one worker process per file.
+
+    cd source-code && python -m etl                        # ../data/raw/*.csv
+    python -m etl ../data/raw/hn.csv --chunk-size 20000 --workers 2
+
+The database is read from POSTGRES_HOST / POSTGRES_PORT / POSTGRES_DB / POSTGRES_USER /
+POSTGRES_PASSWORD. Running it again on the same files changes nothing. Coordinates come
+from the geocode cache (`etl.geocode`), filled from the local gazetteer by default.
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List
+
+import pandas as pd
+
+from .amenities import RULES_PATH, default_tagger
+from .geocode import CACHE_PATH, GAZETTEER_PATH, GEOCODERS, GeocodeCache, make_geocoder
+from .load import connect, load_chunk, sync_link_sequence
+from .transform import parse_listings
+
+RAW_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "data", "raw")
+
+COUNTERS = ["read", "skipped", "inserted", "updated", "unchanged", "geocoded", "links_added", "links_removed",
+            "geocoder_requests"]
+
+
+def load_file(path: str, chunk_size: int, amenity_rules: str, geocoder: str, gazetteer: str,
+              cache_path: str) -> Dict[str, float]:
+    """Stream one CSV file into the database chunk by chunk"""
+    started = time.perf_counter()
+    totals = dict.fromkeys(COUNTERS, 0)
+    conn = connect()
+    tagger = default_tagger(amenity_rules)
+    cache = GeocodeCache(cache_path, make_geocoder(geocoder, gazetteer))
+    try:
+        first_row = 0
+        for chunk in pd.read_csv(path, chunksize=chunk_size, dtype=str, keep_default_na=False):
+            houses, links, skipped = parse_listings(chunk, first_row, tagger)
+            counts = load_chunk(conn, houses, links, cache)
+            first_row += len(chunk)
+            totals["read"] += len(chunk)
+            totals["skipped"] += skipped + counts.pop("skipped")
+            for name, value in counts.items():
+                totals[name] += value
+    finally:
+        conn.close()
+        cache.close()
+    totals["geocoder_requests"] = cache.requests
+    totals["seconds"] = time.perf_counter() - started
+    return totals
+
+
+def _report(name: str, totals: Dict[str, float]) -> None:
+    rate = totals["read"] / totals["seconds"] if totals["seconds"] else 0.0
+    counts = " ".join(f"{counter}={totals[counter]}" for counter in COUNTERS)
+    print(f"{name:<12} {counts} seconds={totals['seconds']:.2f} rows/sec={rate:,.0f}", flush=True)
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m etl", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="*", help=f"CSV files (default: {RAW_DIR}/*.csv)")
+    parser.add_argument("--chunk-size", type=int, default=50_000, help="rows parsed and loaded per transaction")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per file)")
+    parser.add_argument("--amenity-rules", default=RULES_PATH, help="CSV of environment_id, keyword rules")
+    parser.add_argument("--geocoder", choices=[*GEOCODERS, "none"], default="gazetteer",
+                        help="backend asked for places missing from the geocode cache")
+    parser.add_argument("--gazetteer", default=GAZETTEER_PATH, help="CSV used by the gazetteer geocoder")
+    parser.add_argument("--geocode-cache", default=CACHE_PATH, help="SQLite geocode cache file")
+    args = parser.parse_args(argv)
+
+    files = args.files or sorted(glob.glob(os.path.join(RAW_DIR, "*.csv")))
+    if not files:
+        parser.error(f"no CSV files in {RAW_DIR}")
+
+    conn = connect()
+    try:
+        sync_link_sequence(conn)
+    finally:
+        conn.close()
+
+    started = time.perf_counter()
+    total = dict.fromkeys(COUNTERS, 0)
+    failed = False
+    with ProcessPoolExecutor(max_workers=args.workers or len(files)) as pool:
+        futures = {pool.submit(load_file, path, args.chunk_size, args.amenity_rules, args.geocoder,
+                               args.gazetteer, args.geocode_cache): path for path in files}
+        for future in as_completed(futures):
+            name = os.path.basename(futures[future])
+            try:
+                totals = future.result()
+            except Exception as e:
+                print(f"{name:<12} failed: {e}", file=sys.stderr, flush=True)
+                failed = True
+                continue
+            _report(name, totals)
+            for counter in COUNTERS:
+                total[counter] += totals[counter]
+    total["seconds"] = time.perf_counter() - started
+    _report("total", total)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
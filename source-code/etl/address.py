@@ -0,0 +1,232 @@
+"""
+Addresses: splitting "..., Phường X, Quận Y, Hà Nội" into parts and resolving the parts to
+province / district / ward ids, replacing the notebook's `process_address` and its per-city
+name lists.
+
+Names are compared by key (`place_key`: accent-normalized, "TP." / "Q." / "P."-style prefixes
+removed, leading zeros dropped, falling back to the unaccented spelling). `AddressResolver`
+holds key -> id dictionaries built from the provinces / districts / wards tables and
+`data/locations/provinces.csv` (province names and abbreviations), so resolving a place is
+a few dictionary lookups and a chunk only resolves its distinct places.
+"""
+import csv
+import hashlib
+import os
+import re
+import unicodedata
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .text import fold_accents, normalize_accents
+
+PROVINCES_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "data",
+                              "locations", "provinces.csv")
+
+# Cột địa danh mà split_address trả về cho mỗi tin
+PLACE_COLUMNS = ["province_key", "district", "district_key", "district_has_prefix", "ward", "ward_key"]
+
+# Tiền tố hành chính (đầy đủ hoặc viết tắt), nhóm cho biết cấp
+_PREFIX = re.compile(r"^(?:(?P<province>TỈNH)"
+                     r"|(?P<district>QUẬN|HUYỆN|THỊ XÃ|THÀNH PHỐ|TX\.|TP\.?|Q\.|Q(?=\s*\d)|H\.)"
+                     r"|(?P<ward>PHƯỜNG|XÃ|THỊ TRẤN|TT\.|P\.|P(?=\s*\d)|X\.))\s*")
+_ADDRESS = r"(?s)^(?P<rest>.*),(?P<ward>[^,]*),(?P<district>[^,]*),(?P<province>[^,]*)$"
+
+
+def place_key(name: str) -> Tuple[str, Optional[str]]:
+    """(key, level of its prefix: "province" / "district" / "ward" / None) of a location name"""
+    name = normalize_accents(name)
+    match = _PREFIX.match(name)
+    if match:
+        name = name[match.end():]
+    name = name.strip(" .")
+    if name.isdigit():
+        name = name.lstrip("0") or "0"
+    return name, match.lastgroup if match else None
+
+
+def _keys(names: pd.Series) -> Tuple[pd.Series, pd.Series]:
+    """`place_key` of a column, computed once per distinct name"""
+    keys = {name: place_key(name) for name in names.dropna().unique()}
+    return names.map(lambda name: keys[name][0] if name in keys else np.nan), \
+        names.map(lambda name: keys[name][1] if name in keys else None)
+
+
+def split_address(address: pd.Series) -> pd.DataFrame:
+    """
+    `PLACE_COLUMNS` plus house_number / street of each address.
+
+    `district` / `ward` are the names as the notebook cut them (their hash is the id of the
+    locations it created); the keys are what the resolver compares. Addresses with fewer
+    than four parts or without a ward (PHƯỜNG / XÃ / THỊ TRẤN / P.) get a NaN province_key.
+    """
+    # Không chuẩn hóa Unicode tên được lưu lại (notebook cũng không), chỉ khóa để so sánh
+    upper = address.fillna("").str.upper()
+    parts = upper.str.extract(_ADDRESS)
+    # Như notebook: mỗi phần được strip, phần số nhà/đường nối lại bằng ", "
+    rest = parts["rest"].str.replace(r"\s*,\s*", ", ", regex=True).str.strip()
+    ward = parts["ward"].str.strip()
+    district = parts["district"].str.strip()
+
+    province_key, _ = _keys(parts["province"])
+    district_key, district_level = _keys(district)
+    ward_key, ward_level = _keys(ward)
+
+    is_ward = ((ward_level == "ward") | ward.str.contains("PHƯỜNG|XÃ|THỊ TRẤN", na=False)) \
+        & ~ward.str.contains("PHÒNG|NHÀ|TỔ|NGÁCH", na=False)
+    district = district.str.replace("QUẬN", "").str.replace("HUYỆN", "").str.replace("THỊ XÃ", "").str.lstrip()
+    ward = ward.str.replace("PHƯỜNG", "").str.replace("XÃ", "").str.replace("THỊ TRẤN", "").str.lstrip()
+    valid = rest.notna() & is_ward & (district_key.fillna("") != "") & (ward_key.fillna("") != "")
+
+    # Số nhà / đường theo đúng các nhánh của notebook (chuỗi chỉ có số: cả chuỗi là số nhà)
+    rest = rest.fillna("")
+    duong = rest.str.partition("ĐƯỜNG")
+    comma = rest.str.rpartition(",")
+    conditions = [rest.str.contains("ĐƯỜNG", regex=False).to_numpy(), rest.str.contains(",", regex=False).to_numpy(),
+                  rest.str.contains(r"\d").to_numpy()]
+    house_number = np.select(conditions, [duong[0].str.rstrip(), comma[0].str.rstrip(), rest], default="")
+    street = np.select(conditions, [duong[2].str.lstrip(), comma[2].str.lstrip(), ""], default=rest)
+
+    return pd.DataFrame({
+        "province_key": province_key.where(valid),
+        "district": district,
+        "district_key": district_key,
+        "district_has_prefix": (district_level == "district").to_numpy(),
+        "ward": ward,
+        "ward_key": ward_key,
+        "house_number": house_number,
+        "street": street,
+    }, index=address.index)
+
+
+def str_to_8digit_hash(s: str) -> int:
+    """Id of a location name, as the notebook computed it"""
+    ns = unicodedata.normalize("NFC", s)
+    h = hashlib.sha256(ns.encode("utf-8")).digest()
+    return int.from_bytes(h, "big") % 10 ** 8
+
+
+@lru_cache(maxsize=None)
+def load_provinces(path: str = PROVINCES_PATH) -> Tuple[Tuple[str, Tuple[str, ...]], ...]:
+    """(name, aliases) of every province, from a CSV file"""
+    with open(path, encoding="utf-8", newline="") as f:
+        return tuple((row["name"], tuple(alias for alias in row["aliases"].split("|") if alias))
+                     for row in csv.DictReader(f))
+
+
+class _Index:
+    """Key -> id within a scope, with an unaccented fallback used only when unambiguous"""
+
+    def __init__(self):
+        self.exact: Dict[Tuple[int, str], int] = {}
+        self.folded: Dict[Tuple[int, str], Optional[int]] = {}
+
+    def add(self, scope: int, key: str, id_: int) -> None:
+        self.exact.setdefault((scope, key), id_)
+        folded = (scope, fold_accents(key))
+        self.folded[folded] = id_ if self.folded.get(folded, id_) == id_ else None
+
+    def get(self, scope: int, key: str) -> Optional[int]:
+        found = self.exact.get((scope, key))
+        return found if found is not None else self.folded.get((scope, fold_accents(key)))
+
+
+@dataclass
+class AddressResolver:
+    """
+    Province, district and ward ids by key.
+
+    Locations created by the notebook have the hash of their name as id (wards are matched
+    by that id even under another district of the province, as the notebook did); new ones
+    are created with the hash of their full path, so same-named wards of different
+    districts stay apart.
+    """
+    provinces: _Index = field(default_factory=_Index)  # scope 0
+    districts: _Index = field(default_factory=_Index)  # scope province_id
+    wards: _Index = field(default_factory=_Index)  # scope district_id
+    province_names: Dict[int, str] = field(default_factory=dict)
+    stored_provinces: Set[int] = field(default_factory=set)
+    district_rows: Dict[int, Tuple[int, str]] = field(default_factory=dict)  # id -> (province_id, name)
+    ward_rows: Dict[int, Tuple[int, int, str]] = field(default_factory=dict)  # id -> (district_id, province_id, name)
+
+    @classmethod
+    def load(cls, cur, provinces_path: str = PROVINCES_PATH) -> "AddressResolver":
+        resolver = cls()
+        cur.execute("SELECT id, name FROM public.provinces")
+        for province_id, name in cur.fetchall():
+            resolver._add_province(province_id, name, ())
+            resolver.stored_provinces.add(province_id)
+        for name, aliases in load_provinces(provinces_path):
+            resolver._add_province(str_to_8digit_hash(name), name, aliases)
+        cur.execute("SELECT id, province_id, name FROM public.districts")
+        for district_id, province_id, name in cur.fetchall():
+            resolver._add_district(district_id, province_id, name)
+        cur.execute("SELECT w.id, w.district_id, d.province_id, w.name FROM public.wards w "
+                    "JOIN public.districts d ON w.district_id = d.id")
+        for ward_id, district_id, province_id, name in cur.fetchall():
+            resolver._add_ward(ward_id, district_id, province_id, name)
+        return resolver
+
+    def _add_province(self, province_id: int, name: str, aliases: Tuple[str, ...]) -> None:
+        key = place_key(name)[0]
+        existing = self.provinces.get(0, key)
+        if existing is not None:
+            province_id = existing  # tỉnh đã có trong bảng giữ id của bảng
+        self.province_names.setdefault(province_id, name)
+        for alias in (name, *aliases):
+            self.provinces.add(0, place_key(alias)[0], province_id)
+
+    def _add_district(self, district_id: int, province_id: int, name: str) -> None:
+        self.district_rows[district_id] = (province_id, name)
+        self.districts.add(province_id, place_key(name)[0], district_id)
+
+    def _add_ward(self, ward_id: int, district_id: int, province_id: int, name: str) -> None:
+        self.ward_rows[ward_id] = (district_id, province_id, name)
+        self.wards.add(district_id, place_key(name)[0], ward_id)
+
+    def ward_id(self, cur, province_key: str, district: str, district_key: str, district_has_prefix: bool,
+                ward: str, ward_key: str) -> Optional[int]:
+        """Ward id of one place, creating missing locations; None for an unknown province or unprefixed district"""
+        province_id = self.provinces.get(0, province_key)
+        if province_id is None:
+            return None
+        province = self.province_names[province_id]
+        if province_id not in self.stored_provinces:
+            cur.execute("INSERT INTO public.provinces (id, name) VALUES (%s, %s) ON CONFLICT (id) DO NOTHING",
+                        (province_id, province))
+            self.stored_provinces.add(province_id)
+
+        district_id = str_to_8digit_hash(district)
+        if self.district_rows.get(district_id, (None,))[0] != province_id:
+            district_id = self.districts.get(province_id, district_key)
+            if district_id is None:
+                if not district_has_prefix:
+                    return None
+                district_id = str_to_8digit_hash(f"{province}|{district_key}")
+                cur.execute("INSERT INTO public.districts (id, province_id, name) VALUES (%s, %s, %s) "
+                            "ON CONFLICT (id) DO NOTHING", (district_id, province_id, district_key))
+                self._add_district(district_id, province_id, district_key)
+
+        ward_id = str_to_8digit_hash(ward)
+        if self.ward_rows.get(ward_id, (None,))[0] != district_id:
+            by_key = self.wards.get(district_id, ward_key)
+            if by_key is not None:
+                ward_id = by_key
+            elif self.ward_rows.get(ward_id, (None, None))[1] != province_id:
+                ward_id = str_to_8digit_hash(f"{province}|{self.district_rows[district_id][1]}|{ward_key}")
+                cur.execute("INSERT INTO public.wards (id, district_id, name) VALUES (%s, %s, %s) "
+                            "ON CONFLICT (id) DO NOTHING", (ward_id, district_id, ward_key))
+                self._add_ward(ward_id, district_id, province_id, ward_key)
+        return ward_id
+
+    def place(self, ward_id: int) -> Tuple[str, str, str]:
+        """(province, district, ward) names of a ward"""
+        district_id, province_id, ward = self.ward_rows[ward_id]
+        return self.province_names[province_id], self.district_rows[district_id][1], ward
+
+    def resolve(self, cur, places: pd.DataFrame) -> List[Optional[int]]:
+        """Ward ids of distinct places (rows of `PLACE_COLUMNS`)"""
+        return [self.ward_id(cur, *place) for place in places[PLACE_COLUMNS].itertuples(index=False)]
@@ -0,0 +1,88 @@
+"""
+Amenity tagging of listing titles, replacing the notebook's chain of `'KHÉP KÍN' in title`
+checks.
+
+The rules (`data/amenities/rules.csv`: environment_id, keyword) are compiled into one regex
+(keywords factored as a trie) that reports every keyword occurrence, overlapping ones
+included ("VỆ SINH KHÉP KÍN" tags both 19 and 3), so a title is scanned once whatever the
+number of keywords. Titles and keywords are compared after `normalize_accents`; unaccented
+spellings are separate rules.
+"""
+import csv
+import os
+import re
+from collections import defaultdict
+from functools import lru_cache
+from typing import Dict, Iterable, List
+
+import pandas as pd
+
+from .text import normalize_accents, normalize_accents_column
+
+RULES_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "data",
+                          "amenities", "rules.csv")
+
+
+def _trie_pattern(keywords: Iterable[str]) -> str:
+    """Regex matching the longest of `keywords` at a position, with shared prefixes factored out"""
+    trie: dict = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: dict) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        pattern = branches[0] if len(branches) == 1 and "" not in node else f"(?:{'|'.join(branches)})"
+        return pattern + "?" if "" in node else pattern
+
+    return build(trie)
+
+
+def load_rules(path: str = RULES_PATH) -> Dict[int, List[str]]:
+    """environment_id -> keywords, from a CSV file"""
+    rules = defaultdict(list)
+    with open(path, encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            rules[int(row["environment_id"])].append(row["keyword"])
+    return dict(rules)
+
+
+class AmenityTagger:
+    def __init__(self, rules: Dict[int, Iterable[str]]):
+        ids = defaultdict(set)
+        for environment_id, keywords in rules.items():
+            for keyword in keywords:
+                keyword = normalize_accents(keyword)
+                if keyword:
+                    ids[keyword].add(environment_id)
+        if not ids:
+            raise ValueError("no amenity keywords")
+        # Tại mỗi vị trí regex chỉ trả về từ khóa dài nhất, nên từ khóa kéo theo id của các tiền tố của nó
+        self.ids = {keyword: sorted({i for prefix, prefix_ids in ids.items() if keyword.startswith(prefix)
+                                     for i in prefix_ids})
+                    for keyword in ids}
+        self.pattern = re.compile(f"(?=({_trie_pattern(ids)}))")
+
+    @classmethod
+    def from_file(cls, path: str = RULES_PATH) -> "AmenityTagger":
+        return cls(load_rules(path))
+
+    def tag_one(self, title: str) -> List[int]:
+        """Environment ids of one title"""
+        return sorted({i for keyword in self.pattern.findall(normalize_accents(title)) for i in self.ids[keyword]})
+
+    def tag(self, titles: pd.Series) -> pd.DataFrame:
+        """(row, environment_id) pairs for a column of titles; `row` is the title's index label"""
+        matches = normalize_accents_column(titles).str.findall(self.pattern).explode().dropna()
+        environment_ids = matches.map(self.ids).explode()
+        links = pd.DataFrame({"row": environment_ids.index, "environment_id": environment_ids.to_numpy()})
+        return links.drop_duplicates().astype({"environment_id": "int64"}).reset_index(drop=True)
+
+
+@lru_cache(maxsize=None)
+def default_tagger(path: str = RULES_PATH) -> AmenityTagger:
+    return AmenityTagger.from_file(path)
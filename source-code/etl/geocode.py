@@ -0,0 +1,231 @@
+"""
+Ward geocoding with a persistent on-disk cache, replacing the notebook's `process_itude`
+(one Nominatim call per ward, results in the unkeyed `itude` table).
+
+A place is (province, district, ward). Lookups go ward -> district -> province, as the
+notebook's fallbacks did, and every answer (including "not found") is cached in an SQLite
+file by the normalized place, so no place is geocoded twice. The backend is pluggable:
+`gazetteer` reads a local CSV (`data/geocode/gazetteer.csv` holds approximate district
+centroids of the cities we load, so builds need no network), `nominatim` asks the online
+service through geopy.
+
+    cd source-code && python -m etl.geocode          # fill listings without coordinates
+    python -m etl.geocode --geocoder nominatim --cache /tmp/geocode.sqlite3
+"""
+import argparse
+import csv
+import os
+import sqlite3
+import sys
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .address import place_key as location_key
+
+Place = Tuple[str, str, str]
+Coordinates = Optional[Tuple[float, float]]
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "data",
+                        "geocode")
+GAZETTEER_PATH = os.path.join(DATA_DIR, "gazetteer.csv")
+CACHE_PATH = os.path.join(DATA_DIR, "cache.sqlite3")
+
+def place_key(place: Place) -> str:
+    return "|".join(location_key(part)[0] for part in place)
+
+
+class GazetteerGeocoder:
+    """Coordinates from a CSV file with columns province, district, ward, latitude, longitude"""
+    name = "gazetteer"
+
+    def __init__(self, path: str = GAZETTEER_PATH):
+        self.path = path
+        self.places: Dict[str, Tuple[float, float]] = {}
+        with open(path, encoding="utf-8", newline="") as f:
+            for row in csv.DictReader(f):
+                place = (row["province"], row["district"], row["ward"])
+                self.places[place_key(place)] = (float(row["latitude"]), float(row["longitude"]))
+
+    def geocode(self, places: List[Place]) -> Dict[Place, Coordinates]:
+        return {place: self.places.get(place_key(place)) for place in places}
+
+
+class NominatimGeocoder:
+    """OpenStreetMap Nominatim through geopy, at most one request per `min_delay` seconds"""
+    name = "nominatim"
+
+    def __init__(self, user_agent: str = "dss-etl", min_delay: float = 1.0):
+        try:
+            from geopy.geocoders import Nominatim
+        except ImportError:
+            raise RuntimeError("the nominatim geocoder needs geopy (pip install geopy)")
+        self.geolocator = Nominatim(user_agent=user_agent)
+        self.min_delay = min_delay
+        self._last_request = 0.0
+
+    def geocode(self, places: List[Place]) -> Dict[Place, Coordinates]:
+        result = {}
+        for place in places:
+            time.sleep(max(0.0, self._last_request + self.min_delay - time.monotonic()))
+            self._last_request = time.monotonic()
+            location = self.geolocator.geocode(", ".join(part for part in place[::-1] if part))
+            result[place] = (location.latitude, location.longitude) if location else None
+        return result
+
+
+GEOCODERS = {"gazetteer": GazetteerGeocoder, "nominatim": NominatimGeocoder}
+
+
+def make_geocoder(name: Optional[str], gazetteer: str = GAZETTEER_PATH):
+    """Backend by name; None (or "none") answers from the cache only"""
+    if name in (None, "none"):
+        return None
+    if name == "gazetteer":
+        return GazetteerGeocoder(gazetteer)
+    return GEOCODERS[name]()
+
+
+class GeocodeCache:
+    """
+    Cached batch geocoding.
+
+    Misses are cached too, per backend: a place the gazetteer does not know is still
+    tried once by Nominatim. Concurrent processes share the file; a place missing from
+    the cache is geocoded inside a write transaction, so only one of them asks the backend.
+    """
+
+    def __init__(self, path: str = CACHE_PATH, backend=None):
+        self.path = path
+        self.backend = backend
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=600, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS geocode (
+                key         TEXT PRIMARY KEY,
+                latitude    REAL,
+                longitude   REAL,
+                source      TEXT NOT NULL,
+                geocoded_at REAL NOT NULL
+            )
+        """)
+        self.requests = 0
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def _cached(self, keys: List[str]) -> Dict[str, Tuple[Optional[float], Optional[float], str]]:
+        found = {}
+        for i in range(0, len(keys), 500):
+            batch = keys[i:i + 500]
+            rows = self.conn.execute(
+                f"SELECT key, latitude, longitude, source FROM geocode WHERE key IN ({','.join('?' * len(batch))})",
+                batch)
+            found.update((key, (lat, lon, source)) for key, lat, lon, source in rows)
+        return found
+
+    def _final(self, entry) -> bool:
+        # Miss của backend khác thì hỏi lại backend hiện tại (một lần)
+        return entry is not None and (entry[0] is not None or self.backend is None or entry[2] == self.backend.name)
+
+    def _resolve(self, places: Dict[str, Place]) -> Dict[str, Coordinates]:
+        cached = self._cached(list(places))
+        missing = [key for key in places if not self._final(cached.get(key))]
+        if missing and self.backend is not None:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                cached.update(self._cached(missing))
+                missing = [key for key in missing if not self._final(cached.get(key))]
+                answers = self.backend.geocode([places[key] for key in missing])
+                self.requests += len(missing)
+                now = time.time()
+                rows = []
+                for key in missing:
+                    coordinates = answers.get(places[key])
+                    lat, lon = coordinates if coordinates else (None, None)
+                    cached[key] = (lat, lon, self.backend.name)
+                    rows.append((key, lat, lon, self.backend.name, now))
+                self.conn.executemany("INSERT OR REPLACE INTO geocode VALUES (?, ?, ?, ?, ?)", rows)
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+        return {key: (entry[0], entry[1]) if entry and entry[0] is not None else None
+                for key, entry in ((key, cached.get(key)) for key in places)}
+
+    def lookup(self, places: Iterable[Place]) -> Dict[Place, Coordinates]:
+        """Coordinates of each place: its ward, else its district, else its province (None if none is known)"""
+        result: Dict[Place, Coordinates] = {}
+        pending = list(dict.fromkeys(places))
+        for level in (3, 2, 1):
+            queries = {}
+            for place in pending:
+                query = tuple(place[:level]) + ("",) * (3 - level)
+                queries.setdefault(place_key(query), query)
+            answers = self._resolve(queries)
+            still_pending = []
+            for place in pending:
+                coordinates = answers[place_key(tuple(place[:level]) + ("",) * (3 - level))]
+                if coordinates is None:
+                    still_pending.append(place)
+                else:
+                    result[place] = coordinates
+            pending = still_pending
+        result.update(dict.fromkeys(pending))
+        return result
+
+
+def backfill(conn, cache: GeocodeCache) -> int:
+    """Give listings without coordinates those of their ward (one bulk UPDATE); returns the row count"""
+    from psycopg2.extras import execute_values
+
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT DISTINCT w.id, p.name, d.name, w.name
+            FROM public.house_rent hr
+            JOIN public.wards w ON w.id = hr.ward_id
+            JOIN public.districts d ON d.id = w.district_id
+            JOIN public.provinces p ON p.id = d.province_id
+            WHERE hr.latitude IS NULL OR hr.longitude IS NULL
+        """)
+        wards = {ward_id: place for ward_id, *place in cur.fetchall()}
+        coordinates = cache.lookup(tuple(place) for place in wards.values())
+        rows = [(ward_id, *coordinates[tuple(place)]) for ward_id, place in wards.items()
+                if coordinates[tuple(place)] is not None]
+        if not rows:
+            return 0
+        execute_values(cur, """
+            UPDATE public.house_rent hr
+            SET latitude = c.latitude, longitude = c.longitude, update_time = now()
+            FROM (VALUES %s) AS c (ward_id, latitude, longitude)
+            WHERE hr.ward_id = c.ward_id AND (hr.latitude IS NULL OR hr.longitude IS NULL)
+        """, rows, page_size=1000)
+        updated = cur.rowcount
+    conn.commit()
+    return updated
+
+
+def main(argv: List[str] = None) -> int:
+    from .load import connect
+
+    parser = argparse.ArgumentParser(prog="python -m etl.geocode", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--geocoder", choices=[*GEOCODERS, "none"], default="gazetteer")
+    parser.add_argument("--gazetteer", default=GAZETTEER_PATH, help="CSV used by the gazetteer geocoder")
+    parser.add_argument("--cache", default=CACHE_PATH, help="SQLite cache file")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    cache = GeocodeCache(args.cache, make_geocoder(args.geocoder, args.gazetteer))
+    conn = connect()
+    try:
+        updated = backfill(conn, cache)
+    finally:
+        conn.close()
+        cache.close()
+    print(f"listings={updated} geocoder_requests={cache.requests} seconds={time.perf_counter() - started:.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
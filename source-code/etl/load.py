@@ -0,0 +1,197 @@
+"""
+Loading parsed listings: COPY into per-session staging tables, then upsert into
+`house_rent` / `house_rent_environment` (and any new provinces, districts and wards).
+
+Listings are identified by (title, address, published), so loading the same file again
+updates nothing; only values that come from the file are overwritten (generated ones
+such as the phone number, contract period and coordinates are kept). New listings, and
+old ones still without coordinates, get those of their ward from the geocode cache.
+"""
+import io
+import os
+from typing import Dict, Tuple
+
+import pandas as pd
+import psycopg2
+
+from .address import PLACE_COLUMNS, AddressResolver
+from .geocode import GeocodeCache
+
+STAGING_TABLES = """
+    CREATE TEMP TABLE IF NOT EXISTS etl_house (
+        source_row      bigint PRIMARY KEY,
+        title           text,
+        address         text,
+        published       date,
+        price           double precision,
+        acreage         double precision,
+        house_number    text,
+        street          text,
+        ward_id         bigint,
+        phone_number    varchar(10),
+        house_type      text,
+        contract_period text,
+        bedrooms        integer,
+        living_rooms    integer,
+        kitchens        integer,
+        latitude        double precision,
+        longitude       double precision,
+        id              bigint
+    ) ON COMMIT DELETE ROWS;
+    CREATE TEMP TABLE IF NOT EXISTS etl_house_environment (
+        source_row     bigint,
+        environment_id bigint
+    ) ON COMMIT DELETE ROWS;
+"""
+
+STAGED_COLUMNS = ["source_row", "title", "address", "published", "price", "acreage", "house_number", "street",
+                  "ward_id", "phone_number", "house_type", "contract_period", "bedrooms", "living_rooms", "kitchens",
+                  "latitude", "longitude"]
+
+# Cột lấy từ file: chỉ những cột này được cập nhật khi tin đã có
+SOURCE_COLUMNS = ["published", "price", "acreage", "address", "house_number", "street", "ward_id", "title",
+                  "house_type", "bedrooms", "living_rooms", "kitchens"]
+
+UPSERT_STEPS = [
+    # Trong một chunk, tin trùng lặp lấy dòng sau cùng
+    """
+    DELETE FROM etl_house a USING etl_house b
+    WHERE (a.title, a.address, a.published) = (b.title, b.address, b.published) AND a.source_row < b.source_row
+    """,
+    # Tin đã có (kể cả do notebook nạp) giữ id cũ
+    """
+    UPDATE etl_house s SET id = hr.id
+    FROM (SELECT DISTINCT ON (hr.title, hr.address, hr.published) hr.id, hr.title, hr.address, hr.published
+          FROM public.house_rent hr
+          JOIN etl_house s ON (hr.title, hr.address, hr.published) = (s.title, s.address, s.published)
+          ORDER BY hr.title, hr.address, hr.published, hr.id) hr
+    WHERE (hr.title, hr.address, hr.published) = (s.title, s.address, s.published)
+    """,
+    # Tin mới: id nối tiếp (house_rent đang bị khóa nên các worker không cấp trùng)
+    """
+    UPDATE etl_house s SET id = n.id
+    FROM (SELECT source_row,
+                 (SELECT coalesce(max(id), 0) FROM public.house_rent) + row_number() OVER (ORDER BY source_row) AS id
+          FROM etl_house
+          WHERE id IS NULL) n
+    WHERE s.source_row = n.source_row
+    """,
+]
+
+UPSERT_HOUSES = f"""
+    INSERT INTO public.house_rent (id, available, published, price, acreage, address, house_number, street, ward_id,
+                                   latitude, longitude, title, phone_number, house_type, contract_period, bedrooms,
+                                   living_rooms, kitchens)
+    SELECT s.id, TRUE, s.published, s.price, s.acreage, s.address, s.house_number, s.street, s.ward_id,
+           s.latitude, s.longitude, s.title, s.phone_number, s.house_type, s.contract_period, s.bedrooms,
+           s.living_rooms, s.kitchens
+    FROM etl_house s
+    ORDER BY s.id
+    ON CONFLICT (id) DO UPDATE SET {", ".join(f"{c} = excluded.{c}" for c in SOURCE_COLUMNS)}, update_time = now()
+    WHERE ({", ".join(f"house_rent.{c}" for c in SOURCE_COLUMNS)})
+          IS DISTINCT FROM ({", ".join(f"excluded.{c}" for c in SOURCE_COLUMNS)})
+    RETURNING xmax = 0
+"""
+
+# Tin đã có nhưng chưa có tọa độ lấy tọa độ từ cache geocode
+FILL_COORDINATES = """
+    UPDATE public.house_rent hr
+    SET latitude = s.latitude, longitude = s.longitude, update_time = now()
+    FROM etl_house s
+    WHERE hr.id = s.id AND (hr.latitude IS NULL OR hr.longitude IS NULL) AND s.latitude IS NOT NULL
+"""
+
+DELETE_LINKS = """
+    DELETE FROM public.house_rent_environment hre
+    USING etl_house s
+    WHERE hre.house_rent_id = s.id
+      AND NOT EXISTS (SELECT 1 FROM etl_house_environment e
+                      WHERE e.source_row = s.source_row AND e.environment_id = hre.environment_id)
+"""
+
+INSERT_LINKS = """
+    INSERT INTO public.house_rent_environment (house_rent_id, environment_id)
+    SELECT DISTINCT s.id, e.environment_id
+    FROM etl_house_environment e
+    JOIN etl_house s ON s.source_row = e.source_row
+    WHERE NOT EXISTS (SELECT 1 FROM public.house_rent_environment hre
+                      WHERE hre.house_rent_id = s.id AND hre.environment_id = e.environment_id)
+"""
+
+
+def connect():
+    return psycopg2.connect(
+        host=os.environ.get("POSTGRES_HOST", "localhost"),
+        port=os.environ.get("POSTGRES_PORT", "5433"),
+        database=os.environ.get("POSTGRES_DB", "system"),
+        user=os.environ.get("POSTGRES_USER", "admin"),
+        password=os.environ.get("POSTGRES_PASSWORD", "admin"),
+    )
+
+
+def sync_link_sequence(conn) -> None:
+    """Move the house_rent_environment id sequence past existing rows (the dump leaves it behind)"""
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT setval(pg_get_serial_sequence('public.house_rent_environment', 'id'),
+                          greatest((SELECT coalesce(max(id), 1) FROM public.house_rent_environment),
+                                   (SELECT last_value FROM public.house_rent_environment_id_seq)))
+        """)
+    conn.commit()
+
+
+def _copy(cur, table: str, frame: pd.DataFrame, not_null: Tuple[str, ...] = ()) -> None:
+    buffer = io.StringIO()
+    frame.to_csv(buffer, index=False, header=False)
+    buffer.seek(0)
+    options = f", FORCE_NOT_NULL ({', '.join(not_null)})" if not_null else ""
+    cur.copy_expert(f"COPY {table} ({', '.join(frame.columns)}) FROM STDIN WITH (FORMAT csv{options})", buffer)
+
+
+def load_chunk(conn, houses: pd.DataFrame, links: pd.DataFrame, geocoder: GeocodeCache) -> Dict[str, int]:
+    """Upsert one parsed chunk in one transaction; returns the row counts"""
+    places = houses[PLACE_COLUMNS].drop_duplicates()
+
+    with conn.cursor() as cur:
+        cur.execute(STAGING_TABLES)
+        # Cấp id địa danh và id tin mới lần lượt giữa các worker; đọc (API) vẫn không bị chặn
+        cur.execute("LOCK TABLE public.provinces, public.districts, public.wards, public.house_rent "
+                    "IN SHARE ROW EXCLUSIVE MODE")
+        resolver = AddressResolver.load(cur)
+        places["ward_id"] = resolver.resolve(cur, places)
+        places = places[places["ward_id"].notna()].astype({"ward_id": "int64"})
+
+        # Mỗi phường chỉ geocode một lần (cache); backend chậm chỉ bị gọi ở lần nạp đầu tiên
+        wards = places["ward_id"].unique()
+        coordinates = geocoder.lookup([resolver.place(ward_id) for ward_id in wards])
+        coordinates = {ward_id: coordinates[resolver.place(ward_id)] or (None, None) for ward_id in wards}
+        places["latitude"] = [coordinates[ward_id][0] for ward_id in places["ward_id"]]
+        places["longitude"] = [coordinates[ward_id][1] for ward_id in places["ward_id"]]
+        staged = houses.merge(places, on=PLACE_COLUMNS)
+
+        # Số nhà / đường rỗng được lưu là '' (như notebook), không phải NULL
+        _copy(cur, "etl_house", staged[STAGED_COLUMNS], not_null=("house_number", "street"))
+        _copy(cur, "etl_house_environment", links[links["source_row"].isin(staged["source_row"])])
+        for step in UPSERT_STEPS:
+            cur.execute(step)
+
+        cur.execute(UPSERT_HOUSES)
+        written = [row[0] for row in cur.fetchall()]
+        cur.execute(FILL_COORDINATES)
+        geocoded = cur.rowcount
+        cur.execute(DELETE_LINKS)
+        links_removed = cur.rowcount
+        cur.execute(INSERT_LINKS)
+        links_added = cur.rowcount
+    conn.commit()
+
+    inserted = sum(written)
+    return {
+        "skipped": len(houses) - len(staged),
+        "inserted": inserted,
+        "updated": len(written) - inserted,
+        "unchanged": len(staged) - len(written),
+        "geocoded": geocoded,
+        "links_added": links_added,
+        "links_removed": links_removed,
+    }
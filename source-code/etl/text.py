@@ -0,0 +1,37 @@
+"""
+Text normalization shared by the parsers: one spelling per Vietnamese word, whatever
+Unicode form or tone-mark placement the listing was typed with.
+"""
+import re
+import unicodedata
+
+import pandas as pd
+
+# Dấu thanh kiểu cũ ở cuối từ (HOÀ) -> kiểu mới (HÒA); ĐOÀN, QUỲNH giữ nguyên
+_TONE_MARKS = {"O" + a: o + base for base, accents in (("A", "ÀÁẢÃẠ"), ("E", "ÈÉẺẼẸ"))
+               for a, o in zip(accents, "ÒÓỎÕỌ")}
+_OLD_TONE = re.compile(f"({'|'.join(_TONE_MARKS)})(?!\\w)")
+
+
+def _new_tone(match: re.Match) -> str:
+    return _TONE_MARKS[match.group(1)]
+
+
+def normalize_accents(text: str) -> str:
+    """Upper-case NFC text with new-style tone marks and single spaces"""
+    text = text or ""
+    if not unicodedata.is_normalized("NFC", text):
+        text = unicodedata.normalize("NFC", text)
+    text = " ".join(text.upper().split())
+    return _OLD_TONE.sub(_new_tone, text) if "O" in text else text
+
+
+def normalize_accents_column(text: pd.Series) -> pd.Series:
+    """`normalize_accents` over a column of str"""
+    return pd.Series([normalize_accents(value) for value in text.fillna("")], index=text.index, dtype=object)
+
+
+def fold_accents(text: str) -> str:
+    """Text without diacritics ("HÀ NỘI" -> "HA NOI")"""
+    decomposed = unicodedata.normalize("NFD", text.replace("Đ", "D").replace("đ", "d"))
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
@@ -0,0 +1,73 @@
+"""
+Vectorized parsing of the scraped listings (`data/raw/*.csv`), following the rules of
+`pre-process-data/pre-process-data.ipynb` so that reloading a file gives the rows the
+notebook produced.
+"""
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .address import PLACE_COLUMNS, split_address
+from .amenities import AmenityTagger, default_tagger
+
+HOUSE_COLUMNS = ["source_row", "title", "address", "published", "price", "acreage", "house_number", "street",
+                 "phone_number", "house_type", "contract_period", "bedrooms", "living_rooms", "kitchens"]
+
+
+def _contains(text: pd.Series, *keywords: str) -> np.ndarray:
+    mask = np.zeros(len(text), dtype=bool)
+    for keyword in keywords:
+        mask |= text.str.contains(keyword, regex=False).to_numpy()
+    return mask
+
+
+def _room_count(title: pd.Series, rules: Tuple[Tuple[int, Tuple[str, ...]], ...]) -> pd.Series:
+    """First matching count (in rule order) or NULL"""
+    conditions = [_contains(title, *keywords) for _, keywords in rules]
+    counts = np.select(conditions, [float(n) for n, _ in rules], default=np.nan)
+    return pd.Series(counts, index=title.index).astype("Int64")
+
+
+def parse_listings(chunk: pd.DataFrame, first_row: int,
+                   tagger: Optional[AmenityTagger] = None) -> Tuple[pd.DataFrame, pd.DataFrame, int]:
+    """
+    Listings and their amenity links from a chunk of a raw CSV file (all columns as str).
+
+    Returns (houses, links, skipped): `houses` has `HOUSE_COLUMNS` plus `PLACE_COLUMNS`,
+    `links` has (source_row, environment_id) from `tagger` (default: `data/amenities/rules.csv`),
+    and `skipped` counts rows without a usable date, acreage or address.
+    """
+    chunk = chunk.reset_index(drop=True)
+    chunk["source_row"] = np.arange(first_row, first_row + len(chunk), dtype=np.int64)
+    chunk["published"] = pd.to_datetime(chunk["published"], format="%d/%m/%Y", errors="coerce").dt.date
+    chunk["acreage"] = pd.to_numeric(chunk["acreage"], errors="coerce")
+    address = split_address(chunk["address"])
+    keep = chunk["published"].notna() & chunk["acreage"].notna() & address["province_key"].notna()
+    skipped = int((~keep).sum())
+
+    houses = pd.concat([chunk[keep], address[keep]], axis=1).reset_index(drop=True)
+    acreage = houses["acreage"].to_numpy()
+    # Giá theo diện tích như notebook
+    houses["price"] = np.select([acreage >= 40, acreage >= 20], [acreage / 10 + 3, acreage / 10 + 2],
+                                default=acreage / 10 + 1.5)
+
+    title = houses["title"].fillna("").str.upper()
+    houses["house_type"] = np.select(
+        [_contains(title, "CĂN HỘ", "STUDIO"), _contains(title, "MINI", "CCMN"), _contains(title, "PHÒNG", "TRỌ"),
+         _contains(title, "NHÀ")],
+        ["CĂN HỘ DỊCH VỤ", "CHUNG CƯ MINI", "PHÒNG TRỌ", "NHÀ NGUYÊN CĂN"], default="PHÒNG TRỌ")
+    houses["bedrooms"] = _room_count(title, tuple((n, (f"{n} NGỦ", f"{n}N")) for n in (1, 2, 3, 4)))
+    houses["living_rooms"] = _room_count(title, ((1, ("1 KHÁCH", "1K")), (2, ("2 KHÁCH",))))
+    houses["kitchens"] = _room_count(title, ((1, ("1 BẾP",)), (2, ("2 BẾP",))))
+
+    # Notebook sinh ngẫu nhiên; ở đây lấy từ hash của tin để chạy lại cho cùng kết quả
+    key = houses["title"].fillna("") + "\x1f" + houses["address"].fillna("") + "\x1f" + houses["published"].astype(str)
+    digest = pd.util.hash_pandas_object(key, index=False).to_numpy()
+    houses["phone_number"] = "0" + pd.Series(digest % 10 ** 9, dtype="int64").astype(str).str.zfill(9)
+    houses["contract_period"] = np.where(((digest >> np.uint64(32)) & np.uint64(1)).astype(bool), "6 THÁNG", "12 THÁNG")
+
+    links = (tagger or default_tagger()).tag(houses["title"].set_axis(houses["source_row"]))
+    links = links.rename(columns={"row": "source_row"})
+
+    return houses[HOUSE_COLUMNS + PLACE_COLUMNS], links, skipped
@@ -0,0 +1,164 @@
+import os
+
+import pandas as pd
+import pytest
+
+from etl.address import PROVINCES_PATH, AddressResolver, place_key, split_address, str_to_8digit_hash
+
+RAW_DIR = os.path.join(os.path.dirname(PROVINCES_PATH), os.pardir, "raw")
+
+# Danh sách của notebook (process_address chỉ nhận Hà Nội)
+NOTEBOOK_PROVINCES = ['HÀ NỘI', 'HN', 'THÀNH PHỐ HÀ NỘI', 'HA NOI', 'THÀNH PHỐ HN', 'TP.HÀ NỘI']
+NOTEBOOK_DISTRICTS = [
+    'BA ĐÌNH', 'THANH TRÌ', 'ĐỐNG ĐA', 'HOÀI ĐỨC', 'TÂY HỒ', 'LONG BIÊN', 'BẮC TỪ LIÊM', 'TỪ LIÊM', 'NAM TỪ LIÊM',
+    'THANH XUÂN', 'GIA LÂM', 'ĐÔNG ANH', 'HOÀNG MAI', 'CHƯƠNG MỸ', 'SÓC SƠN', 'THƯỜNG TÍN', 'MÊ LINH',
+    'HAI BÀ TRƯNG', 'HÀ ĐÔNG', 'CẦU GIẤY', 'HOÀN KIẾM'
+]
+
+
+def notebook_process_address(address: str):
+    """`process_address` of pre-process-data.ipynb, without the coordinate lookup"""
+    address_split = [x.upper().strip() for x in address.split(',')]
+    if len(address_split) <= 3:
+        return None
+    wdp = address_split[-3:]
+    house_number_street = ', '.join(address_split[:(len(address_split) - 3)])
+
+    if wdp[2] not in NOTEBOOK_PROVINCES:
+        return None
+    district = wdp[1].replace('QUẬN', '').replace('HUYỆN', '').replace('THỊ XÃ', '').lstrip()
+    if district not in NOTEBOOK_DISTRICTS:
+        return None
+    ward = wdp[0]
+    if 'PHƯỜNG' in ward or 'XÃ' in ward or 'THỊ TRẤN' in ward:
+        if 'PHÒNG' in ward or 'NHÀ' in ward or 'TỔ' in ward or 'NGÁCH' in ward:
+            return None
+        ward = ward.replace('PHƯỜNG', '').replace('XÃ', '').replace('THỊ TRẤN', '').lstrip()
+    else:
+        return None
+
+    house_number = ''
+    street = ''
+    if 'ĐƯỜNG' in house_number_street:
+        house_number_street_split = house_number_street.split('ĐƯỜNG')
+        house_number = house_number_street_split[0].rstrip()
+        street = 'ĐƯỜNG'.join(house_number_street_split[1:]).lstrip()
+    elif ',' in house_number_street:
+        house_number_street_split = house_number_street.split(',')
+        street = house_number_street_split[len(house_number_street_split) - 1].lstrip()
+        house_number = ','.join(house_number_street_split[:-1]).rstrip()
+    elif any(ch.isdigit() for ch in house_number_street):
+        # notebook dùng biến vòng lặp `i` (chỉ số cuối): cả chuỗi là số nhà
+        house_number = house_number_street
+    else:
+        street = house_number_street
+
+    return {'house_number': house_number, 'street': street, 'district': district, 'ward': ward,
+            'ward_id': str_to_8digit_hash(ward)}
+
+
+@pytest.fixture(scope="module")
+def addresses():
+    scraped = pd.read_csv(os.path.join(RAW_DIR, "hn.csv"), usecols=["address"])["address"]
+    crafted = pd.Series([
+        "Số 12 Đường Trần Duy Hưng, Phường Trung Hòa, Quận Cầu Giấy, Hà Nội",
+        "Ngõ 5 , Xuân Thủy ,Phường Dịch Vọng Hậu, Quận Cầu Giấy, HN",
+        "123, Xã An Khánh, Huyện Hoài Đức, Hà Nội",
+        "Phòng 2, Nhà A, Phường Láng Hạ, Quận Đống Đa, Hà Nội",
+        "Phường Láng Hạ, Quận Đống Đa, Hà Nội",
+        None,
+    ])
+    return pd.concat([scraped, crafted], ignore_index=True)
+
+
+def test_split_address_matches_notebook(addresses):
+    parts = split_address(addresses)
+
+    accepted = 0
+    for address, place in zip(addresses.fillna(""), parts.to_dict("records")):
+        expected = notebook_process_address(address)
+        if expected is None:
+            continue
+        accepted += 1
+        assert place["province_key"] == place_key(address.split(",")[-1].upper().strip())[0], address
+        assert (place["house_number"], place["street"], place["district"], place["ward"]) == \
+            (expected["house_number"], expected["street"], expected["district"], expected["ward"]), address
+        assert str_to_8digit_hash(place["ward"]) == expected["ward_id"]
+    assert accepted > 1000
+
+
+@pytest.mark.parametrize("name, key", [
+    ("TP. HỒ CHÍ MINH", ("HỒ CHÍ MINH", "district")),
+    ("TỈNH BÌNH DƯƠNG", ("BÌNH DƯƠNG", "province")),
+    ("Q.05", ("5", "district")),
+    ("Q1", ("1", "district")),
+    ("THỊ XÃ SƠN TÂY", ("SƠN TÂY", "district")),
+    ("P. 12", ("12", "ward")),
+    ("XÃ AN KHÁNH", ("AN KHÁNH", "ward")),
+    ("Hoà Vang", ("HÒA VANG", None)),
+])
+def test_place_key(name, key):
+    assert place_key(name) == key
+
+
+def test_split_address_rejects_incomplete_addresses():
+    parts = split_address(pd.Series(["abc, Quận 1, HCM", "Số 3, Tổ 5, Quận Ba Đình, Hà Nội", None]))
+
+    assert parts["province_key"].isna().all()
+
+
+class RecordingCursor:
+    """Cursor over fixed location tables that records the INSERTs of new locations"""
+
+    def __init__(self, provinces, districts, wards):
+        self.tables = {"provinces": provinces, "districts": districts, "wards": wards}
+        self.result = []
+        self.inserts = []
+
+    def execute(self, query, params=None):
+        if query.startswith("INSERT"):
+            self.inserts.append((query.split()[2], params))
+        else:
+            self.result = self.tables[next(name for name in self.tables if f"FROM public.{name}" in query)]
+
+    def fetchall(self):
+        return self.result
+
+
+@pytest.fixture
+def resolver_cursor():
+    hanoi, cau_giay, dich_vong = str_to_8digit_hash("HÀ NỘI"), str_to_8digit_hash("CẦU GIẤY"), str_to_8digit_hash("DỊCH VỌNG")
+    cursor = RecordingCursor(provinces=[(hanoi, "HÀ NỘI")], districts=[(cau_giay, hanoi, "CẦU GIẤY")],
+                             wards=[(dich_vong, cau_giay, hanoi, "DỊCH VỌNG")])
+    return cursor, AddressResolver.load(cursor), dich_vong
+
+
+@pytest.mark.parametrize("address", [
+    "1, Phường Dịch Vọng, Quận Cầu Giấy, Hà Nội",
+    "1, P. Dịch Vọng, Q. Cầu Giấy, TP. Hà Nội",
+    "1, Phường DICH VONG, Quận CAU GIAY, HN",
+    "1, phường dịch vọng, cầu giấy, Thành phố Hà Nội",
+])
+def test_resolver_finds_existing_ward(resolver_cursor, address):
+    cursor, resolver, dich_vong = resolver_cursor
+
+    assert resolver.resolve(cursor, split_address(pd.Series([address]))) == [dich_vong]
+    assert cursor.inserts == []
+
+
+def test_resolver_creates_missing_locations(resolver_cursor):
+    cursor, resolver, dich_vong = resolver_cursor
+    places = split_address(pd.Series(["1, Phường Quan Hoa, Quận Cầu Giấy, Hà Nội",
+                                      "2, Phường 3, Quận 5, TP. Hồ Chí Minh",
+                                      "3, Phường 3, Quận 5, Hồ Chí Minh",
+                                      "4, Phường 1, Cầu Giấy, Hà Nội",
+                                      "5, Phường 1, Đống Đa, Hà Nội"]))
+
+    quan_hoa, ward_3, ward_3_again, ward_1, unknown = resolver.resolve(cursor, places)
+
+    assert ward_3 == ward_3_again
+    assert len({dich_vong, quan_hoa, ward_3, ward_1}) == 4
+    assert unknown is None  # quận không có tiền tố và chưa có trong bảng
+    assert [table for table, _ in cursor.inserts] == ["public.wards", "public.provinces", "public.districts",
+                                                     "public.wards", "public.wards"]
+    assert resolver.place(ward_3) == ("HỒ CHÍ MINH", "5", "3")
@@ -0,0 +1,69 @@
+import os
+import unicodedata
+
+import pandas as pd
+import pytest
+
+from etl.amenities import RULES_PATH, AmenityTagger, load_rules
+from etl.text import normalize_accents
+
+RAW_DIR = os.path.join(os.path.dirname(RULES_PATH), os.pardir, "raw")
+
+
+def brute_force(rules, title):
+    """Every rule whose keyword occurs in the title, one `in` check per keyword"""
+    title = normalize_accents(title)
+    return sorted({environment_id for environment_id, keywords in rules.items()
+                   for keyword in keywords if normalize_accents(keyword) and normalize_accents(keyword) in title})
+
+
+@pytest.fixture(scope="module")
+def rules():
+    return load_rules()
+
+
+@pytest.fixture(scope="module")
+def titles():
+    scraped = pd.read_csv(os.path.join(RAW_DIR, "hn.csv"), usecols=["title"])["title"]
+    crafted = pd.Series([
+        "Phòng VỆ SINH KHÉP KÍN, điều hoà, nóng lạnh",  # từ khóa chồng nhau, dấu kiểu cũ
+        unicodedata.normalize("NFD", "Căn hộ ĐẦY ĐỦ đồ, có máy giặt"),  # Unicode dạng NFD
+        "phong  khep   kin gan dh",  # không dấu, nhiều khoảng trắng
+        "Nhà mới, ô tô đỗ cửa, camera an ninh",
+        "",
+        None,
+    ])
+    return pd.concat([scraped, crafted], ignore_index=True)
+
+
+def test_tag_one_matches_brute_force(rules, titles):
+    tagger = AmenityTagger(rules)
+
+    for title in titles.fillna(""):
+        assert tagger.tag_one(title) == brute_force(rules, title), title
+
+
+def test_tag_matches_tag_one(rules, titles):
+    tagger = AmenityTagger(rules)
+    titles = titles.set_axis(titles.index * 10 + 7)  # nhãn index bất kỳ
+
+    links = tagger.tag(titles)
+
+    expected = [(row, environment_id) for row, title in titles.fillna("").items()
+                for environment_id in tagger.tag_one(title)]
+    assert sorted(zip(links["row"], links["environment_id"])) == sorted(expected)
+    assert links["environment_id"].dtype == "int64"
+
+
+def test_overlapping_and_prefix_keywords():
+    tagger = AmenityTagger({1: ["KHÉP KÍN"], 2: ["VỆ SINH KHÉP KÍN"], 3: ["ĐH"], 4: ["ĐHX"], 5: ["hoà"]})
+
+    assert tagger.tag_one("vệ sinh khép kín") == [1, 2]
+    assert tagger.tag_one("ĐHX") == [3, 4]
+    assert tagger.tag_one("ĐHY") == [3]
+    assert tagger.tag_one("điều HÒA") == [5]
+
+
+def test_rules_without_keywords_are_rejected():
+    with pytest.raises(ValueError):
+        AmenityTagger({1: ["", "  "]})